@@ -1,14 +1,236 @@
+from __future__ import annotations
+
 import sys
-from datetime import datetime
-import pandas as pd
-import matplotlib.pyplot as plt
+import argparse
+import atexit
+import bisect
+import csv
+import functools
+import hashlib
+import importlib
+import io
+import json
+import math
+import shutil
+import signal
+import time
+import sqlite3
+import tempfile
+import threading
+from datetime import datetime, timedelta
 import os
-from typing import List, Dict, Optional
+import unicodedata
+from abc import ABC, abstractmethod
+from array import array
+from typing import Callable, Iterator, List, Dict, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+class _LazyModule:
+    """Importa el módulo real la primera vez que se usa uno de sus atributos"""
+
+    def __init__(self, name: str):
+        self._name = name
+        self._module = None
+
+    def __getattr__(self, attr: str):
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return getattr(self._module, attr)
+
+# pandas y matplotlib tardan en importarse: el menú y el registro de datos no los necesitan
+pd = _LazyModule("pandas")
+np = _LazyModule("numpy")
+plt = _LazyModule("matplotlib.pyplot")
+futures = _LazyModule("concurrent.futures")  # arrastra multiprocessing; solo reportes y equipo lo usan
+asyncio = _LazyModule("asyncio")  # solo el servicio local (serve)
+
+class Metrics:
+    """Llamadas, tiempo y memoria por operación, escritos como JSON lines al terminar el proceso.
+
+    Se activa con --metrics / $GYM_METRICS (archivo de salida); --profile / $GYM_PROFILE agrega
+    cProfile (guarda '<archivo>.prof' y las funciones más costosas) o tracemalloc (pico de memoria
+    por operación y líneas que más asignan). Mientras no se activa, los métodos marcados con
+    @instrumented son los originales: no hay envoltorio ni comprobación en cada llamada.
+    """
+
+    PROFILERS = ("cprofile", "tracemalloc")
+    DEFAULT_FILE = "metricas.jsonl"
+    TOP = 15
+
+    registry: List[tuple] = []
+    path: Optional[str] = None
+    profilers: tuple = ()
+    stats: Dict[str, Dict] = {}
+    _profile = None
+    _peaks: List[List[int]] = []
+
+    @classmethod
+    def configure(cls, path: Optional[str] = None, profilers: Optional[List[str]] = None) -> None:
+        """Activa las métricas según los argumentos o, si faltan, las variables de entorno"""
+        path = path or os.environ.get("GYM_METRICS")
+        if profilers is None:
+            profilers = [p.strip() for p in os.environ.get("GYM_PROFILE", "").split(",") if p.strip()]
+        unknown = set(profilers) - set(cls.PROFILERS)
+        if unknown:
+            raise ValueError(f"Perfilador desconocido: {', '.join(sorted(unknown))}")
+        if path or profilers:
+            cls.enable(path or cls.DEFAULT_FILE, profilers)
+
+    @classmethod
+    def enable(cls, path: str, profilers: List[str] = ()) -> None:
+        if cls.path is not None:
+            return
+        cls.path, cls.profilers = path, tuple(profilers)
+        for owner, name in cls.registry:
+            cls._install(owner, name)
+        if "tracemalloc" in cls.profilers:
+            importlib.import_module("tracemalloc").start()
+        if "cprofile" in cls.profilers:
+            cls._profile = importlib.import_module("cProfile").Profile()
+            cls._profile.enable()
+        atexit.register(cls.write)
+
+    @classmethod
+    def _install(cls, owner: type, name: str) -> None:
+        attribute = owner.__dict__[name]
+        function = attribute.__func__ if isinstance(attribute, (staticmethod, classmethod)) else attribute
+        operation = f"{owner.__name__}.{name}"
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            start = cls._start()
+            result = None
+            try:
+                result = function(*args, **kwargs)
+                return result
+            finally:
+                cls._stop(operation, start, result)
+
+        setattr(owner, name, wrapper if function is attribute else type(attribute)(wrapper))
+
+    @classmethod
+    def _start(cls) -> float:
+        if "tracemalloc" in cls.profilers:
+            # Cada operación mide su propio pico; el de las anidadas se traslada a la que las llamó
+            tracemalloc = sys.modules["tracemalloc"]
+            current, peak = tracemalloc.get_traced_memory()
+            if cls._peaks:
+                cls._peaks[-1][1] = max(cls._peaks[-1][1], peak)
+            tracemalloc.reset_peak()
+            cls._peaks.append([current, 0])
+        return time.perf_counter()
+
+    @classmethod
+    def _stop(cls, operation: str, start: float, result) -> None:
+        elapsed = (time.perf_counter() - start) * 1000
+        stat = cls.stats.setdefault(operation, {"calls": 0, "total_ms": 0.0, "max_ms": 0.0, "rows": 0})
+        stat["calls"] += 1
+        stat["total_ms"] += elapsed
+        stat["max_ms"] = max(stat["max_ms"], elapsed)
+        shape = getattr(result, "shape", None)
+        if shape:
+            stat["rows"] += shape[0]
+        if cls._peaks:
+            tracemalloc = sys.modules["tracemalloc"]
+            base, inner = cls._peaks.pop()
+            peak = max(tracemalloc.get_traced_memory()[1], inner)
+            stat["peak_mb"] = max(stat.get("peak_mb", 0.0), (peak - base) / 1e6)
+            if cls._peaks:
+                cls._peaks[-1][1] = max(cls._peaks[-1][1], peak)
+            tracemalloc.reset_peak()
+
+    @classmethod
+    def write(cls) -> None:
+        """Agrega al archivo una línea por operación (y una por perfilador activo)"""
+        base = {"timestamp": datetime.now().isoformat(timespec="seconds"), "pid": os.getpid(),
+                "argv": sys.argv[1:]}
+        lines = []
+        for operation, stat in sorted(cls.stats.items(), key=lambda item: -item[1]["total_ms"]):
+            line = {**base, "operation": operation, "calls": stat["calls"],
+                    "total_ms": round(stat["total_ms"], 3), "mean_ms": round(stat["total_ms"] / stat["calls"], 3),
+                    "max_ms": round(stat["max_ms"], 3), "rows": stat["rows"]}
+            if "peak_mb" in stat:
+                line["peak_mb"] = round(stat["peak_mb"], 3)
+            lines.append(line)
+        if cls._profile is not None:
+            cls._profile.disable()
+            output = os.path.splitext(cls.path)[0] + ".prof"
+            cls._profile.dump_stats(output)
+            profile = importlib.import_module("pstats").Stats(cls._profile).sort_stats("cumulative")
+            top = []
+            for function in profile.fcn_list[:cls.TOP]:
+                _, calls, own, cumulative, _ = profile.stats[function]
+                top.append({"function": "{}:{}({})".format(*function), "calls": calls,
+                            "own_ms": round(own * 1000, 3), "cumulative_ms": round(cumulative * 1000, 3)})
+            lines.append({**base, "profiler": "cprofile", "file": output, "top": top})
+        if "tracemalloc" in cls.profilers:
+            tracemalloc = sys.modules["tracemalloc"]
+            snapshot = tracemalloc.take_snapshot()
+            top = [{"location": str(stat.traceback), "size_mb": round(stat.size / 1e6, 3), "blocks": stat.count}
+                   for stat in snapshot.statistics("lineno")[:cls.TOP]]
+            lines.append({**base, "profiler": "tracemalloc", "top": top})
+            tracemalloc.stop()
+        with open(cls.path, "a", encoding="utf-8") as f:
+            f.write("".join(json.dumps(line, ensure_ascii=False) + "\n" for line in lines))
+
+class _InstrumentedSlot:
+    """Reemplazo temporal en el cuerpo de la clase: al crearla se registra y deja la función original"""
+
+    def __init__(self, function):
+        self.function = function
+
+    def __set_name__(self, owner: type, name: str):
+        setattr(owner, name, self.function)
+        Metrics.registry.append((owner, name))
+
+def instrumented(function):
+    """Marca un punto de entrada para Metrics (se pone encima de @staticmethod si lo hay)"""
+    return _InstrumentedSlot(function)
 
 # Configuración de archivos
 GOALS_FILE = "goals.csv"
 WORKOUT_FILE = "entrenamientos.csv"
 WEIGHT_FILE = "peso.csv"
+CATALOG_FILE = "ejercicios.json"  # ejercicios personalizados y alias propios de cada atleta
+ATHLETES_DIR = "atletas"
+
+WORKOUT_COLUMNS = ["Fecha", "Rutina", "Ejercicio", "Repeticiones", "Peso (kg)", "ID"]
+WEIGHT_COLUMNS = ["Fecha", "Peso (kg)", "ID"]
+GOAL_COLUMNS = ["Ejercicio", "Meta Peso (kg)", "Meta Reps", "Fecha Límite"]
+
+# Correcciones y borrados por ID de fila: se anexan a una tabla aparte y se aplican al leer
+CHANGES_FILES = {WORKOUT_FILE: "entrenamientos_cambios.csv", WEIGHT_FILE: "peso_cambios.csv"}
+CHANGE_DELETE = "borrado"
+CHANGE_CORRECT = "corrección"
+COMPACTION_THRESHOLD = 0.1  # cambios por fila a partir de los cuales compact() reescribe la tabla
+
+STORAGE_BACKENDS = ["csv", "parquet", "feather", "sqlite"]
+
+# Granularidad de las particiones -> largo del prefijo de 'YYYY-MM-DD' que nombra cada partición
+PARTITION_PERIODS = {"mes": 7, "año": 4}
+PARTITIONED_TABLES = (WORKOUT_FILE,)
+
+# Tipos compactos por tabla (fechas como datetime64, textos repetidos como categorías).
+# El ID admite nulos ("Int64"): las filas de versiones anteriores no lo tienen hasta que se les asigna.
+TABLE_SCHEMAS = {
+    WORKOUT_FILE: {"Fecha": "datetime64[ns]", "Rutina": "category", "Ejercicio": "category",
+                   "Repeticiones": "int16", "Peso (kg)": "float32", "ID": "Int64"},
+    GOALS_FILE: {"Ejercicio": "category", "Meta Peso (kg)": "float64", "Meta Reps": "int32",
+                 "Fecha Límite": "datetime64[ns]"},
+    WEIGHT_FILE: {"Fecha": "datetime64[ns]", "Peso (kg)": "float32", "ID": "Int64"},
+}
+# En los cambios solo van los campos corregidos: el resto queda vacío (repeticiones como float)
+TABLE_SCHEMAS[CHANGES_FILES[WORKOUT_FILE]] = {**TABLE_SCHEMAS[WORKOUT_FILE], "Repeticiones": "float64",
+                                              "Cambio": "object"}
+TABLE_SCHEMAS[CHANGES_FILES[WEIGHT_FILE]] = {**TABLE_SCHEMAS[WEIGHT_FILE], "Cambio": "object"}
+MAX_REPS = 1000  # tope de repeticiones por serie al registrar (la columna es int16)
+CHANGE_COLUMNS = {table: ["ID", "Cambio", *(c for c in columns if c != "ID")]
+                  for table, columns in ((WORKOUT_FILE, WORKOUT_COLUMNS), (WEIGHT_FILE, WEIGHT_COLUMNS))}
 
 EXERCISE_POOL = {
     "Pecho-Tríceps": ["Banco Plano", "Banco Inclinado", "Pull Down Tricep", "Copa", "Pull Down Tricep Trenza",
@@ -21,30 +243,2233 @@ EXERCISE_POOL = {
     "Otros": []
 }
 
+# Grupo muscular de cada ejercicio del catálogo (el nombre de su rutina)
+MUSCLE_GROUPS = {exercise: routine for routine, exercises in EXERCISE_POOL.items() for exercise in exercises}
+
+class Vocabulary:
+    """Códigos enteros estables para textos repetidos (ejercicios, rutinas).
+
+    Empieza con el catálogo de EXERCISE_POOL y agrega los nombres nuevos al final: todas las
+    tablas del proceso comparten las mismas categorías y se concatenan sin volver a texto.
+    """
+
+    __slots__ = ("names", "codes", "_dtype")
+
+    def __init__(self, names: List[str]):
+        self.names: List[str] = []
+        self.codes: Dict[str, int] = {}
+        self._dtype = None
+        for name in names:
+            self.code(name)
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def code(self, name: str) -> int:
+        """Código del nombre; los nombres nuevos se registran (e internan) al final"""
+        code = self.codes.get(name)
+        if code is None:
+            name = sys.intern(str(name))
+            code = self.codes[name] = len(self.names)
+            self.names.append(name)
+            self._dtype = None
+        return code
+
+    @property
+    def dtype(self) -> pd.CategoricalDtype:
+        if self._dtype is None:
+            self._dtype = pd.CategoricalDtype(list(self.names))
+        return self._dtype
+
+    def categorize(self, values: pd.Series) -> pd.Series:
+        """Convierte una columna a las categorías compartidas, registrando los nombres que falten"""
+        uniques = values.cat.categories if isinstance(values.dtype, pd.CategoricalDtype) else values.dropna().unique()
+        for name in uniques:
+            self.code(name)
+        if not isinstance(values.dtype, pd.CategoricalDtype):
+            return values.astype(self.dtype)
+        # CategoricalDtype.__eq__ ignora el orden de las categorías (y astype no recodifica), pero los
+        # códigos deben ser los del vocabulario: se comparan y reordenan explícitamente
+        if values.cat.categories.equals(self.dtype.categories):
+            return values
+        return values.cat.set_categories(self.dtype.categories)
+
+REST_DAYS = ["Descanso", "Enfermo"]
+ROUTINES = Vocabulary(list(EXERCISE_POOL) + REST_DAYS)
+EXERCISES = Vocabulary([exercise for exercises in EXERCISE_POOL.values() for exercise in exercises] + REST_DAYS)
+VOCABULARIES = {"Rutina": ROUTINES, "Ejercicio": EXERCISES}
+
+# Otros nombres con que se suele anotar cada ejercicio del catálogo (acentos y mayúsculas no importan)
+EXERCISE_ALIASES = {
+    "Banco Plano": ["Press Banca", "Press de Banca", "Bench Press", "Press Plano"],
+    "Banco Inclinado": ["Press Banca Inclinado", "Incline Bench Press", "Press Inclinado"],
+    "Pull Down Tricep": ["Jalón Tríceps", "Tricep Pushdown", "Extensión Tríceps Polea"],
+    "Copa": ["Extensión Tríceps Copa", "Overhead Tricep Extension"],
+    "Shoulder Press": ["Press Militar", "Press Hombro", "Overhead Press"],
+    "Fondos Máquina": ["Fondos", "Dips", "Dip Machine"],
+    "Pec Fly": ["Aperturas", "Peck Deck", "Chest Fly"],
+    "Pull Down": ["Jalón al Pecho", "Lat Pulldown", "Polea Alta"],
+    "Pull Down Cerrado": ["Jalón Cerrado", "Close Grip Pulldown"],
+    "Remo": ["Remo con Barra", "Barbell Row", "Bent Over Row"],
+    "Remo Maquina": ["Remo Sentado", "Seated Row"],
+    "Curl Biceps": ["Curl con Barra", "Barbell Curl", "Bicep Curl"],
+    "Curl con Mancuerna": ["Curl Mancuerna", "Dumbbell Curl"],
+    "Dominadas": ["Pull Up", "Pull-Up", "Chin Up"],
+    "Pull Over": ["Pullover"],
+    "Sentadilla": ["Squat", "Back Squat", "Sentadilla Libre"],
+    "Peso Muerto": ["Deadlift"],
+    "Sentadilla Búlgara": ["Bulgarian Split Squat", "Búlgara"],
+    "Curl Femoral": ["Leg Curl", "Femoral Acostado"],
+    "Leg Extension Unilateral": ["Extensión de Cuádriceps Unilateral"],
+}
+
+def normalize_name(name: str) -> str:
+    """Minúsculas, sin acentos ni espacios repetidos (para comparar nombres de ejercicios)"""
+    text = unicodedata.normalize("NFKD", str(name)).encode("ascii", "ignore").decode()
+    return " ".join(text.lower().split())
+
+class ExerciseCatalog:
+    """Catálogo de ejercicios con IDs enteros, alias y búsqueda por prefijo o aproximada.
+
+    El ID de cada ejercicio es su código en EXERCISES, el mismo que guardan las columnas
+    categóricas del historial, así que filtrar por ID es comparar enteros. Los nombres se
+    comparan normalizados (normalize_name). La búsqueda usa una lista ordenada de claves y de
+    cada palabra de las claves (prefijos con bisect) y un índice de trigramas para los errores
+    de tipeo. Los ejercicios personalizados y los alias nuevos se guardan en el archivo del
+    atleta asociado con attach() (JSON pequeño, sin pandas), así otros procesos los reconocen.
+    """
+
+    FUZZY_MIN = 0.3  # similitud de trigramas (Dice) mínima para sugerir un nombre
+
+    def __init__(self, pool: Dict[str, List[str]], aliases: Dict[str, List[str]]):
+        self._pool = pool
+        self._aliases = aliases
+        self._build()
+
+    def _build(self) -> None:
+        """Estado base: solo los ejercicios y alias de la app, sin los de ningún atleta"""
+        self.file: Optional[str] = None
+        self.groups: Dict[int, str] = {}
+        self.keys: Dict[str, int] = {}
+        self._words: List[tuple] = []
+        self._sorted = True
+        self._grams: Dict[str, set] = {}
+        self._key_grams: Dict[str, set] = {}
+        for routine, exercises in self._pool.items():
+            for exercise in exercises:
+                self.add(exercise, routine)
+        for day in REST_DAYS:
+            self.add(day, day)
+        for exercise, names in self._aliases.items():
+            for alias in names:
+                self.add_alias(exercise, alias)
+        self._base_keys = len(self.keys)
+
+    def __contains__(self, name: str) -> bool:
+        return normalize_name(name) in self.keys
+
+    def attach(self, file_name: str) -> None:
+        """Carga los ejercicios personalizados y alias guardados y guarda allí los siguientes.
+
+        Lo agregado para el atleta anterior (personalizados, alias, nombres de su historial) se
+        descarta antes: el catálogo es de un solo atleta a la vez.
+        """
+        if self.file == file_name:
+            return
+        if len(self.keys) != self._base_keys:
+            self._build()
+        self.file = None  # lo que se carga no se vuelve a escribir
+        data = self._read(file_name)
+        for name, group in data["custom"].items():
+            self.add(name, group)
+        for alias, name in data["aliases"].items():
+            try:
+                self.add_alias(self.resolve(name) or name, alias)
+            except (KeyError, ValueError) as e:
+                print(f"Alias ignorado en {file_name}: {e}")
+        self.file = file_name
+
+    @staticmethod
+    def _read(file_name: str) -> Dict[str, Dict[str, str]]:
+        data = {"custom": {}, "aliases": {}}
+        if os.path.exists(file_name):
+            with open(file_name, encoding="utf-8") as f:
+                data.update(json.load(f))
+        return data
+
+    def _persist(self, section: str, key: str, value: str) -> None:
+        if self.file is None:
+            return
+        with FileLock(self.file):
+            # Se relee bajo el bloqueo para no pisar lo que agregó otro proceso
+            data = self._read(self.file)
+            data[section][key] = value
+
+            def write(path: str):
+                with open(path, "w", encoding="utf-8") as f:
+                    json.dump(data, f, ensure_ascii=False, indent=2, sort_keys=True)
+            atomic_replace(self.file, write)
+
+    def __len__(self) -> int:
+        return len(self.groups)
+
+    def id(self, name: str) -> Optional[int]:
+        """ID canónico de un nombre o alias (None si no está en el catálogo)"""
+        return self.keys.get(normalize_name(name))
+
+    def name(self, exercise_id: int) -> str:
+        return EXERCISES.names[exercise_id]
+
+    def resolve(self, name: str) -> Optional[str]:
+        """Nombre canónico de un nombre o alias escrito de cualquier forma"""
+        exercise_id = self.id(name)
+        return None if exercise_id is None else self.name(exercise_id)
+
+    def group(self, name: str, default: str = "Otros") -> str:
+        exercise_id = self.id(name)
+        return self.groups.get(exercise_id, default) if exercise_id is not None else default
+
+    def add(self, name: str, group: str = "Otros", persist: bool = True) -> int:
+        """Registra un ejercicio (si ya existe, con cualquier escritura, devuelve su ID).
+
+        Con persist=False solo queda en memoria (nombres que ya están en el historial).
+        """
+        exercise_id = self.id(name)
+        if exercise_id is None:
+            exercise_id = EXERCISES.code(name)
+            self.groups[exercise_id] = group
+            self._index(normalize_name(name), exercise_id)
+            if persist:
+                self._persist("custom", name, group)
+        return exercise_id
+
+    def add_alias(self, name: str, alias: str) -> None:
+        exercise_id = self.id(name)
+        if exercise_id is None:
+            raise KeyError(f"Ejercicio desconocido: {name}")
+        key = normalize_name(alias)
+        if self.keys.get(key, exercise_id) != exercise_id:
+            raise ValueError(f"El alias {alias!r} ya corresponde a {self.name(self.keys[key])}")
+        if key not in self.keys:
+            self._index(key, exercise_id)
+            self._persist("aliases", alias, self.name(exercise_id))
+
+    def _index(self, key: str, exercise_id: int) -> None:
+        if key in self.keys:
+            return
+        self.keys[key] = exercise_id
+        words = key.split()
+        for start in range(len(words)):
+            self._words.append((" ".join(words[start:]), start, key))
+        self._sorted = False
+        grams = self._trigrams(key)
+        self._key_grams[key] = grams
+        for gram in grams:
+            self._grams.setdefault(gram, set()).add(key)
+
+    @staticmethod
+    def _trigrams(key: str) -> set:
+        padded = f"  {key} "
+        return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+    def search(self, query: str, limit: int = 10, within: Optional[List[str]] = None) -> List[str]:
+        """Nombres canónicos que coinciden con la consulta, primero por prefijo y después aproximados.
+
+        within limita el resultado a esos nombres (p. ej. los ejercicios con historial); los que no
+        están en el catálogo se ignoran, la búsqueda no registra nada.
+        """
+        query = normalize_name(query)
+        allowed = None if within is None else {self.keys[key] for key in map(normalize_name, within)
+                                                if key in self.keys}
+        found: Dict[int, None] = {}
+
+        def take(exercise_id: int) -> bool:
+            if allowed is None or exercise_id in allowed:
+                found.setdefault(exercise_id)
+            return len(found) >= limit
+
+        if not query:
+            ids = sorted(allowed if allowed is not None else self.groups, key=lambda i: normalize_name(self.name(i)))
+            return [self.name(i) for i in ids[:limit]]
+        if query in self.keys and take(self.keys[query]):
+            return [self.name(i) for i in found]
+
+        # Prefijos: el comienzo del nombre pesa más que el de una palabra interior
+        if not self._sorted:
+            self._words.sort()
+            self._sorted = True
+        position = bisect.bisect_left(self._words, (query,))
+        prefixed = []
+        while position < len(self._words) and self._words[position][0].startswith(query):
+            _, start, key = self._words[position]
+            prefixed.append((start, key))
+            position += 1
+        for _, key in sorted(prefixed):
+            if take(self.keys[key]):
+                return [self.name(i) for i in found]
+
+        # Aproximados: trigramas compartidos (coeficiente de Dice) con cada clave candidata
+        grams = self._trigrams(query)
+        shared: Dict[str, int] = {}
+        for gram in grams:
+            for key in self._grams.get(gram, ()):
+                shared[key] = shared.get(key, 0) + 1
+        scored = sorted(((2 * count / (len(grams) + len(self._key_grams[key])), key) for key, count in shared.items()),
+                        reverse=True)
+        for score, key in scored:
+            if score < self.FUZZY_MIN or take(self.keys[key]):
+                break
+        return [self.name(i) for i in found]
+
+    def key_map(self) -> Dict[str, tuple]:
+        """Clave normalizada (nombre o alias) -> (nombre canónico, grupo)"""
+        return {key: (self.name(i), self.groups[i]) for key, i in self.keys.items()}
+
+CATALOG = ExerciseCatalog(EXERCISE_POOL, EXERCISE_ALIASES)
+
+class FileLock:
+    """Bloqueo consultivo entre procesos sobre '<archivo>.lock' (reentrante dentro del mismo hilo).
+
+    Los anexos toman el bloqueo compartido, así que no se esperan entre sí; solo las
+    reescrituras completas (metas, compactación) toman el exclusivo. Cada hilo abre su propio
+    descriptor, así que los hilos de un mismo proceso también se excluyen entre sí.
+    """
+
+    _local = threading.local()  # por hilo: ruta del .lock -> [descriptor, profundidad, compartido]
+
+    def __init__(self, file_name: str, shared: bool = False):
+        self.path = file_name + ".lock"
+        self.shared = shared
+
+    @classmethod
+    def _held(cls) -> Dict[str, List]:
+        if not hasattr(cls._local, "held"):
+            cls._local.held = {}
+        return cls._local.held
+
+    def __enter__(self):
+        held = self._held().get(self.path)
+        if held:
+            # Dentro de un exclusivo vale cualquier pedido; pasar de compartido a exclusivo no es
+            # atómico con flock (otro proceso podría entrar en medio), así que se rechaza
+            if held[2] and not self.shared:
+                raise RuntimeError(f"{self.path}: se pidió bloqueo exclusivo teniendo el compartido")
+            held[1] += 1
+            return self
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)  # primer archivo de un atleta nuevo
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        if fcntl:
+            fcntl.flock(fd, fcntl.LOCK_SH if self.shared else fcntl.LOCK_EX)
+        else:
+            msvcrt.locking(fd, msvcrt.LK_LOCK, 1)  # Windows solo ofrece bloqueo exclusivo
+        self._held()[self.path] = [fd, 1, self.shared]
+        return self
+
+    def __exit__(self, *exc):
+        locks = self._held()
+        held = locks[self.path]
+        held[1] -= 1
+        if held[1] == 0:
+            if fcntl:
+                fcntl.flock(held[0], fcntl.LOCK_UN)
+            else:
+                os.lseek(held[0], 0, os.SEEK_SET)
+                msvcrt.locking(held[0], msvcrt.LK_UNLCK, 1)
+            os.close(held[0])
+            del locks[self.path]
+
+def atomic_replace(file_name: str, write: Callable[[str], None]) -> None:
+    """Escribe en un temporal del mismo directorio y lo sustituye con os.replace (nunca queda a medias)"""
+    directory = os.path.dirname(file_name) or "."
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-", suffix="-" + os.path.basename(file_name))
+    os.close(fd)
+    try:
+        # mkstemp crea el archivo con 0600: se conservan los permisos del original
+        os.chmod(temp_path, os.stat(file_name).st_mode & 0o777 if os.path.exists(file_name) else 0o644)
+        write(temp_path)
+        with open(temp_path, "rb") as f:
+            os.fsync(f.fileno())
+        os.replace(temp_path, file_name)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+ROW_ID_EPOCH_US = 1_577_836_800_000_000  # 2020-01-01 en microsegundos
+ROW_ID_BLOCK = 4096  # IDs que reserva cada proceso por acceso al contador
+_row_id_blocks: Dict[str, List[int]] = {}  # contador -> [siguiente, fin] del bloque reservado
+_row_id_lock = threading.Lock()
+os.register_at_fork(after_in_child=_row_id_blocks.clear)  # un hijo no reparte los IDs del padre
+
+def _reserve_row_ids(counter: str, count: int) -> int:
+    """Avanza el contador persistido bajo su bloqueo y devuelve el primer ID reservado.
+
+    Un contador nuevo arranca en el reloj (microsegundos desde 2020 << 12), por encima de los IDs
+    que dieron versiones anteriores, así que los IDs siguen creciendo en el orden de registro.
+    """
+    with FileLock(counter):
+        start = 0
+        if os.path.exists(counter):
+            with open(counter, encoding="utf-8") as f:
+                start = int(f.read().strip() or 0)
+        start = start or (time.time_ns() // 1000 - ROW_ID_EPOCH_US) << 12
+
+        def write(path: str):
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(str(start + count))
+        atomic_replace(counter, write)  # con fsync: tras una caída nunca se reparte dos veces un ID
+    return start
+
+def new_row_ids(file_name: str, count: int = 1) -> range:
+    """IDs de fila únicos de una tabla, también entre procesos (contador en '<tabla>.ids').
+
+    Cada proceso reserva bloques de ROW_ID_BLOCK, así que registrar una serie casi nunca toca el disco.
+    """
+    counter = file_name + ".ids"
+    with _row_id_lock:
+        block = _row_id_blocks.get(counter)
+        if block is None or block[1] - block[0] < count:
+            size = max(count, ROW_ID_BLOCK)
+            start = _reserve_row_ids(counter, size)
+            block = _row_id_blocks[counter] = [start, start + size]
+        ids = range(block[0], block[0] + count)
+        block[0] += count
+    return ids
+
+class JournalWriter:
+    """Escritor de solo-anexo: acumula filas y las escribe en bloque con un único write + fsync"""
+
+    def __init__(self, max_pending: int = 1000):
+        self.max_pending = max_pending
+        self._pending: Dict[str, List[Dict]] = {}
+        self._columns: Dict[str, List[str]] = {}
+
+    def append(self, rows: List[Dict], file_name: str, columns: Optional[List[str]] = None) -> None:
+        if not rows:
+            return
+        buffer = self._pending.setdefault(file_name, [])
+        buffer.extend(rows)
+        if columns:
+            self._columns[file_name] = columns
+        if len(buffer) >= self.max_pending:
+            self.flush(file_name)
+
+    def flush(self, file_name: Optional[str] = None) -> None:
+        """Escribe las filas pendientes (de un archivo o de todos).
+
+        Las filas salen de la cola solo cuando ya están en disco: si la escritura falla, el error
+        se propaga y quedan pendientes para el próximo intento.
+        """
+        targets = [file_name] if file_name else list(self._pending)
+        for target in targets:
+            rows = self._pending.get(target)
+            if rows:
+                self._write(target, rows)
+            self._pending.pop(target, None)
+
+    def discard(self, file_name: str) -> None:
+        """Olvida las filas pendientes de un archivo sin escribirlas (un lote cuyo error ya se informó)"""
+        self._pending.pop(file_name, None)
+
+    def _write(self, file_name: str, rows: List[Dict]) -> None:
+        wanted = self._columns.get(file_name) or list(rows[0].keys())
+        header = self._read_header(file_name)
+        # Crear el archivo o agregarle columnas (su cabecera) es lo único que necesita exclusividad
+        with FileLock(file_name, shared=bool(header) and set(wanted) <= set(header)):
+            existing_header = self._read_header(file_name)
+            if existing_header and not set(wanted) <= set(existing_header):
+                existing_header = self._extend_header(file_name, existing_header, wanted)
+            columns = existing_header or wanted
+
+            text = io.StringIO()
+            writer = csv.DictWriter(text, fieldnames=columns, extrasaction="ignore", lineterminator="\n")
+            if not existing_header:
+                writer.writeheader()
+            writer.writerows(rows)
+
+            # O_APPEND + un solo write: varios procesos pueden anexar a la vez sin intercalar filas
+            data = text.getvalue().encode("utf-8")
+            fd = os.open(file_name, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                written = os.write(fd, data)
+                while written < len(data):
+                    written += os.write(fd, data[written:])
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+
+    @staticmethod
+    def _read_header(file_name: str) -> List[str]:
+        """Devuelve la cabecera existente para escribirla una sola vez y respetar su orden"""
+        if not os.path.exists(file_name) or os.path.getsize(file_name) == 0:
+            return []
+        with open(file_name, newline="", encoding="utf-8") as f:
+            return next(csv.reader(f), [])
+
+    @staticmethod
+    def _extend_header(file_name: str, header: List[str], columns: List[str]) -> List[str]:
+        """Agrega al final las columnas que faltan (el ID en archivos de versiones anteriores).
+
+        Reescribe el archivo una sola vez, línea por línea; las filas existentes quedan con esas columnas vacías.
+        """
+        header = header + [c for c in columns if c not in header]
+
+        def write(path: str):
+            with open(file_name, newline="", encoding="utf-8") as source, \
+                    open(path, "w", newline="", encoding="utf-8") as target:
+                reader = csv.reader(source)
+                next(reader, None)
+                writer = csv.writer(target, lineterminator="\n")
+                writer.writerow(header)
+                writer.writerows(row + [""] * (len(header) - len(row)) for row in reader if row)
+        atomic_replace(file_name, write)
+        return header
+
+class StorageBackend(ABC):
+    """Interfaz común para los motores de almacenamiento de las tablas del tracker.
+
+    Un motor al que le falte una operación abstracta no se puede instanciar.
+    """
+
+    name = "base"
+    indexed = False
+
+    def is_indexed(self, file_name: str) -> bool:
+        """Si el motor responde las consultas por ejercicio y fecha sin cargar toda la tabla"""
+        return self.indexed
+
+    @abstractmethod
+    def exists(self, file_name: str) -> bool:
+        """Si la tabla tiene datos guardados"""
+
+    @abstractmethod
+    def load(self, file_name: str) -> pd.DataFrame:
+        """Tabla completa con los tipos de TABLE_SCHEMAS (vacía si no existe)"""
+
+    def load_range(self, file_name: str, start: Optional[datetime] = None, end: Optional[datetime] = None,
+                   exercises: Optional[List[str]] = None) -> pd.DataFrame:
+        """Filas con fecha entre start y end (y de esos ejercicios); los motores que pueden no leen el resto"""
+        return self.filter_range(self.load(file_name), start, end, exercises)
+
+    @abstractmethod
+    def drop(self, file_name: str) -> None:
+        """Borra la tabla"""
+
+    def iter_chunks(self, file_name: str, chunk_size: int) -> Iterator[pd.DataFrame]:
+        """Recorre la tabla en bloques de hasta chunk_size filas; los motores que pueden no la cargan entera"""
+        data = self.load(file_name)
+        for start in range(0, len(data), chunk_size):
+            yield data.iloc[start:start + chunk_size]
+
+    @abstractmethod
+    def append(self, rows: List[Dict], file_name: str, columns: Optional[List[str]] = None) -> None:
+        """Encola filas; llegan al disco con flush"""
+
+    @abstractmethod
+    def replace(self, data: pd.DataFrame, file_name: str) -> None:
+        """Reescribe la tabla entera con data"""
+
+    def compact_changes(self, data: pd.DataFrame, changes: pd.DataFrame, file_name: str) -> None:
+        """Guarda la tabla con sus cambios ya aplicados (data); los archivos se reescriben enteros"""
+        self.replace(data, file_name)
+
+    def flush(self, file_name: Optional[str] = None) -> None:
+        pass
+
+    def discard(self, file_name: str) -> None:
+        """Descarta lo anexado y aún no escrito de una tabla"""
+        pass
+
+    @staticmethod
+    def apply_schema(data: pd.DataFrame, file_name: str) -> pd.DataFrame:
+        """Convierte las columnas presentes a los tipos compactos definidos en TABLE_SCHEMAS"""
+        for column, dtype in TABLE_SCHEMAS.get(os.path.basename(file_name), {}).items():
+            if column not in data.columns:
+                continue
+            if dtype == "category" and column in VOCABULARIES:
+                data[column] = VOCABULARIES[column].categorize(data[column])
+                continue
+            if data[column].dtype == dtype:
+                continue
+            if dtype == "datetime64[ns]":
+                if pd.api.types.is_datetime64_dtype(data[column]):
+                    continue  # pandas 3 lee las fechas como datetime64[us]: ya están convertidas
+                data[column] = pd.to_datetime(data[column], format="%Y-%m-%d", errors="coerce")
+            else:
+                data[column] = data[column].astype(dtype)
+        return data
+
+    @staticmethod
+    def concat(frames: List[pd.DataFrame], file_name: str) -> pd.DataFrame:
+        """Une trozos de una misma tabla; con categorías compartidas las columnas no pasan por texto"""
+        frames = [StorageBackend.apply_schema(frame, file_name) for frame in frames if not frame.empty]
+        if len(frames) <= 1:
+            return frames[0] if frames else pd.DataFrame()
+        # Los primeros trozos pudieron tipificarse antes de que el vocabulario creciera con los siguientes
+        frames = [StorageBackend.apply_schema(frame, file_name) for frame in frames]
+        return pd.concat(frames, ignore_index=True)
+
+    @staticmethod
+    def filter_range(data: pd.DataFrame, start: Optional[datetime] = None, end: Optional[datetime] = None,
+                     exercises: Optional[List[str]] = None) -> pd.DataFrame:
+        if data.empty:
+            return data
+        mask = np.ones(len(data), dtype=bool)
+        if start is not None:
+            mask &= (data["Fecha"] >= pd.Timestamp(start)).to_numpy()
+        if end is not None:
+            mask &= (data["Fecha"] <= pd.Timestamp(end)).to_numpy()
+        if exercises is not None:
+            mask &= data["Ejercicio"].isin(exercises).to_numpy()
+        return data if mask.all() else data[mask]
+
+class CSVBackend(StorageBackend):
+    """Archivos CSV de texto (formato original); los anexos pasan por el diario"""
+
+    name = "csv"
+
+    def __init__(self):
+        self.journal = JournalWriter()
+
+    def exists(self, file_name: str) -> bool:
+        return os.path.exists(file_name)
+
+    @staticmethod
+    def _read_options(file_name: str) -> Dict:
+        """Tipos de TABLE_SCHEMAS para read_csv (solo de las columnas presentes en la cabecera)"""
+        header = JournalWriter._read_header(file_name)
+        schema = TABLE_SCHEMAS.get(os.path.basename(file_name), {})
+        dates = [c for c in header if schema.get(c) == "datetime64[ns]"]
+        dtypes = {c: schema[c] for c in header if c in schema and c not in dates}
+        return {"dtype": dtypes, "parse_dates": dates, "date_format": "%Y-%m-%d"}
+
+    def load(self, file_name: str) -> pd.DataFrame:
+        if not os.path.exists(file_name):
+            return pd.DataFrame()
+        with FileLock(file_name, shared=True):
+            data = pd.read_csv(file_name, **self._read_options(file_name))
+        return self.apply_schema(data, file_name)
+
+    def iter_chunks(self, file_name: str, chunk_size: int) -> Iterator[pd.DataFrame]:
+        if not os.path.exists(file_name):
+            return
+        with FileLock(file_name, shared=True):
+            with pd.read_csv(file_name, chunksize=chunk_size, **self._read_options(file_name)) as reader:
+                for chunk in reader:
+                    yield self.apply_schema(chunk, file_name)
+
+    def append(self, rows: List[Dict], file_name: str, columns: Optional[List[str]] = None) -> None:
+        self.journal.append(rows, file_name, columns)
+
+    def replace(self, data: pd.DataFrame, file_name: str) -> None:
+        with FileLock(file_name):
+            atomic_replace(file_name, lambda path: data.to_csv(
+                path, mode="w", index=False, header=True, date_format="%Y-%m-%d"))
+
+    def flush(self, file_name: Optional[str] = None) -> None:
+        self.journal.flush(file_name)
+
+    def discard(self, file_name: str) -> None:
+        self.journal.discard(file_name)
+
+    def drop(self, file_name: str) -> None:
+        with FileLock(file_name):
+            if os.path.exists(file_name):
+                os.remove(file_name)
+
+class ColumnarBackend(StorageBackend):
+    """Archivos binarios tipados (Parquet/Feather) guardados como partes dentro de un directorio"""
+
+    def __init__(self, fmt: str = "parquet", max_parts: int = 64):
+        import pyarrow  # noqa: F401  (dependencia opcional, falla aquí si no está instalada)
+        self.name = fmt
+        self.max_parts = max_parts
+        self._pending: Dict[str, List[Dict]] = {}
+
+    def path(self, file_name: str) -> str:
+        return os.path.splitext(file_name)[0] + f".{self.name}"
+
+    def _parts(self, file_name: str) -> List[str]:
+        directory = self.path(file_name)
+        if not os.path.isdir(directory):
+            return []
+        return sorted(os.path.join(directory, f) for f in os.listdir(directory) if f.endswith(f".{self.name}"))
+
+    def exists(self, file_name: str) -> bool:
+        return bool(self._parts(file_name))
+
+    def _read_part(self, part: str) -> pd.DataFrame:
+        return pd.read_parquet(part) if self.name == "parquet" else pd.read_feather(part)
+
+    def _write_part(self, data: pd.DataFrame, file_name: str) -> str:
+        directory = self.path(file_name)
+        os.makedirs(directory, exist_ok=True)
+        part = os.path.join(directory, f"part-{time.time_ns():020d}-{os.getpid()}.{self.name}")
+        data = self.apply_schema(data.reset_index(drop=True), file_name)
+        # Las partes aparecen ya completas: se escriben aparte y se renombran
+        if self.name == "parquet":
+            atomic_replace(part, lambda path: data.to_parquet(path, index=False))
+        else:
+            atomic_replace(part, lambda path: data.to_feather(path))
+        return part
+
+    def load(self, file_name: str) -> pd.DataFrame:
+        if not self.exists(file_name):
+            return pd.DataFrame()
+        with FileLock(file_name, shared=True):
+            parts = [self._read_part(p) for p in self._parts(file_name)]
+        return self.concat(parts, file_name)
+
+    def iter_chunks(self, file_name: str, chunk_size: int) -> Iterator[pd.DataFrame]:
+        """Lotes de cada parte sin cargarla entera (Parquet por grupos de filas, Feather por lotes IPC)"""
+        import pyarrow.ipc
+        import pyarrow.parquet
+        if not self.exists(file_name):
+            return
+        with FileLock(file_name, shared=True):
+            for part in self._parts(file_name):
+                if self.name == "parquet":
+                    batches = pyarrow.parquet.ParquetFile(part).iter_batches(batch_size=chunk_size)
+                else:
+                    reader = pyarrow.ipc.open_file(part)
+                    batches = (reader.get_batch(i) for i in range(reader.num_record_batches))
+                for batch in batches:
+                    yield self.apply_schema(batch.to_pandas(), file_name)
+
+    def append(self, rows: List[Dict], file_name: str, columns: Optional[List[str]] = None) -> None:
+        if rows:
+            self._pending.setdefault(file_name, []).extend(rows)
+
+    def flush(self, file_name: Optional[str] = None) -> None:
+        targets = [file_name] if file_name else list(self._pending)
+        for target in targets:
+            rows = self._pending.get(target)
+            if not rows:
+                continue
+            with FileLock(target, shared=True):
+                self._write_part(pd.DataFrame(rows), target)
+            del self._pending[target]  # solo con la parte ya escrita; si falla, quedan para reintentar
+            if len(self._parts(target)) > self.max_parts:
+                self.compact(target)
+
+    def discard(self, file_name: str) -> None:
+        self._pending.pop(file_name, None)
+
+    def replace(self, data: pd.DataFrame, file_name: str) -> None:
+        with FileLock(file_name):
+            old_parts = self._parts(file_name)
+            self._write_part(data, file_name)
+            for part in old_parts:
+                os.remove(part)
+
+    def compact(self, file_name: str) -> None:
+        """Une todas las partes en una sola"""
+        with FileLock(file_name):
+            self.replace(self.load(file_name), file_name)
+
+    def drop(self, file_name: str) -> None:
+        with FileLock(file_name):
+            shutil.rmtree(self.path(file_name), ignore_errors=True)
+
+class SQLiteBackend(StorageBackend):
+    """Base de datos SQLite (solo stdlib) con índice compuesto (ejercicio, fecha) para consultas directas"""
+
+    name = "sqlite"
+    indexed = True
+    DB_FILE = "gym_tracker.db"
+
+    # archivo lógico -> (tabla, {columna del DataFrame: columna SQL})
+    TABLES = {
+        WORKOUT_FILE: ("workouts", {"Fecha": "fecha", "Rutina": "rutina", "Ejercicio": "ejercicio",
+                                    "Repeticiones": "repeticiones", "Peso (kg)": "peso_kg", "ID": "id"}),
+        GOALS_FILE: ("goals", {"Ejercicio": "ejercicio", "Meta Peso (kg)": "meta_peso_kg",
+                               "Meta Reps": "meta_reps", "Fecha Límite": "fecha_limite"}),
+        WEIGHT_FILE: ("body_weight", {"Fecha": "fecha", "Peso (kg)": "peso_kg", "ID": "id"}),
+        CHANGES_FILES[WORKOUT_FILE]: ("workout_changes", {
+            "ID": "fila", "Cambio": "cambio", "Fecha": "fecha", "Rutina": "rutina", "Ejercicio": "ejercicio",
+            "Repeticiones": "repeticiones", "Peso (kg)": "peso_kg"}),
+        CHANGES_FILES[WEIGHT_FILE]: ("body_weight_changes", {
+            "ID": "fila", "Cambio": "cambio", "Fecha": "fecha", "Peso (kg)": "peso_kg"}),
+    }
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS workouts (
+            id INTEGER PRIMARY KEY, fecha TEXT NOT NULL, rutina TEXT, ejercicio TEXT,
+            repeticiones INTEGER, peso_kg REAL);
+        CREATE INDEX IF NOT EXISTS idx_workouts_ejercicio_fecha
+            ON workouts (ejercicio, fecha, peso_kg, repeticiones);
+        CREATE TABLE IF NOT EXISTS goals (
+            ejercicio TEXT PRIMARY KEY, meta_peso_kg REAL, meta_reps INTEGER, fecha_limite TEXT);
+        CREATE TABLE IF NOT EXISTS body_weight (id INTEGER PRIMARY KEY, fecha TEXT NOT NULL, peso_kg REAL);
+        CREATE INDEX IF NOT EXISTS idx_body_weight_fecha ON body_weight (fecha);
+        CREATE TABLE IF NOT EXISTS workout_changes (
+            id INTEGER PRIMARY KEY, fila INTEGER NOT NULL, cambio TEXT NOT NULL, fecha TEXT, rutina TEXT,
+            ejercicio TEXT, repeticiones INTEGER, peso_kg REAL);
+        CREATE TABLE IF NOT EXISTS body_weight_changes (
+            id INTEGER PRIMARY KEY, fila INTEGER NOT NULL, cambio TEXT NOT NULL, fecha TEXT, peso_kg REAL);
+    """
+
+    def __init__(self):
+        self._connections: Dict[str, sqlite3.Connection] = {}
+        self._pending: Dict[str, List[Dict]] = {}
+
+    def _connect(self, file_name: str, create: bool = False) -> sqlite3.Connection:
+        """Una conexión por directorio de datos (la base vive junto a los archivos lógicos).
+
+        Leer de un directorio que aún no existe da una base vacía en memoria: solo las
+        escrituras (create=True) crean el directorio.
+        """
+        directory = os.path.dirname(file_name)
+        db_path = os.path.join(directory, self.DB_FILE)
+        connection = self._connections.get(db_path)
+        if connection is None and directory and not os.path.isdir(directory):
+            if not create:
+                connection = sqlite3.connect(":memory:", check_same_thread=False)
+                connection.executescript(self.SCHEMA)
+                return connection
+            os.makedirs(directory, exist_ok=True)
+        if connection is None:
+            # SQLite gestiona sus propios bloqueos; WAL permite leer mientras otro proceso escribe.
+            # El servicio escribe desde su hilo de group commit y consulta desde el bucle de eventos.
+            connection = sqlite3.connect(db_path, timeout=30, check_same_thread=False)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.executescript(self.SCHEMA)
+            self._connections[db_path] = connection
+        return connection
+
+    def _table(self, file_name: str):
+        return self.TABLES[os.path.basename(file_name)]
+
+    def exists(self, file_name: str) -> bool:
+        """Las tablas se crean al conectar, así que siempre existen (aunque estén vacías)"""
+        self._connect(file_name)
+        return True
+
+    def _select_all(self, file_name: str) -> str:
+        table, columns = self._table(file_name)
+        select = ", ".join(f'{sql} AS "{col}"' for col, sql in columns.items())
+        return f"SELECT {select} FROM {table} ORDER BY rowid"
+
+    def load(self, file_name: str) -> pd.DataFrame:
+        data = pd.read_sql_query(self._select_all(file_name), self._connect(file_name))
+        return self.apply_schema(data, file_name)
+
+    def iter_chunks(self, file_name: str, chunk_size: int) -> Iterator[pd.DataFrame]:
+        for chunk in pd.read_sql_query(self._select_all(file_name), self._connect(file_name), chunksize=chunk_size):
+            yield self.apply_schema(chunk, file_name)
+
+    def append(self, rows: List[Dict], file_name: str, columns: Optional[List[str]] = None) -> None:
+        if rows:
+            self._pending.setdefault(file_name, []).extend(rows)
+
+    def flush(self, file_name: Optional[str] = None) -> None:
+        targets = [file_name] if file_name else list(self._pending)
+        for target in targets:
+            rows = self._pending.get(target)
+            if rows:
+                with self._connect(target, create=True) as connection:  # una transacción: si falla, no queda nada a medias
+                    self._insert(connection, target, rows)
+            self._pending.pop(target, None)
+
+    def discard(self, file_name: str) -> None:
+        self._pending.pop(file_name, None)
+
+    def replace(self, data: pd.DataFrame, file_name: str) -> None:
+        table, _ = self._table(file_name)
+        with self._connect(file_name, create=True) as connection:
+            connection.execute(f"DELETE FROM {table}")  # misma transacción que la inserción
+            self._insert(connection, file_name, data.to_dict("records"))
+
+    def drop(self, file_name: str) -> None:
+        table, _ = self._table(file_name)
+        with self._connect(file_name, create=True) as connection:
+            connection.execute(f"DELETE FROM {table}")
+
+    def compact_changes(self, data: pd.DataFrame, changes: pd.DataFrame, file_name: str) -> None:
+        """Solo toca las filas cambiadas: las borra por ID (clave primaria) y reinserta las corregidas"""
+        table, _ = self._table(file_name)
+        ids = changes["ID"].dropna().astype("int64").unique()
+        corrected = data[data["ID"].isin(ids)]
+        with self._connect(file_name, create=True) as connection:
+            connection.executemany(f"DELETE FROM {table} WHERE id = ?", ((int(i),) for i in ids))
+            self._insert(connection, file_name, corrected.to_dict("records"))
+
+    def _insert(self, connection: sqlite3.Connection, file_name: str, rows: List[Dict]) -> None:
+        table, columns = self._table(file_name)
+        names = list(columns)
+        placeholders = ", ".join("?" * len(names))
+        connection.executemany(
+            f"INSERT OR REPLACE INTO {table} ({', '.join(columns.values())}) VALUES ({placeholders})",
+            ([self._to_sql(row.get(col)) for col in names] for row in rows)
+        )
+
+    @staticmethod
+    def _to_sql(value):
+        """Convierte a tipos de sqlite3 sin depender de pandas (el registro no debe importarlo)"""
+        if value is None or (isinstance(value, float) and math.isnan(value)) \
+                or type(value).__name__ in ("NaTType", "NAType"):  # campos vacíos de las tablas de cambios
+            return None
+        if isinstance(value, datetime):  # incluye pd.Timestamp
+            return value.strftime("%Y-%m-%d")
+        return value.item() if hasattr(value, "item") else value
+
+    # Consultas indexadas sobre entrenamientos (no cargan el historial en pandas)
+
+    def exercise_summary(self, file_name: str) -> Dict[str, Dict]:
+        """Agregados por ejercicio con el formato de PersonalRecordIndex"""
+        rows = self._connect(file_name).execute("""
+            SELECT ejercicio, MAX(peso_kg), MAX(repeticiones), MAX(peso_kg * (1 + repeticiones / 30.0)),
+                   SUM(peso_kg * repeticiones), MAX(fecha)
+            FROM workouts GROUP BY ejercicio ORDER BY MIN(id)
+        """).fetchall()
+        return {row[0]: dict(zip(PersonalRecordIndex.FIELDS, (*row[1:5], pd.Timestamp(row[5]))))
+                for row in rows}
+
+    def exercise_max(self, file_name: str, exercise: str, until: Optional[datetime] = None) -> Dict[str, float]:
+        query = "SELECT MAX(peso_kg), MAX(repeticiones) FROM workouts WHERE ejercicio = ?"
+        params = [exercise]
+        if until is not None:
+            query += " AND fecha <= ?"
+            params.append(until.strftime("%Y-%m-%d"))
+        maxima = self._connect(file_name).execute(query, params).fetchone()
+        return {col: float("nan") if value is None else value
+                for col, value in zip(("Peso (kg)", "Repeticiones"), maxima)}
+
+    def exercise_history(self, file_name: str, exercise: str, start: Optional[datetime] = None,
+                         end: Optional[datetime] = None) -> pd.DataFrame:
+        _, columns = self._table(file_name)
+        select = ", ".join(f'{sql} AS "{col}"' for col, sql in columns.items())
+        query = f"SELECT {select} FROM workouts WHERE ejercicio = ?"
+        params = [exercise]
+        if start is not None:
+            query += " AND fecha >= ?"
+            params.append(start.strftime("%Y-%m-%d"))
+        if end is not None:
+            query += " AND fecha <= ?"
+            params.append(end.strftime("%Y-%m-%d"))
+        data = pd.read_sql_query(query + " ORDER BY fecha, id", self._connect(file_name), params=params)
+        return self.apply_schema(data, file_name)
+
+def _date_text(value) -> str:
+    """'YYYY-MM-DD' de un texto, datetime o Timestamp"""
+    return value.strftime("%Y-%m-%d") if hasattr(value, "strftime") else str(value)[:10]
+
+class PartitionedBackend(StorageBackend):
+    """Historial de entrenamientos dividido en particiones por mes o año sobre otro motor.
+
+    Cada partición es una tabla normal del motor interno en '<tabla>/<período>/'. El manifiesto
+    guarda por partición el rango de fechas, las filas y los agregados por ejercicio, así las
+    consultas acotadas leen solo las particiones que se solapan con la ventana pedida.
+    Mientras no exista el manifiesto la tabla sigue siendo un único archivo, como siempre.
+    """
+
+    def __init__(self, inner: StorageBackend):
+        self.inner = inner
+        self.name = inner.name
+        self._pending: Dict[str, Dict[str, Dict]] = {}  # tabla -> período -> estadísticas sin guardar
+
+    def directory(self, file_name: str) -> str:
+        return os.path.splitext(file_name)[0]
+
+    def manifest_path(self, file_name: str) -> str:
+        return os.path.join(self.directory(file_name), f"manifest.{self.name}.json")
+
+    def partition_file(self, file_name: str, period: str) -> str:
+        return os.path.join(self.directory(file_name), period, os.path.basename(file_name))
+
+    def partitioned(self, file_name: str) -> bool:
+        return os.path.basename(file_name) in PARTITIONED_TABLES and os.path.exists(self.manifest_path(file_name))
+
+    def is_indexed(self, file_name: str) -> bool:
+        return self.partitioned(file_name)
+
+    def manifest(self, file_name: str) -> Dict:
+        with open(self.manifest_path(file_name), encoding="utf-8") as f:
+            return json.load(f)
+
+    def _save_manifest(self, file_name: str, manifest: Dict) -> None:
+        def write(path: str):
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(manifest, f, ensure_ascii=False, sort_keys=True)
+        atomic_replace(self.manifest_path(file_name), write)
+
+    def _periods(self, file_name: str) -> List[str]:
+        """Particiones presentes en disco (no depende del manifiesto)"""
+        directory = self.directory(file_name)
+        if not os.path.isdir(directory):
+            return []
+        return sorted(p for p in os.listdir(directory)
+                      if os.path.isdir(os.path.join(directory, p))
+                      and self.inner.exists(self.partition_file(file_name, p)))
+
+    def _load_periods(self, file_name: str, periods: List[str]) -> pd.DataFrame:
+        data = self.concat([self.inner.load(self.partition_file(file_name, p)) for p in periods], file_name)
+        return data if not data.empty else pd.DataFrame(columns=WORKOUT_COLUMNS)
+
+    @staticmethod
+    def _merge_stats(target: Dict, source: Dict) -> None:
+        """Combina las estadísticas de dos trozos de una misma partición"""
+        if not target:
+            target.update(min=source["min"], max=source["max"], rows=0, exercises={})
+        target["min"] = min(target["min"], source["min"])
+        target["max"] = max(target["max"], source["max"])
+        target["rows"] += source["rows"]
+        for exercise, stats in source["exercises"].items():
+            current = target["exercises"].get(exercise)
+            if current is None:
+                target["exercises"][exercise] = list(stats)
+                continue
+            # Mismo orden que PersonalRecordIndex.FIELDS: máximos, volumen acumulado y última fecha
+            target["exercises"][exercise] = [max(current[0], stats[0]), max(current[1], stats[1]),
+                                             max(current[2], stats[2]), current[3] + stats[3],
+                                             max(current[4], stats[4])]
+
+    @staticmethod
+    def _frame_stats(data: pd.DataFrame, periods: pd.Series) -> Dict[str, Dict]:
+        """Estadísticas de manifiesto de una tabla completa con dos agrupaciones"""
+        dates = data["Fecha"].dt.strftime("%Y-%m-%d")
+        weight = data["Peso (kg)"].astype("float64")
+        reps = data["Repeticiones"].astype("int64")
+        frame = pd.DataFrame({"period": periods, "exercise": data["Ejercicio"].astype(str), "date": dates,
+                              "weight": weight, "reps": reps, "e1rm": epley_1rm(weight, reps),
+                              "volume": weight * reps})
+        ranges = frame.groupby("period").agg(min=("date", "min"), max=("date", "max"), rows=("date", "size"))
+        stats = {row.Index: {"min": row.min, "max": row.max, "rows": int(row.rows), "exercises": {}}
+                 for row in ranges.itertuples()}
+        by_exercise = frame.groupby(["period", "exercise"], sort=False).agg(
+            weight=("weight", "max"), reps=("reps", "max"), e1rm=("e1rm", "max"),
+            volume=("volume", "sum"), last=("date", "max"))
+        for row in by_exercise.itertuples():
+            period, exercise = row.Index
+            stats[period]["exercises"][exercise] = [float(row.weight), int(row.reps), float(row.e1rm),
+                                                    float(row.volume), row.last]
+        return stats
+
+    def _select(self, manifest: Dict, start=None, end=None, exercises: Optional[List[str]] = None) -> List[str]:
+        """Particiones que pueden tener filas en la ventana (comparando fechas 'YYYY-MM-DD' como texto)"""
+        start = start and _date_text(start)
+        end = end and _date_text(end)
+        return [period for period, info in sorted(manifest["partitions"].items())
+                if (start is None or info["max"] >= start) and (end is None or info["min"] <= end)
+                and (exercises is None or any(e in info["exercises"] for e in exercises))]
+
+    def exists(self, file_name: str) -> bool:
+        return self.partitioned(file_name) or self.inner.exists(file_name)
+
+    def load(self, file_name: str) -> pd.DataFrame:
+        if not self.partitioned(file_name):
+            return self.inner.load(file_name)
+        with FileLock(file_name, shared=True):
+            return self._load_periods(file_name, self._periods(file_name))
+
+    def load_range(self, file_name: str, start: Optional[datetime] = None, end: Optional[datetime] = None,
+                   exercises: Optional[List[str]] = None) -> pd.DataFrame:
+        if not self.partitioned(file_name):
+            return super().load_range(file_name, start, end, exercises)
+        with FileLock(file_name, shared=True):
+            periods = self._select(self.manifest(file_name), start, end, exercises)
+            return self.filter_range(self._load_periods(file_name, periods), start, end, exercises)
+
+    def iter_chunks(self, file_name: str, chunk_size: int) -> Iterator[pd.DataFrame]:
+        if not self.partitioned(file_name):
+            yield from self.inner.iter_chunks(file_name, chunk_size)
+            return
+        with FileLock(file_name, shared=True):
+            for period in self._periods(file_name):
+                yield from self.inner.iter_chunks(self.partition_file(file_name, period), chunk_size)
+
+    def append(self, rows: List[Dict], file_name: str, columns: Optional[List[str]] = None) -> None:
+        if not self.partitioned(file_name):
+            self.inner.append(rows, file_name, columns)
+            return
+        width = PARTITION_PERIODS[self.manifest(file_name)["granularity"]]
+        groups: Dict[str, List[Dict]] = {}
+        pending = self._pending.setdefault(file_name, {})
+        for row in rows:
+            date = _date_text(row["Fecha"])
+            weight, reps = float(row["Peso (kg)"]), int(row["Repeticiones"])
+            groups.setdefault(date[:width], []).append(row)
+            self._merge_stats(pending.setdefault(date[:width], {}), {
+                "min": date, "max": date, "rows": 1,
+                "exercises": {str(row["Ejercicio"]): [weight, reps, epley_1rm(weight, reps), weight * reps, date]}
+            })
+        for period, group in groups.items():
+            target = self.partition_file(file_name, period)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            self.inner.append(group, target, columns)
+
+    def flush(self, file_name: Optional[str] = None) -> None:
+        if file_name is None:
+            for target in list(self._pending):
+                self.flush(target)
+            self.inner.flush()
+            return
+        pending = self._pending.get(file_name)
+        if not pending:
+            self.inner.flush(file_name)
+            return
+        # Primero los datos y después el manifiesto: una partición nunca figura sin sus filas.
+        # Las estadísticas pendientes se descartan solo con el manifiesto ya guardado
+        with FileLock(file_name, shared=True):
+            for period in pending:
+                self.inner.flush(self.partition_file(file_name, period))
+            with FileLock(self.manifest_path(file_name)):
+                manifest = self.manifest(file_name)
+                for period, stats in pending.items():
+                    self._merge_stats(manifest["partitions"].setdefault(period, {}), stats)
+                self._save_manifest(file_name, manifest)
+        del self._pending[file_name]
+
+    def discard(self, file_name: str) -> None:
+        for period in self._pending.pop(file_name, None) or ():
+            self.inner.discard(self.partition_file(file_name, period))
+        self.inner.discard(file_name)
+
+    def replace(self, data: pd.DataFrame, file_name: str) -> None:
+        if not self.partitioned(file_name):
+            self.inner.replace(data, file_name)
+            return
+        self.write_partitions(data, file_name, self.manifest(file_name)["granularity"])
+
+    def write_partitions(self, data: pd.DataFrame, file_name: str, granularity: str) -> int:
+        """Reescribe la tabla completa como particiones y regenera el manifiesto; devuelve cuántas quedaron"""
+        with FileLock(file_name):
+            stats: Dict[str, Dict] = {}
+            if not data.empty:
+                data = self.apply_schema(data.reset_index(drop=True), file_name)
+                periods = data["Fecha"].dt.strftime("%Y-%m-%d").str[:PARTITION_PERIODS[granularity]]
+                stats = self._frame_stats(data, periods)
+                for period, part in data.groupby(periods.to_numpy(), sort=True):
+                    target = self.partition_file(file_name, period)
+                    os.makedirs(os.path.dirname(target), exist_ok=True)
+                    self.inner.replace(part.reset_index(drop=True), target)
+            for period in set(self._periods(file_name)) - set(stats):
+                self.inner.drop(self.partition_file(file_name, period))
+                # Si no quedan datos de otro formato en la partición, se borra el directorio (y sus .lock)
+                directory = os.path.dirname(self.partition_file(file_name, period))
+                if all(entry.endswith(".lock") for entry in os.listdir(directory)):
+                    shutil.rmtree(directory, ignore_errors=True)
+            os.makedirs(self.directory(file_name), exist_ok=True)
+            self._save_manifest(file_name, {"granularity": granularity, "partitions": stats})
+        return len(stats)
+
+    def drop(self, file_name: str) -> None:
+        self.inner.drop(file_name)
+
+    # Consultas resueltas con el manifiesto; solo se leen las particiones de la ventana
+
+    def exercise_summary(self, file_name: str) -> Dict[str, Dict]:
+        """Agregados por ejercicio con el formato de PersonalRecordIndex, sin leer ninguna partición"""
+        partitions = self.manifest(file_name)["partitions"]
+        merged: Dict[str, Dict] = {}
+        for period in sorted(partitions):
+            self._merge_stats(merged, partitions[period])
+        return {exercise: dict(zip(PersonalRecordIndex.FIELDS, (*stats[:4], pd.Timestamp(stats[4]))))
+                for exercise, stats in merged.get("exercises", {}).items()}
+
+    def exercise_max(self, file_name: str, exercise: str, until: Optional[datetime] = None) -> Dict[str, float]:
+        """Las particiones que terminan antes de 'until' se leen del manifiesto; solo se carga la del borde"""
+        until_text = until and _date_text(until)
+        weights, reps, boundary = [], [], []
+        for period, info in sorted(self.manifest(file_name)["partitions"].items()):
+            stats = info["exercises"].get(exercise)
+            if stats is None or (until_text and info["min"] > until_text):
+                continue
+            if until_text is None or info["max"] <= until_text:
+                weights.append(stats[0])
+                reps.append(stats[1])
+            else:
+                boundary.append(period)
+        if boundary:
+            data = self.filter_range(self._load_periods(file_name, boundary), end=until, exercises=[exercise])
+            if not data.empty:
+                weights.append(float(data["Peso (kg)"].max()))
+                reps.append(int(data["Repeticiones"].max()))
+        return {"Peso (kg)": max(weights) if weights else float("nan"),
+                "Repeticiones": max(reps) if reps else float("nan")}
+
+    def exercise_history(self, file_name: str, exercise: str, start: Optional[datetime] = None,
+                         end: Optional[datetime] = None) -> pd.DataFrame:
+        data = self.load_range(file_name, start, end, [exercise])
+        return data.sort_values("Fecha", kind="stable", ignore_index=True)
+
+def slugify(text: str) -> str:
+    """Nombre seguro para archivos y directorios (sin acentos ni espacios)"""
+    ascii_text = unicodedata.normalize("NFKD", str(text)).encode("ascii", "ignore").decode()
+    return "".join(c if c.isalnum() else "_" for c in ascii_text.lower()).strip("_")
+
+class Athlete:
+    """Ubicación de los datos de un atleta; cada atleta tiene su propio directorio (shard).
+
+    El atleta por defecto (sin nombre) usa los archivos del directorio actual, como siempre.
+    """
+
+    def __init__(self, name: Optional[str] = None, root: str = "."):
+        self.name = slugify(name) if name else None
+        self.root = root
+        # El directorio se crea al escribir el primer archivo (FileLock), no al consultar
+        self.directory = os.path.join(root, ATHLETES_DIR, self.name) if self.name else root
+
+    @property
+    def workout_file(self) -> str:
+        return os.path.join(self.directory, WORKOUT_FILE)
+
+    @property
+    def goals_file(self) -> str:
+        return os.path.join(self.directory, GOALS_FILE)
+
+    @property
+    def weight_file(self) -> str:
+        return os.path.join(self.directory, WEIGHT_FILE)
+
+    @property
+    def catalog_file(self) -> str:
+        return os.path.join(self.directory, CATALOG_FILE)
+
+    @property
+    def files(self) -> List[str]:
+        return [self.workout_file, self.goals_file, self.weight_file]
+
+    @staticmethod
+    def all(root: str = ".") -> List[str]:
+        """Nombres de los atletas con directorio propio"""
+        directory = os.path.join(root, ATHLETES_DIR)
+        if not os.path.isdir(directory):
+            return []
+        return sorted(d for d in os.listdir(directory) if os.path.isdir(os.path.join(directory, d)))
+
 class DataManager:
     """Maneja todas las operaciones de lectura/escritura de datos"""
-    
+
+    backend: StorageBackend = None
+
     @staticmethod
-    def load_data(file_name: str) -> pd.DataFrame:
+    def create_backend(name: str) -> StorageBackend:
+        """Crea el motor de almacenamiento pedido; vuelve a CSV si falta la dependencia.
+
+        Los motores de archivos admiten particiones por período; SQLite ya filtra por fecha con su índice.
+        """
         try:
-            if os.path.exists(file_name):
-                return pd.read_csv(file_name, parse_dates=["Fecha"])
-            return pd.DataFrame()
-        except Exception as e:
-            print(f"Error cargando {file_name}: {str(e)}")
-            return pd.DataFrame()
+            if name == "sqlite":
+                return SQLiteBackend()
+            if name in ("parquet", "feather"):
+                return PartitionedBackend(ColumnarBackend(name))
+        except ImportError:
+            print(f"El formato {name} requiere pyarrow (pip install pyarrow). Se usará CSV.")
+        return PartitionedBackend(CSVBackend())
+
+    @instrumented
+    @staticmethod
+    def load_data(file_name: str) -> pd.DataFrame:
+        """Tabla completa; en las que tienen ID de fila, con sus correcciones y borrados ya aplicados.
+
+        Solo lee: un error de lectura se propaga en lugar de presentarse como un historial vacío.
+        """
+        data = DataManager.backend.load(file_name)
+        if DataManager.changes_file(file_name) is None or data.empty:
+            return data
+        data = DataManager.fill_row_ids(data)
+        return DataManager.apply_changes(data, DataManager.load_changes(file_name), file_name)
+
+    @staticmethod
+    def iter_data(file_name: str, chunk_size: int = 200_000) -> Iterator[pd.DataFrame]:
+        """Bloques de la tabla con los tipos de TABLE_SCHEMAS, para recorrer historiales que no caben en memoria.
+
+        Los cambios se cargan una vez y se aplican a cada bloque (el merge es fila a fila por ID).
+        """
+        DataManager.flush(file_name)
+        changes = DataManager.load_changes(file_name)
+        offset = 0
+        for chunk in DataManager.backend.iter_chunks(file_name, chunk_size):
+            if DataManager.changes_file(file_name) is not None:
+                chunk = DataManager.fill_row_ids(chunk, offset)
+            offset += len(chunk)
+            yield DataManager.apply_changes(chunk, changes, file_name)
+
+    @staticmethod
+    def changes_file(file_name: str) -> Optional[str]:
+        """Tabla de cambios de una tabla con ID de fila (None si la tabla no los admite)"""
+        changes = CHANGES_FILES.get(os.path.basename(file_name))
+        return os.path.join(os.path.dirname(file_name), changes) if changes else None
+
+    @staticmethod
+    def load_changes(file_name: str) -> pd.DataFrame:
+        """Correcciones y borrados pendientes de compactar, en el orden en que se registraron"""
+        changes_file = DataManager.changes_file(file_name)
+        if changes_file is None or not DataManager.backend.exists(changes_file):
+            return pd.DataFrame(columns=["ID", "Cambio"])
+        return DataManager.backend.load(changes_file)
+
+    @instrumented
+    @staticmethod
+    def record_changes(changes: List[Dict], file_name: str) -> None:
+        """Anexa correcciones ({"ID", "Cambio", campos nuevos}) o borrados a la tabla de cambios.
+
+        Es un anexo al diario como cualquier registro: no lee ni reescribe el historial.
+        """
+        changes_file = DataManager.changes_file(file_name)
+        DataManager.backend.append(changes, changes_file, CHANGE_COLUMNS[os.path.basename(file_name)])
+        DataManager.backend.flush(changes_file)
+
+    @staticmethod
+    def apply_changes(data: pd.DataFrame, changes: pd.DataFrame, file_name: str) -> pd.DataFrame:
+        """Quita las filas borradas y pisa los campos corregidos (el último valor registrado de cada campo).
+
+        Aplicar otra vez los mismos cambios no altera el resultado, por eso una compactación
+        interrumpida antes de vaciar la tabla de cambios no deja datos inconsistentes.
+        """
+        if changes.empty or data.empty or "ID" not in data.columns:
+            return data
+        changes = StorageBackend.apply_schema(changes, DataManager.changes_file(file_name))  # registra nombres nuevos
+        ids = data["ID"].to_numpy("int64", na_value=0)  # sin nulos: isin de NumPy es varias veces más rápido
+        deleted = np.isin(ids, changes.loc[changes["Cambio"] == CHANGE_DELETE, "ID"].to_numpy("int64"))
+        corrections = changes[changes["Cambio"] == CHANGE_CORRECT].drop(columns="Cambio")
+        fields = corrections.groupby("ID", sort=False).last()  # groupby.last salta los campos vacíos
+        corrected = np.isin(ids, fields.index.to_numpy("int64")) & ~deleted
+        if deleted.any():
+            data = data[~deleted].reset_index(drop=True)
+            corrected = corrected[~deleted]
+        if not corrected.any():
+            return data
+        # Una corrección pudo traer un ejercicio nuevo: las categorías se alinean con el vocabulario actual
+        data = StorageBackend.apply_schema(data.copy(), file_name)
+        rows = np.flatnonzero(corrected)
+        patch = fields.reindex(ids[~deleted][rows] if deleted.any() else ids[rows])
+        for column in patch.columns.intersection(data.columns):
+            valid = patch[column].notna().to_numpy()
+            if valid.any():
+                values = patch[column][valid].astype(data[column].dtype)
+                data.iloc[rows[valid], data.columns.get_loc(column)] = values.to_numpy()
+        return data
 
+    @staticmethod
+    def require_row_ids(data: pd.DataFrame, row_ids: List[int]) -> None:
+        """Rechaza IDs que no están en la tabla (o ya se borraron): un cambio huérfano no debe guardarse"""
+        ids = np.array([int(row_id) for row_id in row_ids], dtype="int64")
+        present = data["ID"].to_numpy("int64", na_value=0) if "ID" in data.columns else np.empty(0, "int64")
+        # Se recorre la tabla buscando los pocos IDs pedidos (al revés, isin ordena toda la tabla)
+        unknown = np.setdiff1d(ids, present[np.isin(present, ids)])
+        if len(unknown):
+            raise ValueError(f"IDs desconocidos: {', '.join(map(str, unknown.tolist()))}")
+
+    @staticmethod
+    def fill_row_ids(data: pd.DataFrame, offset: int = 0) -> pd.DataFrame:
+        """ID de las filas que no lo tienen (historiales de versiones anteriores): su posición en la tabla + 1.
+
+        No se escriben al leer; son estables mientras la tabla no se reescriba, y compact, migrate y
+        partition los guardan antes de reescribirla. No chocan con los del contador (mucho mayores).
+        """
+        if "ID" not in data.columns:
+            data = data.assign(ID=pd.array([pd.NA] * len(data), dtype="Int64"))
+        missing = data["ID"].isna().to_numpy()
+        if missing.any():
+            data = data.copy()
+            positions = np.flatnonzero(missing)
+            data.iloc[positions, data.columns.get_loc("ID")] = offset + 1 + positions
+        return data
+
+    @instrumented
+    @staticmethod
+    def compact(file_name: str, threshold: float = COMPACTION_THRESHOLD) -> Dict:
+        """Reescribe la tabla con sus cambios aplicados y vacía la tabla de cambios.
+
+        Solo lo hace cuando hay al menos 'threshold' cambios por fila (con 0, siempre que haya
+        cambios). Toma el bloqueo exclusivo de ambas tablas, así no se pierden anexos concurrentes.
+        """
+        changes_file = DataManager.changes_file(file_name)
+        with FileLock(file_name), FileLock(changes_file):
+            DataManager.flush()
+            data = DataManager.fill_row_ids(DataManager.backend.load(file_name))
+            changes = DataManager.load_changes(file_name)
+            ratio = len(changes) / max(len(data), 1)
+            summary = {"table": file_name, "rows": len(data), "changes": len(changes),
+                       "ratio": round(ratio, 4), "compacted": False}
+            if changes.empty or ratio < threshold:
+                return summary
+            data = DataManager.apply_changes(data, changes, file_name)
+            DataManager.backend.compact_changes(data, changes, file_name)
+            DataManager.backend.drop(changes_file)
+        summary.update(rows=len(data), compacted=True)
+        return summary
+
+    @instrumented
     @staticmethod
     def save_data(data: List[Dict], file_name: str, mode: str = "w", columns: List[str] = None) -> None:
-        try:
-            df = pd.DataFrame(data, columns=columns) if columns else pd.DataFrame(data)
-            header = not os.path.exists(file_name) or mode == "w"
-            df.to_csv(file_name, mode=mode, index=False, header=header)
-        except Exception as e:
-            print(f"Error guardando en {file_name}: {str(e)}")
+        """Escribe la tabla; si falla, el error llega a quien espera la confirmación (como flush)"""
+        if mode == "a":
+            DataManager.backend.append(data, file_name, columns)
+            DataManager.backend.flush(file_name)
+            return
+        df = pd.DataFrame(data, columns=columns) if columns else pd.DataFrame(data)
+        DataManager.backend.replace(df, file_name)
+
+    @staticmethod
+    def exists(file_name: str) -> bool:
+        return DataManager.backend.exists(file_name)
+
+    @instrumented
+    @staticmethod
+    def append_data(data: List[Dict], file_name: str, columns: List[str] = None) -> None:
+        """Encola filas en el diario de solo-anexo (no reescribe el archivo)"""
+        DataManager.backend.append(data, file_name, columns)
+
+    @instrumented
+    @staticmethod
+    def flush(file_name: Optional[str] = None) -> None:
+        """Escribe lo pendiente del diario; si falla, el error llega a quien espera la confirmación"""
+        DataManager.backend.flush(file_name)
+
+    @staticmethod
+    def discard(file_name: str) -> None:
+        DataManager.backend.discard(file_name)
+
+    @instrumented
+    @staticmethod
+    def migrate(target: str, athlete: Optional[Athlete] = None) -> None:
+        """Copia todas las tablas desde los CSV actuales al formato indicado (una sola vez)"""
+        source = PartitionedBackend(CSVBackend())
+        destination = DataManager.create_backend(target)
+        files = (athlete or Athlete()).files
+        # Las tablas de cambios se copian tal cual: los IDs se conservan, así que siguen valiendo
+        for file_name in files + [c for c in map(DataManager.changes_file, files) if c]:
+            if source.exists(file_name):
+                data = source.load(file_name)
+                if DataManager.changes_file(file_name) and not data.empty:
+                    data = DataManager.fill_row_ids(data)  # los cambios pendientes apuntan a estos IDs
+                if source.partitioned(file_name) and isinstance(destination, PartitionedBackend):
+                    destination.write_partitions(data, file_name, source.manifest(file_name)["granularity"])
+                else:
+                    destination.replace(data, file_name)
+                print(f"{file_name}: {len(data)} filas migradas a {destination.name}")
+
+    @instrumented
+    @staticmethod
+    def partition(granularity: str, athlete: Optional[Athlete] = None) -> None:
+        """Divide el historial de entrenamientos en particiones por mes o año (también para cambiar de granularidad)"""
+        backend = DataManager.backend
+        if not isinstance(backend, PartitionedBackend):
+            print(f"{backend.name} ya consulta por fecha con su índice; no necesita particiones")
+            return
+        file_name = (athlete or Athlete()).workout_file
+        DataManager.flush()
+        data = backend.load(file_name)
+        if not data.empty:
+            data = DataManager.fill_row_ids(data)  # se guardan antes de que cambie el orden de las filas
+        count = backend.write_partitions(data, file_name, granularity)
+        print(f"{file_name}: {len(data)} filas en {count} particiones por {granularity} "
+              f"({backend.directory(file_name)})")
+
+    @instrumented
+    @staticmethod
+    def export_csv(directory: str = "export", athlete: Optional[Athlete] = None) -> None:
+        """Exporta todas las tablas del motor actual a CSV"""
+        os.makedirs(directory, exist_ok=True)
+        DataManager.flush()
+        for file_name in (athlete or Athlete()).files:
+            if DataManager.exists(file_name):
+                data = DataManager.load_data(file_name)
+                CSVBackend().replace(data, os.path.join(directory, os.path.basename(file_name)))
+                print(f"{file_name}: {len(data)} filas exportadas a {directory}")
+
+DataManager.backend = DataManager.create_backend(os.environ.get("GYM_STORAGE", "csv"))
+atexit.register(DataManager.flush)
+
+def epley_1rm(weight, reps):
+    """1RM estimado (Epley); acepta escalares o arrays"""
+    return weight * (1 + reps / 30)
+
+def brzycki_1rm(weight, reps):
+    """1RM estimado (Brzycki); la fórmula no está definida desde 37 reps, así que se limita a 36"""
+    return weight * 36 / (37 - np.minimum(reps, 36))
+
+ONE_RM_FORMULAS = {"Epley": epley_1rm, "Brzycki": brzycki_1rm}
+
+# Progresión agregada: métrica -> (cómo calcularla por serie, cómo combinar dentro del período)
+PROGRESSION_METRICS = {
+    "Serie Top (kg)": (lambda d: d["Peso (kg)"].astype("float64"), "max"),
+    "Volumen (kg)": (lambda d: d["Peso (kg)"].astype("float64") * d["Repeticiones"], "sum"),
+    "1RM Estimado (kg)": (lambda d: epley_1rm(d["Peso (kg)"].astype("float64"), d["Repeticiones"]), "max"),
+    "Repeticiones": (lambda d: d["Repeticiones"], "max"),
+    "Peso (kg)": (lambda d: d["Peso (kg)"].astype("float64"), "max"),
+}
+PROGRESSION_PERIODS = {"sesion": "D", "semana": "W", "mes": "M"}
+PLOT_POINT_BUDGET = 500
+
+def aggregate_progression(data: pd.DataFrame, period: str, metric: str) -> pd.Series:
+    """Un valor por sesión, semana o mes (serie top, volumen o 1RM estimado)"""
+    compute, how = PROGRESSION_METRICS[metric]
+    periods = pd.to_datetime(data["Fecha"]).dt.to_period(PROGRESSION_PERIODS[period]).dt.start_time
+    return compute(data).groupby(periods.values).agg(how).rename(metric)
+
+def downsample_lttb(x: np.ndarray, y: np.ndarray, threshold: int) -> np.ndarray:
+    """Índices elegidos por Largest-Triangle-Three-Buckets; conserva la forma de la curva"""
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    x = np.asarray(x, dtype="float64")
+    y = np.asarray(y, dtype="float64")
+    edges = np.linspace(1, n - 1, threshold - 1).astype("int64")
+    selected = np.empty(threshold, dtype="int64")
+    selected[0], selected[-1] = 0, n - 1
+
+    anchor = 0
+    for i in range(threshold - 2):
+        start, end = edges[i], edges[i + 1]
+        next_end = edges[i + 2] if i + 2 < len(edges) else n
+        avg_x, avg_y = x[end:next_end].mean(), y[end:next_end].mean()
+        area = np.abs((x[anchor] - avg_x) * (y[start:end] - y[anchor])
+                      - (x[anchor] - x[start:end]) * (avg_y - y[anchor]))
+        anchor = start + int(area.argmax())
+        selected[i + 1] = anchor
+    return selected
+
+def downsample_series(series: pd.Series, max_points: int = PLOT_POINT_BUDGET) -> pd.Series:
+    if len(series) <= max_points:
+        return series
+    x = pd.DatetimeIndex(series.index).asi8
+    return series.iloc[downsample_lttb(x, series.to_numpy(), max_points)]
+
+class PersonalRecordIndex:
+    """Récords y acumulados por ejercicio, actualizados en O(1) por serie registrada"""
+
+    FIELDS = ["Peso (kg)", "Repeticiones", "1RM Estimado", "Volumen", "Última Fecha"]
+    AGGREGATIONS = {"Peso (kg)": "max", "Repeticiones": "max", "1RM Estimado": "max",
+                    "Volumen": "sum", "Última Fecha": "max"}
+
+    def __init__(self):
+        self.records: Dict[str, Dict] = {}
+
+    def __contains__(self, exercise: str) -> bool:
+        return exercise in self.records
+
+    def get(self, exercise: str) -> Optional[Dict]:
+        return self.records.get(exercise)
+
+    def exercises(self) -> List[str]:
+        return list(self.records)
+
+    def update(self, rows: List[Dict]) -> None:
+        """Incorpora filas con el formato de _prepare_workout_data"""
+        for row in rows:
+            weight, reps = float(row["Peso (kg)"]), int(row["Repeticiones"])
+            date = pd.Timestamp(row["Fecha"])
+            record = self.records.get(row["Ejercicio"])
+            if record is None:
+                self.records[row["Ejercicio"]] = {
+                    "Peso (kg)": weight, "Repeticiones": reps, "1RM Estimado": epley_1rm(weight, reps),
+                    "Volumen": weight * reps, "Última Fecha": date
+                }
+                continue
+            record["Peso (kg)"] = max(record["Peso (kg)"], weight)
+            record["Repeticiones"] = max(record["Repeticiones"], reps)
+            record["1RM Estimado"] = max(record["1RM Estimado"], epley_1rm(weight, reps))
+            record["Volumen"] += weight * reps
+            record["Última Fecha"] = max(record["Última Fecha"], date)
+
+    def rebuild(self, workouts: pd.DataFrame) -> None:
+        """Recalcula todo el índice desde el historial con una sola agrupación"""
+        self.records = {}
+        if workouts.empty:
+            return
+        self.records = self.summarize(workouts).to_dict("index")
+
+    @classmethod
+    def summarize(cls, workouts: pd.DataFrame) -> pd.DataFrame:
+        """Agregados por ejercicio de un trozo del historial; los de varios trozos se unen con combine"""
+        data = pd.DataFrame({
+            "Ejercicio": workouts["Ejercicio"].astype(str),
+            "Peso (kg)": workouts["Peso (kg)"].astype("float64"),
+            "Repeticiones": workouts["Repeticiones"].astype("int64"),
+            "1RM Estimado": epley_1rm(workouts["Peso (kg)"].astype("float64"), workouts["Repeticiones"]),
+            "Volumen": workouts["Peso (kg)"].astype("float64") * workouts["Repeticiones"],
+            "Última Fecha": workouts["Fecha"],
+        })
+        return data.groupby("Ejercicio", sort=False).agg(cls.AGGREGATIONS)
+
+    @classmethod
+    def combine(cls, summaries: List[pd.DataFrame]) -> pd.DataFrame:
+        """Une resúmenes parciales: máximos con máximos, volumen sumado, ejercicios en orden de aparición"""
+        return pd.concat(summaries).groupby(level=0, sort=False).agg(cls.AGGREGATIONS)
+
+    def to_frame(self) -> pd.DataFrame:
+        return pd.DataFrame.from_dict(self.records, orient="index", columns=self.FIELDS)
+
+class WorkoutBuffer:
+    """Series de una sesión en arrays tipados: códigos int32 de ROUTINES/EXERCISES, int16 y float32.
+
+    Se recorre como filas dict (lo que esperan el diario y los índices) y to_frame() envuelve
+    los arrays sin copiarlos, así que después de convertirlo ya no admite series nuevas.
+    """
+
+    __slots__ = ("file_name", "dates", "routines", "exercises", "reps", "weights", "ids")
+
+    NS_PER_DAY = 86_400 * 10**9
+    EPOCH = datetime(1970, 1, 1)
+
+    def __init__(self, file_name: str = WORKOUT_FILE):
+        self.file_name = file_name  # tabla de la que salen los IDs de fila
+        self.dates = array("q")  # nanosegundos desde 1970, el formato de datetime64[ns]
+        self.routines = array("i")
+        self.exercises = array("i")
+        self.reps = array("h")
+        self.weights = array("f")
+        self.ids = array("q")
+
+    def __len__(self) -> int:
+        return len(self.dates)
+
+    def add(self, date: datetime, routine: str, exercise: str, reps: int, weight: float) -> None:
+        if not 0 <= reps <= MAX_REPS:
+            raise ValueError(f"Repeticiones fuera de rango (0-{MAX_REPS}): {reps}")
+        self.dates.append((date.toordinal() - self.EPOCH.toordinal()) * self.NS_PER_DAY)
+        self.routines.append(ROUTINES.code(routine))
+        self.exercises.append(EXERCISES.code(exercise))
+        self.reps.append(reps)
+        self.weights.append(weight)
+        self.ids.extend(new_row_ids(self.file_name))
+
+    def __iter__(self):
+        for date, routine, exercise, reps, weight, row_id in zip(self.dates, self.routines, self.exercises,
+                                                                 self.reps, self.weights, self.ids):
+            yield {
+                "Fecha": (self.EPOCH + timedelta(days=date // self.NS_PER_DAY)).strftime("%Y-%m-%d"),
+                "Rutina": ROUTINES.names[routine],
+                "Ejercicio": EXERCISES.names[exercise],
+                "Repeticiones": reps,
+                # float32 -> float: se redondea para no escribir 72.30000305 en lugar de 72.3
+                "Peso (kg)": int(weight) if weight.is_integer() else round(weight, 3),
+                "ID": row_id,
+            }
+
+    def to_frame(self) -> pd.DataFrame:
+        """DataFrame con los tipos de TABLE_SCHEMAS; fechas, reps y pesos comparten memoria con los arrays"""
+        return pd.DataFrame({
+            "Fecha": np.frombuffer(self.dates, dtype="datetime64[ns]"),
+            "Rutina": pd.Categorical.from_codes(np.frombuffer(self.routines, dtype="int32"), dtype=ROUTINES.dtype),
+            "Ejercicio": pd.Categorical.from_codes(np.frombuffer(self.exercises, dtype="int32"),
+                                                   dtype=EXERCISES.dtype),
+            "Repeticiones": np.frombuffer(self.reps, dtype="int16"),
+            "Peso (kg)": np.frombuffer(self.weights, dtype="float32"),
+            "ID": pd.array(np.frombuffer(self.ids, dtype="int64"), dtype="Int64"),
+        }, copy=False)
+
+class WorkoutStore:
+    """Almacén compartido de entrenamientos: se carga una sola vez y recibe anexos en memoria.
+
+    Con un motor indexado (SQLite o particiones con manifiesto) las consultas por ejercicio
+    se resuelven sin cargar todo el historial mientras este no se haya cargado en pandas.
+    """
+
+    def __init__(self, file_name: str = WORKOUT_FILE):
+        self.file_name = file_name
+        self._frame: Optional[pd.DataFrame] = None
+        self._pending: List[pd.DataFrame] = []
+        self.version = 0
+        self._frame_version = 0
+        self._records = PersonalRecordIndex()
+        self._records_built = False
+        self._listeners: List[Callable] = []
+        self._has_changes: Optional[bool] = None  # si la tabla tiene cambios sin compactar
+
+    def subscribe(self, listener: Callable) -> None:
+        """listener(rows) recibe cada anexo, para índices que se mantienen solos (p. ej. GoalForecaster).
+
+        Tras corregir o borrar filas recibe None: lo ya acumulado dejó de valer.
+        """
+        self._listeners.append(listener)
+
+    def append(self, rows) -> None:
+        """Agrega filas ya guardadas (lista de dicts o WorkoutBuffer) sin volver a leer el archivo"""
+        if not len(rows):
+            return
+        if self._frame is not None:
+            self._pending.append(rows.to_frame() if isinstance(rows, WorkoutBuffer)
+                                 else pd.DataFrame(rows, columns=WORKOUT_COLUMNS))
+        if self._records_built:
+            self._records.update(rows)
+        for listener in self._listeners:
+            listener(rows)
+        self.version += 1
+
+    def apply_changes(self, changes: List[Dict]) -> None:
+        """Aplica correcciones o borrados ya guardados a la copia en memoria, sin releer el archivo.
+
+        Un borrado puede quitar un récord, así que el índice de récords se recalcula al pedirse.
+        """
+        if self._frame is not None:
+            self._frame = DataManager.apply_changes(self.frame, pd.DataFrame(changes), self.file_name)
+        self._has_changes = True
+        self._records_built = False
+        self.version += 1
+        self._frame_version = self.version
+        for listener in self._listeners:
+            listener(None)
+
+    @property
+    def records(self) -> PersonalRecordIndex:
+        """Índice de récords por ejercicio; se construye la primera vez que se pide"""
+        if not self._records_built:
+            self.rebuild_records()
+        return self._records
+
+    @instrumented
+    def rebuild_records(self) -> None:
+        if self._use_index():
+            self._records.records = DataManager.backend.exercise_summary(self.file_name)
+        else:
+            self._records.rebuild(self.frame)
+        self._records_built = True
+
+    @property
+    def frame(self) -> pd.DataFrame:
+        """Vista del historial correspondiente a la versión actual"""
+        if self._frame is None:
+            self._frame = DataManager.load_data(self.file_name)
+            self._frame_version = self.version
+        if self._frame_version != self.version:
+            self._frame = StorageBackend.concat([self._frame, *self._pending], self.file_name)
+            self._pending.clear()
+            self._frame_version = self.version
+        return self._frame
+
+    def _use_index(self) -> bool:
+        # Los índices del motor no ven las correcciones: hasta compactar se consulta la tabla con sus cambios.
+        # La tabla de cambios se lee una sola vez; los cambios posteriores llegan por apply_changes
+        if self._frame is not None or not DataManager.backend.is_indexed(self.file_name):
+            return False
+        if self._has_changes is None:
+            self._has_changes = not DataManager.load_changes(self.file_name).empty
+        return not self._has_changes
+
+    def exercises(self) -> List[str]:
+        return self.records.exercises()
+
+    def exercise_max(self, exercise: str, until: Optional[datetime] = None) -> Dict[str, float]:
+        """Máximo peso y repeticiones de un ejercicio hasta una fecha"""
+        if self._use_index():
+            return DataManager.backend.exercise_max(self.file_name, exercise, until)
+        data = self.exercise_history(exercise, end=until)
+        return {"Peso (kg)": data["Peso (kg)"].max(), "Repeticiones": data["Repeticiones"].max()}
+
+    @instrumented
+    def set_counts(self, dates: set) -> Dict[tuple, int]:
+        """Cuántas series iguales (fecha 'YYYY-MM-DD', ejercicio, reps, peso) hay guardadas en esas fechas.
+
+        Si el historial no está en memoria se recorre por bloques y solo se cuentan las de esas fechas.
+        """
+        counts: Dict[tuple, int] = {}
+        chunks = [self.frame] if self._frame is not None else DataManager.iter_data(self.file_name)
+        for chunk in chunks:
+            if chunk.empty:
+                continue
+            days = chunk["Fecha"].dt.strftime("%Y-%m-%d")
+            sets = pd.DataFrame({"Fecha": days, "Ejercicio": chunk["Ejercicio"].astype(str),
+                                 "Repeticiones": chunk["Repeticiones"].astype("int64"),
+                                 "Peso (kg)": chunk["Peso (kg)"].astype("float64").round(2)})[days.isin(dates)]
+            for key, count in sets.groupby(list(sets.columns), sort=False).size().items():
+                counts[key] = counts.get(key, 0) + count
+        return counts
+
+    @instrumented
+    def exercise_maxima(self, limits: pd.DataFrame) -> pd.DataFrame:
+        """Máximo peso y repeticiones para cada fila (Ejercicio, Fecha Límite) en una sola pasada"""
+        # Si la fecha límite cubre todo el historial del ejercicio, el índice de récords ya tiene la respuesta
+        records = self.records.to_frame()
+        exercises = limits["Ejercicio"].astype(str)
+        covered = (exercises.map(records["Última Fecha"]) <= limits["Fecha Límite"]).fillna(False)
+        if covered.any():
+            result = self.exercise_maxima(limits[~covered]).reindex(limits.index)
+            for column in ("Peso (kg)", "Repeticiones"):
+                result.loc[covered, column] = exercises[covered].map(records[column]).astype("float64")
+            return result
+
+        if self._use_index():
+            return pd.DataFrame([self.exercise_max(row["Ejercicio"], row["Fecha Límite"])
+                                 for row in limits.to_dict("records")], index=limits.index,
+                                columns=["Peso (kg)", "Repeticiones"])
+
+        return self.maxima_until(self.frame, limits)
+
+    @staticmethod
+    def maxima_until(workouts: pd.DataFrame, limits: pd.DataFrame) -> pd.DataFrame:
+        """exercise_maxima sobre un DataFrame dado (el historial completo o un bloque de él)"""
+        result = pd.DataFrame(index=limits.index, columns=["Peso (kg)", "Repeticiones"], dtype="float64")
+        if workouts.empty or limits.empty:
+            return result
+
+        keys = limits.assign(_limit=limits.index, Ejercicio=limits["Ejercicio"].astype(str))
+        relevant = workouts[workouts["Ejercicio"].isin(keys["Ejercicio"])]
+        merged = relevant[["Ejercicio", "Fecha", "Peso (kg)", "Repeticiones"]].assign(
+            Ejercicio=relevant["Ejercicio"].astype(str)
+        ).merge(keys[["_limit", "Ejercicio", "Fecha Límite"]], on="Ejercicio")
+        merged = merged[merged["Fecha"] <= merged["Fecha Límite"]]
+        maxima = merged.groupby("_limit")[["Peso (kg)", "Repeticiones"]].max()
+        result.loc[maxima.index] = maxima.astype("float64")
+        return result
+
+    @staticmethod
+    def exercise_mask(workouts: pd.DataFrame, exercise: str):
+        """Filas de un ejercicio; con la columna categórica compartida se compara su ID entero"""
+        column = workouts["Ejercicio"]
+        code = EXERCISES.codes.get(exercise)
+        if (isinstance(column.dtype, pd.CategoricalDtype) and code is not None
+                and code < len(column.cat.categories) and column.cat.categories[code] == exercise):
+            return column.cat.codes.to_numpy() == code
+        return (column == exercise).to_numpy()
+
+    @instrumented
+    def exercise_history(self, exercise: str, start: Optional[datetime] = None,
+                         end: Optional[datetime] = None) -> pd.DataFrame:
+        exercise = CATALOG.resolve(exercise) or exercise
+        if self._use_index():
+            return DataManager.backend.exercise_history(self.file_name, exercise, start, end)
+        workouts = self.frame
+        mask = self.exercise_mask(workouts, exercise)
+        if start is not None:
+            mask &= workouts["Fecha"] >= pd.Timestamp(start)
+        if end is not None:
+            mask &= workouts["Fecha"] <= pd.Timestamp(end)
+        return workouts[mask]
+
+class TrainingLoad:
+    """Analítica de carga sobre el historial: 1RM por serie, tonelaje por grupo muscular y ACWR.
+
+    Todo se calcula con groupby/rolling sobre el DataFrame y queda en caché hasta que cambia
+    la versión del almacén, así los menús, gráficos y la línea de comandos no repiten cálculos.
+    """
+
+    ACUTE_DAYS = 7
+    CHRONIC_DAYS = 28
+    ROLLING_WEEKS = 4
+    ACWR_ZONES = [(0.8, "baja"), (1.3, "óptima"), (1.5, "alta"), (float("inf"), "riesgo")]
+    REST_ROUTINES = ("Descanso", "Enfermo")
+
+    def __init__(self, store: WorkoutStore):
+        self.store = store
+        self._cache: Dict[str, object] = {}
+        self._cache_version: Optional[int] = None
+
+    def _cached(self, key: str, compute: Callable[[], object]):
+        if self._cache_version != self.store.version:
+            self._cache.clear()
+            self._cache_version = self.store.version
+        if key not in self._cache:
+            self._cache[key] = compute()
+        return self._cache[key]
+
+    def sets(self) -> pd.DataFrame:
+        """Series de trabajo con volumen, 1RM estimado (Epley y Brzycki) y grupo muscular"""
+        return self._cached("sets", lambda: self.work_sets(self.store.frame))
+
+    @classmethod
+    def work_sets(cls, workouts: pd.DataFrame) -> pd.DataFrame:
+        """Series de trabajo de un DataFrame del historial (completo o un bloque)"""
+        if workouts.empty:
+            return pd.DataFrame(columns=["Fecha", "Ejercicio", "Grupo", "Repeticiones", "Peso (kg)",
+                                         "Volumen", *ONE_RM_FORMULAS])
+        work = workouts[~workouts["Rutina"].isin(cls.REST_ROUTINES) & (workouts["Repeticiones"] > 0)]
+        weight = work["Peso (kg)"].astype("float64")
+        reps = work["Repeticiones"].astype("int64")
+        # Los ejercicios del catálogo usan su rutina; los personalizados, la rutina con que se registraron
+        groups = work["Ejercicio"].astype(str).map(MUSCLE_GROUPS).fillna(work["Rutina"].astype(str))
+        sets = pd.DataFrame({"Fecha": work["Fecha"], "Ejercicio": work["Ejercicio"],
+                             "Grupo": groups.astype("category"), "Repeticiones": reps, "Peso (kg)": weight,
+                             "Volumen": weight * reps})
+        for name, formula in ONE_RM_FORMULAS.items():
+            sets[name] = formula(weight, reps)
+        return sets.reset_index(drop=True)
+
+    def session_tonnage(self) -> pd.DataFrame:
+        """Tonelaje (kg x reps) por sesión y grupo muscular"""
+        return self._cached("session", lambda: self.sets().groupby(["Fecha", "Grupo"], observed=True)["Volumen"]
+                            .sum().unstack(fill_value=0.0))
+
+    def weekly_tonnage(self) -> pd.DataFrame:
+        """Tonelaje semanal por grupo; las semanas sin entrenar quedan en cero para que las medias móviles sean reales"""
+        def compute():
+            sets = self.sets()
+            if sets.empty:
+                return pd.DataFrame()
+            return self.fill_weeks(self.weekly_totals(sets))
+        return self._cached("weekly", compute)
+
+    @staticmethod
+    def weekly_totals(sets: pd.DataFrame) -> pd.DataFrame:
+        """Tonelaje por semana (lunes) y grupo, solo de las semanas presentes en sets"""
+        weeks = sets["Fecha"].dt.to_period("W").dt.start_time.rename("Semana")
+        return sets.groupby([weeks, "Grupo"], observed=True)["Volumen"].sum().unstack(fill_value=0.0)
+
+    @staticmethod
+    def fill_weeks(weekly: pd.DataFrame) -> pd.DataFrame:
+        """Completa con ceros las semanas sin entrenar entre la primera y la última"""
+        return weekly.reindex(pd.date_range(weekly.index.min(), weekly.index.max(), freq="7D",
+                                            name="Semana"), fill_value=0.0)
+
+    def weekly_rolling(self, weeks: Optional[int] = None) -> pd.DataFrame:
+        """Media móvil del tonelaje semanal por grupo"""
+        weeks = weeks or self.ROLLING_WEEKS
+        return self._cached(f"rolling-{weeks}",
+                            lambda: self.weekly_tonnage().rolling(weeks, min_periods=1).mean())
+
+    def daily_load(self) -> pd.Series:
+        """Tonelaje total por día de calendario (los días sin entrenar cuentan como cero)"""
+        def compute():
+            sets = self.sets()
+            if sets.empty:
+                return pd.Series(dtype="float64", name="Carga")
+            daily = sets.groupby("Fecha")["Volumen"].sum()
+            return daily.reindex(pd.date_range(daily.index.min(), daily.index.max(), freq="D", name="Fecha"),
+                                 fill_value=0.0).rename("Carga")
+        return self._cached("daily", compute)
+
+    def acwr(self) -> pd.DataFrame:
+        """Relación carga aguda:crónica (media de 7 días / media de 28 días) con su zona de riesgo"""
+        def compute():
+            daily = self.daily_load()
+            acute = daily.rolling(self.ACUTE_DAYS, min_periods=self.ACUTE_DAYS).mean()
+            chronic = daily.rolling(self.CHRONIC_DAYS, min_periods=self.CHRONIC_DAYS).mean()
+            ratio = (acute / chronic.where(chronic > 0)).rename("ACWR")
+            limits, labels = zip(*self.ACWR_ZONES)
+            zone = pd.cut(ratio, bins=[0, *limits], labels=labels, right=False, include_lowest=True)
+            return pd.DataFrame({"Carga": daily, "Aguda": acute, "Crónica": chronic, "ACWR": ratio, "Zona": zone})
+        return self._cached("acwr", compute)
+
+    def session_1rm(self, formula: str = "Epley") -> pd.DataFrame:
+        """Mejor 1RM estimado de cada sesión (filas: fecha, columnas: ejercicio)"""
+        return self._cached(f"1rm-{formula}", lambda: self.sets().groupby(["Fecha", "Ejercicio"], observed=True)[formula]
+                            .max().unstack())
+
+    @instrumented
+    def summary(self, weeks: int = 8) -> Dict:
+        """Últimas semanas de carga, ACWR actual y mejores 1RM de la ventana, en formato serializable"""
+        return self._cached(f"summary-{weeks}", lambda: self._compute_summary(weeks))
+
+    def _compute_summary(self, weeks: int) -> Dict:
+        sets = self.sets()
+        if sets.empty:
+            return {"weeks": [], "acwr": None, "1rm": {}}
+        weekly = self.weekly_tonnage().tail(weeks)
+        rolling = self.weekly_rolling().reindex(weekly.index)
+        start = weekly.index.min()
+        recent = sets[sets["Fecha"] >= start].groupby("Ejercicio", observed=True)[list(ONE_RM_FORMULAS)].max()
+        current = self.acwr().tail(1).round(3).reset_index()
+        current["Fecha"] = current["Fecha"].dt.strftime("%Y-%m-%d")
+        return {
+            "weeks": [{"Semana": f"{week:%Y-%m-%d}", "Tonelaje": weekly.loc[week].round(1).to_dict(),
+                       f"Media {self.ROLLING_WEEKS} semanas": rolling.loc[week].round(1).to_dict()}
+                      for week in weekly.index],
+            "acwr": json.loads(current.to_json(orient="records", force_ascii=False, date_format="iso"))[0],
+            "1rm": json.loads(recent.round(1).to_json(orient="index", force_ascii=False, date_format="iso")),
+        }
+
+class BodyWeightTracker:
+    """Serie de peso corporal: tendencia suavizada (EWMA), ritmo semanal y fuerza relativa.
+
+    Los pesajes se promedian por día. Al anexar pesajes la tendencia solo se recalcula desde
+    el primer día afectado, partiendo del valor suavizado anterior.
+    """
+
+    EWMA_ALPHA = 0.1
+    MATCH_DAYS = 14  # distancia máxima entre un entrenamiento y el pesaje usado para su fuerza relativa
+
+    def __init__(self, file_name: str = WEIGHT_FILE):
+        self.file_name = file_name
+        self.version = 0
+        self._sums: Optional[pd.Series] = None  # kg sumados por día
+        self._counts: Optional[pd.Series] = None  # pesajes por día
+        self._trend: Optional[pd.Series] = None
+        self._cache: Dict[tuple, object] = {}
+
+    def _group(self, data: pd.DataFrame):
+        data = StorageBackend.apply_schema(data, self.file_name)
+        valid = data[(data["Peso (kg)"] > 0) & data["Fecha"].notna()]  # los registros en 0 no son pesajes
+        grouped = valid.groupby("Fecha")["Peso (kg)"]
+        return grouped.sum().astype("float64"), grouped.count().astype("float64")
+
+    def _smooth(self, weights: pd.Series, seed: Optional[float] = None) -> pd.Series:
+        """EWMA sin ajuste; con seed continúa la recursión desde el último valor suavizado"""
+        values = weights.to_numpy(dtype="float64")
+        if seed is not None:
+            values = np.concatenate([[seed], values])
+        smoothed = pd.Series(values).ewm(alpha=self.EWMA_ALPHA, adjust=False).mean().to_numpy()
+        return pd.Series(smoothed[1:] if seed is not None else smoothed, index=weights.index, name="Tendencia")
+
+    def _ensure_loaded(self) -> None:
+        if self._trend is not None:
+            return
+        data = DataManager.load_data(self.file_name)
+        self._sums, self._counts = self._group(data if not data.empty else pd.DataFrame(columns=WEIGHT_COLUMNS))
+        self._trend = self._smooth(self._sums / self._counts)
+
+    def append(self, entries: List[Dict]) -> None:
+        """Incorpora pesajes ya guardados sin volver a leer el archivo"""
+        self.version += 1
+        if self._trend is None or not entries:
+            return  # sin cargar todavía: se leerá completo al usarse
+        sums, counts = self._group(pd.DataFrame(entries, columns=WEIGHT_COLUMNS))
+        if sums.empty:
+            return
+        first = sums.index.min()
+        if len(self._sums) and first <= self._sums.index[-1]:
+            # Pesajes atrasados o del mismo día: se realinean los acumulados (caso poco frecuente)
+            self._sums = self._sums.add(sums, fill_value=0).sort_index()
+            self._counts = self._counts.add(counts, fill_value=0).sort_index()
+        else:
+            self._sums = pd.concat([self._sums, sums])
+            self._counts = pd.concat([self._counts, counts])
+        start = int(self._sums.index.searchsorted(first))
+        tail = self._sums.iloc[start:] / self._counts.iloc[start:]
+        seed = float(self._trend.iloc[start - 1]) if start else None
+        self._trend = pd.concat([self._trend.iloc[:start], self._smooth(tail, seed)])
+
+    def reset(self) -> None:
+        """Descarta la serie en memoria tras corregir o borrar pesajes; se vuelve a leer al usarse"""
+        self.version += 1
+        self._sums = self._counts = self._trend = None
+
+    def _cached(self, key: tuple, compute: Callable[[], object]):
+        key = (self.version, *key)
+        if key not in self._cache:
+            self._cache = {k: v for k, v in self._cache.items() if k[0] == self.version}
+            self._cache[key] = compute()
+        return self._cache[key]
+
+    @property
+    def trend(self) -> pd.Series:
+        self._ensure_loaded()
+        return self._trend
+
+    def frame(self) -> pd.DataFrame:
+        """Peso medio por día y su tendencia"""
+        self._ensure_loaded()
+        return self._cached(("frame",), lambda: pd.DataFrame({
+            "Peso (kg)": self._sums / self._counts, "Tendencia": self._trend}).rename_axis("Fecha"))
+
+    def weekly_rate(self) -> pd.Series:
+        """Cambio de la tendencia en kg por semana (normalizado si hubo semanas sin pesajes)"""
+        def compute():
+            weekly = self.trend.resample("W").last().dropna()
+            weeks = weekly.index.to_series().diff().dt.days / 7
+            return (weekly.diff() / weeks).rename("kg/semana")
+        return self._cached(("rate",), compute)
+
+    def relative_strength(self, training_load: TrainingLoad, formula: str = "Epley") -> pd.DataFrame:
+        """Mejor 1RM estimado de cada sesión dividido por el peso corporal más cercano (as-of por fecha)"""
+        def compute():
+            sessions = training_load.session_1rm(formula).stack().rename(formula).reset_index()
+            trend = self.trend.rename_axis("Fecha").reset_index()
+            if sessions.empty or trend.empty:
+                return pd.DataFrame(columns=["Fecha", "Ejercicio", formula, "Tendencia", "Fuerza Relativa"])
+            sessions["Fecha"] = sessions["Fecha"].astype("datetime64[ns]")
+            trend["Fecha"] = trend["Fecha"].astype("datetime64[ns]")
+            merged = pd.merge_asof(sessions.sort_values("Fecha"), trend, on="Fecha", direction="nearest",
+                                   tolerance=pd.Timedelta(days=self.MATCH_DAYS))
+            merged["Fuerza Relativa"] = merged[formula] / merged["Tendencia"]
+            return merged
+        return self._cached(("relative", formula, training_load.store.version), compute)
+
+    @instrumented
+    def summary(self, training_load: TrainingLoad, weeks: int = 8) -> Dict:
+        """Último pesaje, tendencia, ritmo de las últimas semanas y fuerza relativa más reciente por ejercicio"""
+        data = self.frame()
+        if data.empty:
+            return {"latest": None, "weekly_rate": [], "relative_strength": {}}
+        latest = data.iloc[-1]
+        rate = self.weekly_rate().dropna().tail(weeks)
+        relative = self.relative_strength(training_load).dropna(subset=["Fuerza Relativa"])
+        last = relative.groupby("Ejercicio", observed=True).last()
+        return {
+            "latest": {"Fecha": f"{latest.name:%Y-%m-%d}", "Peso (kg)": round(float(latest["Peso (kg)"]), 2),
+                       "Tendencia": round(float(latest["Tendencia"]), 2)},
+            "weekly_rate": [{"Semana": f"{week:%Y-%m-%d}", "kg/semana": round(float(value), 3)}
+                            for week, value in rate.items()],
+            "relative_strength": {str(exercise): {"Fecha": f"{row['Fecha']:%Y-%m-%d}",
+                                                  "1RM Estimado": round(float(row["Epley"]), 1),
+                                                  "Fuerza Relativa": round(float(row["Fuerza Relativa"]), 2)}
+                                  for exercise, row in last.iterrows()},
+        }
+
+class GoalForecaster:
+    """Proyección de metas a partir de la tendencia del mejor 1RM estimado (Epley) de cada sesión.
+
+    Por ejercicio se guardan las sumas de una regresión ponderada (W, Σwx, Σwy, Σwx², Σwxy, Σwy²,
+    Σw² y el número de sesiones) en una matriz NumPy indexada por el ID del ejercicio. El peso de
+    cada sesión decae con una vida media de HALF_LIFE_DAYS, así la tendencia sigue a los últimos
+    meses. Con el modelo "log" el eje x es log(1 + días desde la primera sesión) (progreso que se
+    frena). Las series nuevas llegan por WorkoutStore.subscribe y solo suman (o corrigen, si
+    mejoran el máximo de su sesión) un término; todas las metas se proyectan en una pasada.
+    La tendencia no se extrapola lejos de los datos: sin sesiones en los últimos STALE_DAYS la
+    proyección queda desactualizada (sin valores), y la fecha proyectada no puede quedar más
+    adelante de lo que abarcan las sesiones del ejercicio.
+    """
+
+    MODELS = ("lineal", "log")
+    HALF_LIFE_DAYS = 90
+    MIN_SESSIONS = 3
+    HORIZON_DAYS = 5 * 365  # más allá no se informa fecha proyectada
+    STALE_DAYS = 60
+    COLUMNS = ["Meta 1RM", "1RM Tendencia", "Kg por Semana", "Sesiones", "Fecha Proyectada", "Probabilidad",
+               "Desactualizada"]
+
+    def __init__(self, store: WorkoutStore, model: str = "lineal"):
+        if model not in self.MODELS:
+            raise ValueError(f"Modelo desconocido: {model}")
+        self.store = store
+        self.model = model
+        self.decay = math.log(2) / self.HALF_LIFE_DAYS
+        self._sums = None
+        self._origin = None
+        self._last = None
+        self._now = 0
+        self._sessions: Dict[tuple, float] = {}
+        store.subscribe(self._on_append)
+
+    def _feature(self, days):
+        return np.log1p(days) if self.model == "log" else days
+
+    def _inverse(self, x):
+        return np.expm1(x) if self.model == "log" else x
+
+    def _terms(self, x, y, w):
+        """Aporte de cada sesión a las sumas (una fila por sesión)"""
+        return np.column_stack([w, w * x, w * y, w * x * x, w * x * y, w * y * y, w * w, np.ones_like(w)])
+
+    def _build(self) -> None:
+        workouts = self.store.frame
+        self._sessions = {}
+        if workouts.empty:
+            self._sums = np.zeros((len(EXERCISES), 8))
+            self._origin = np.full(len(EXERCISES), -1, dtype="int64")
+            self._last = self._origin.copy()
+            return
+        work = workouts[(workouts["Repeticiones"] > 0) & (workouts["Peso (kg)"] > 0)]
+        top = pd.DataFrame({
+            "code": EXERCISES.categorize(work["Ejercicio"]).cat.codes.to_numpy(),
+            "day": work["Fecha"].to_numpy().astype("datetime64[D]").astype("int64"),
+            "e1rm": epley_1rm(work["Peso (kg)"].to_numpy("float64"), work["Repeticiones"].to_numpy("float64")),
+        }).groupby(["code", "day"])["e1rm"].max()
+        self._sums = np.zeros((len(EXERCISES), 8))  # después de categorize: incluye los nombres nuevos
+        self._origin = np.full(len(EXERCISES), -1, dtype="int64")
+        self._last = self._origin.copy()
+        if top.empty:
+            return
+        codes = top.index.get_level_values("code").to_numpy()
+        days = top.index.get_level_values("day").to_numpy()
+        self._sessions = dict(zip(zip(codes.tolist(), days.tolist()), top.to_numpy().tolist()))
+        span = pd.Series(days).groupby(codes).agg(["min", "max"])
+        self._origin[span.index.to_numpy()] = span["min"].to_numpy()
+        self._last[span.index.to_numpy()] = span["max"].to_numpy()
+        self._now = int(days.max())
+        terms = self._terms(self._feature(days - self._origin[codes]), top.to_numpy(),
+                            np.exp(-self.decay * (self._now - days)))
+        np.add.at(self._sums, codes, terms)
+
+    def _on_append(self, rows) -> None:
+        """Actualiza solo las sesiones tocadas por el anexo (sin índice construido no hay nada que hacer)"""
+        if rows is None:  # filas corregidas o borradas: se rehace al consultar
+            self._sums = None
+        if self._sums is None:
+            return
+        for row in rows:
+            weight, reps = float(row["Peso (kg)"]), int(row["Repeticiones"])
+            if reps <= 0 or weight <= 0:
+                continue
+            code = EXERCISES.code(row["Ejercicio"])
+            day = int(np.datetime64(str(row["Fecha"])[:10], "D").astype("int64"))
+            if code >= len(self._sums):
+                grow = len(EXERCISES) - len(self._sums)
+                self._sums = np.vstack([self._sums, np.zeros((grow, 8))])
+                self._origin = np.concatenate([self._origin, np.full(grow, -1, dtype="int64")])
+                self._last = np.concatenate([self._last, np.full(grow, -1, dtype="int64")])
+            if self._origin[code] < 0:
+                self._origin[code] = day
+            elif day < self._origin[code]:
+                self._sums = None  # sesión anterior a la primera: cambia el eje x, se rehace al consultar
+                return
+            self._last[code] = max(self._last[code], day)
+            e1rm, previous = epley_1rm(weight, reps), self._sessions.get((code, day))
+            if previous is not None and e1rm <= previous:
+                continue
+            if day > self._now:
+                factor = math.exp(-self.decay * (day - self._now))
+                self._sums[:, :6] *= factor
+                self._sums[:, 6] *= factor * factor
+                self._now = day
+            x = self._feature(np.array([day - self._origin[code]], dtype="float64"))
+            w = np.array([math.exp(-self.decay * (self._now - day))])
+            terms = self._terms(x, np.array([e1rm]), w)[0]
+            if previous is not None:  # la sesión ya estaba: se reemplaza su máximo (el conteo no cambia)
+                terms -= self._terms(x, np.array([previous]), w)[0]
+            self._sums[code] += terms
+            self._sessions[(code, day)] = e1rm
+
+    def forecast(self, goals: pd.DataFrame, today: Optional[datetime] = None) -> pd.DataFrame:
+        """Proyección de cada meta (filas con Ejercicio, Meta Peso (kg), Meta Reps y Fecha Límite).
+
+        Fecha Proyectada es cuando la tendencia alcanza el 1RM de la meta; Probabilidad, la de
+        estar por encima en la fecha límite según el error de predicción de la regresión (ambas
+        vacías si quedan más lejos de hoy que lo que abarcan las sesiones).
+        Desactualizada marca los ejercicios con sesiones suficientes pero ninguna reciente.
+        """
+        if self._sums is None:
+            self._build()
+        today_day = int(np.datetime64(pd.Timestamp(today or datetime.now()).date(), "D").astype("int64"))
+        codes = np.array([EXERCISES.codes.get(str(name), -1) for name in goals["Ejercicio"]], dtype="int64")
+        known = (codes >= 0) & (codes < len(self._sums))
+        stats = np.where(known[:, None], self._sums[np.where(known, codes, 0)], 0.0)
+        origin = np.where(known, self._origin[np.where(known, codes, 0)], 0)
+        last = np.where(known, self._last[np.where(known, codes, 0)], 0)
+        W, Sx, Sy, Sxx, Sxy, Syy, Sww, sessions = stats.T
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            mean_x, mean_y = Sx / W, Sy / W
+            var_x = Sxx / W - mean_x ** 2
+            slope = (Sxy / W - mean_x * mean_y) / var_x
+            intercept = mean_y - slope * mean_x
+            n_eff = W ** 2 / Sww  # tamaño efectivo de la muestra ponderada
+            residual = np.clip(Syy / W - mean_y ** 2 - slope * (Sxy / W - mean_x * mean_y), 0, None) \
+                * n_eff / (n_eff - 2)
+            enough = (sessions >= self.MIN_SESSIONS) & (var_x > 0)
+            stale = enough & (today_day - last > self.STALE_DAYS)
+            fitted = enough & ~stale
+
+            target = epley_1rm(goals["Meta Peso (kg)"].to_numpy("float64"), goals["Meta Reps"].to_numpy("float64"))
+            deadline = pd.to_datetime(goals["Fecha Límite"]).to_numpy().astype("datetime64[D]").astype("int64")
+            x_today = self._feature(np.maximum(today_day - origin, 0).astype("float64"))
+            x_deadline = self._feature(np.maximum(deadline - origin, 0).astype("float64"))
+            trend = intercept + slope * x_today
+            # Pendiente en kg/semana hoy (en el modelo log, la derivada en x_today)
+            per_week = slope * 7 * (1 / (1 + np.maximum(today_day - origin, 0)) if self.model == "log" else 1)
+            predicted = intercept + slope * x_deadline
+            error = np.sqrt(residual * (1 + 1 / n_eff + (x_deadline - mean_x) ** 2 / (var_x * n_eff)))
+            z = (predicted - target) / error
+            probability = 0.5 * (1 + np.vectorize(math.erf, otypes=[float])(z / math.sqrt(2)))
+            probability = np.where(error > 0, probability, (predicted >= target).astype(float))
+            probability = np.where(deadline < today_day, 0.0, probability)  # vencida y sin cumplir
+            # No se proyecta más adelante de lo que abarcan los datos (ni de HORIZON_DAYS)
+            reach = np.minimum(self.HORIZON_DAYS, last - origin)
+            probability = np.where(deadline - today_day <= reach, probability, np.nan)
+
+            hit = np.round(origin + self._inverse(np.where(slope > 0, (target - intercept) / slope, np.nan)))
+            hit = np.where(trend >= target, today_day, np.maximum(hit, today_day))
+            hit = np.where(hit - today_day <= reach, hit, np.nan)
+
+        result = pd.DataFrame({
+            "Meta 1RM": target,
+            "1RM Tendencia": np.where(fitted, trend, np.nan),
+            "Kg por Semana": np.where(fitted, per_week, np.nan),
+            "Sesiones": sessions.astype("int64"),
+            "Fecha Proyectada": pd.to_datetime(np.where(fitted, hit, np.nan), unit="D"),
+            "Probabilidad": np.where(fitted, probability, np.nan),
+            "Desactualizada": stale,
+        }, index=goals.index)
+        return result
 
 class InputHandler:
     """Maneja todas las entradas de usuario y validaciones"""
+
+    SEARCH_LIMIT = 15  # resultados por búsqueda de ejercicio
     
     @staticmethod
     def get_date(prompt: str) -> datetime:
@@ -58,12 +2483,16 @@ class InputHandler:
                 print("Formato de fecha inválido. Use YYYY-MM-DD.")
 
     @staticmethod
-    def get_int(prompt: str) -> int:
+    def get_int(prompt: str, maximum: Optional[int] = None) -> int:
         while True:
             try:
-                return int(input(prompt))
+                value = int(input(prompt))
             except ValueError:
                 print("Debe ingresar un número entero válido.")
+                continue
+            if maximum is None or 0 <= value <= maximum:
+                return value
+            print(f"Debe estar entre 0 y {maximum}.")
 
     @staticmethod
     def select_option(options: List[str]) -> int:
@@ -80,11 +2509,34 @@ class InputHandler:
             except ValueError:
                 print("Ingrese un número válido")
 
+    @staticmethod
+    def select_exercise(exercises: List[str]) -> Optional[str]:
+        """Busca por nombre, alias o prefijo (con tolerancia a errores) entre los ejercicios dados"""
+        for name in exercises:  # los del historial que no están en el catálogo, solo en memoria
+            CATALOG.add(name, persist=False)
+        while True:
+            query = input("Buscar ejercicio (enter para listar, 0 para regresar): ").strip()
+            if query == "0":
+                return None
+            matches = CATALOG.search(query, InputHandler.SEARCH_LIMIT, within=exercises)
+            if not matches:
+                print("Sin coincidencias")
+                continue
+            choice = InputHandler.select_option(matches)
+            if choice != 0:
+                return matches[choice - 1]
+
 class WorkoutManager:
     """Maneja toda la lógica de registro de entrenamientos"""
-    
-    def __init__(self):
-        self.workouts = DataManager.load_data(WORKOUT_FILE)
+
+    RECENT_SETS = 20  # series que se listan para corregir o borrar
+
+    def __init__(self, store: Optional[WorkoutStore] = None):
+        self.store = store or WorkoutStore()
+
+    @property
+    def workouts(self) -> pd.DataFrame:
+        return self.store.frame
     
     def register_workout(self):
         date = InputHandler.get_date("Fecha (YYYY-MM-DD o enter para hoy): ")
@@ -98,10 +2550,25 @@ class WorkoutManager:
         if not exercises:
             return
             
-        workout_data = self._prepare_workout_data(date, routine, exercises)
-        DataManager.save_data(workout_data, WORKOUT_FILE)
+        self.log_workout(date, routine, exercises)
         print("\nEntrenamiento registrado exitosamente!")
 
+    def log_workout(self, date: datetime, routine: str, exercises: List[Dict]) -> List[Dict]:
+        """Guarda una sesión ya completa, sin prompts (los descansos no llevan ejercicios).
+
+        Los nombres se guardan en su forma canónica del catálogo (alias y acentos incluidos).
+        """
+        if routine in ["Descanso", "Enfermo"]:
+            workout_data = WorkoutBuffer(self.store.file_name)
+            workout_data.add(date, routine, routine, 0, 0)
+        else:
+            workout_data = self._prepare_workout_data(date, routine, exercises)
+        rows = list(workout_data)
+        DataManager.append_data(rows, self.store.file_name, WORKOUT_COLUMNS)
+        DataManager.flush(self.store.file_name)
+        self.store.append(workout_data)
+        return rows
+
     def _select_routine(self) -> str:
         routines = list(EXERCISE_POOL.keys()) + ["Descanso", "Enfermo"]
         print("\nSeleccione tipo de rutina:")
@@ -121,7 +2588,9 @@ class WorkoutManager:
                 exercise = input("Nombre del ejercicio: ").strip()
                 if not exercise:
                     break
-                custom_exercises.append(exercise)
+                exercise = self._canonical_exercise(exercise)
+                if exercise not in custom_exercises:
+                    custom_exercises.append(exercise)
         
         all_exercises = base_exercises + custom_exercises
         
@@ -139,6 +2608,19 @@ class WorkoutManager:
             
         return self._get_sets_info([all_exercises[i-1] for i in selected])
 
+    @staticmethod
+    def _canonical_exercise(name: str) -> str:
+        """Nombre del catálogo si ya existe (o el parecido que confirme el usuario); si no, el escrito"""
+        canonical = CATALOG.resolve(name)
+        if canonical:
+            if canonical != name:
+                print(f"  → {canonical}")
+            return canonical
+        similar = CATALOG.search(name, limit=1)
+        if similar and input(f"¿Quiso decir {similar[0]}? (s/n): ").strip().lower() == "s":
+            return similar[0]
+        return name
+
     def _parse_selection(self, input_str: str, max_items: int) -> List[int]:
         selected = set()
         parts = input_str.replace(" ", "").split(",")
@@ -178,100 +2660,171 @@ class WorkoutManager:
         same_weight = input("¿Mismo peso para todas las series? (s/n): ").lower()
         
         if same_weight == "s":
-            reps = InputHandler.get_int("Repeticiones por serie: ")
+            reps = InputHandler.get_int("Repeticiones por serie: ", MAX_REPS)
             weight = InputHandler.get_int("Peso (kg): ")
             return [{"reps": reps, "weight": weight}] * num_sets
         
         for i in range(num_sets):
             print(f"\nSerie {i+1}:")
-            reps = InputHandler.get_int("Repeticiones: ")
+            reps = InputHandler.get_int("Repeticiones: ", MAX_REPS)
             weight = InputHandler.get_int("Peso (kg): ")
             set_info.append({"reps": reps, "weight": weight})
         return set_info
 
-    def _prepare_workout_data(self, date: datetime, routine: str, exercises: List[Dict]) -> List[Dict]:
-        return [{
-            "Fecha": date.strftime("%Y-%m-%d"),
-            "Rutina": routine,
-            "Ejercicio": ex["name"],
-            "Repeticiones": set_data["reps"],
-            "Peso (kg)": set_data["weight"]
-        } for ex in exercises for set_data in ex["sets"]]
+    def _prepare_workout_data(self, date: datetime, routine: str, exercises: List[Dict]) -> WorkoutBuffer:
+        buffer = WorkoutBuffer(self.store.file_name)
+        for ex in exercises:
+            name = CATALOG.resolve(ex["name"]) or ex["name"].strip()
+            CATALOG.add(name, routine)
+            for set_data in ex["sets"]:
+                buffer.add(date, routine, name, set_data["reps"], set_data["weight"])
+        return buffer
 
     def _save_rest_day(self, date: datetime, reason: str):
-        DataManager.save_data([{
-            "Fecha": date.strftime("%Y-%m-%d"),
-            "Rutina": reason,
-            "Ejercicio": reason,
-            "Repeticiones": 0,
-            "Peso (kg)": 0
-        }], WORKOUT_FILE)
+        self.log_workout(date, reason, [])
+
+    def edit_sets(self):
+        """Corrige o borra una de las últimas series registradas"""
+        recent = self.workouts.tail(self.RECENT_SETS)
+        if recent.empty:
+            print("No hay entrenamientos registrados")
+            return
+        print("\nÚltimas series:")
+        rows = recent.to_dict("records")
+        for idx, row in enumerate(rows, 1):
+            print(f"{idx}. {row['Fecha']:%Y-%m-%d} {row['Ejercicio']}: "
+                  f"{row['Repeticiones']} reps @ {row['Peso (kg)']:g}kg")
+        choice = InputHandler.get_int("\nSeleccione la serie (0 para regresar): ")
+        if not 1 <= choice <= len(rows):
+            return
+        row = rows[choice - 1]
+        action = InputHandler.select_option(["Corregir", "Borrar"])
+        if action == 2:
+            self.delete_sets([row["ID"]])
+            print("\n🗑️ Serie borrada")
+        elif action == 1:
+            fields = {}
+            reps = input(f"Repeticiones [{row['Repeticiones']}]: ").strip()
+            weight = input(f"Peso (kg) [{row['Peso (kg)']:g}]: ").strip()
+            try:
+                if reps:
+                    fields["Repeticiones"] = int(reps)
+                if weight:
+                    fields["Peso (kg)"] = float(weight)
+            except ValueError:
+                print("Debe ingresar un número válido.")
+                return
+            if fields:
+                try:
+                    self.correct_set(row["ID"], fields)
+                except ValueError as e:
+                    print(str(e))
+                    return
+                print("\nSerie corregida!")
+
+    def correct_set(self, row_id: int, fields: Dict) -> Dict:
+        """Corrige campos de una serie guardada; solo anexa la corrección (se compacta con DataManager.compact)"""
+        change = self.correction(row_id, fields)
+        DataManager.require_row_ids(self.workouts, [row_id])
+        self._record([change])
+        return change
+
+    def delete_sets(self, row_ids: List[int]) -> List[Dict]:
+        """Borra series por ID con marcas de borrado (tombstones), sin reescribir el historial"""
+        changes = self.tombstones(row_ids)
+        if changes:
+            DataManager.require_row_ids(self.workouts, row_ids)
+            self._record(changes)
+        return changes
+
+    def _record(self, changes: List[Dict]) -> None:
+        DataManager.record_changes(changes, self.store.file_name)
+        self.store.apply_changes(changes)
+
+    @staticmethod
+    def correction(row_id: int, fields: Dict) -> Dict:
+        """Cambio validado para la tabla de cambios (Fecha, Rutina, Ejercicio, Repeticiones, Peso (kg)).
+
+        Solo valida los campos; que el ID exista lo comprueba quien tiene el historial (require_row_ids).
+        """
+        unknown = set(fields) - set(WORKOUT_COLUMNS[:-1])
+        if unknown:
+            raise ValueError(f"Campos no editables: {', '.join(sorted(unknown))}")
+        if not fields:
+            raise ValueError("No hay campos para corregir")
+        if "Rutina" in fields and fields["Rutina"] not in ROUTINES.codes:
+            raise ValueError(f"Rutina desconocida: {fields['Rutina']}")
+        if "Repeticiones" in fields and not 0 <= int(fields["Repeticiones"]) <= MAX_REPS:
+            raise ValueError(f"Repeticiones fuera de rango (0-{MAX_REPS}): {fields['Repeticiones']}")
+        change = {"ID": int(row_id), "Cambio": CHANGE_CORRECT, **fields}
+        if "Fecha" in change:
+            change["Fecha"] = _date_text(change["Fecha"])
+        if "Ejercicio" in change:
+            change["Ejercicio"] = CATALOG.resolve(change["Ejercicio"]) or str(change["Ejercicio"]).strip()
+        return change
+
+    @staticmethod
+    def tombstones(row_ids: List[int]) -> List[Dict]:
+        return [{"ID": int(row_id), "Cambio": CHANGE_DELETE} for row_id in row_ids]
 
 class GoalManager:
     """Maneja la configuración y seguimiento de metas"""
-    def __init__(self):
-        self._initialize_goals_file()
-        self.goals = self._load_goals()
-        self.workouts = DataManager.load_data(WORKOUT_FILE)
+    def __init__(self, store: Optional[WorkoutStore] = None, athlete: Optional[Athlete] = None):
+        athlete = athlete or Athlete()
+        self.goals_file = athlete.goals_file  # se crea al guardar la primera meta
+        self._goals: Optional[pd.DataFrame] = None
+        self.store = store or WorkoutStore(athlete.workout_file)
+        self._forecasters: Dict[str, GoalForecaster] = {}
 
-    def _initialize_goals_file(self):
-        """Crea el archivo con estructura inicial si no existe"""
-        if not os.path.exists(GOALS_FILE):
-            DataManager.save_data(
-                data=[],
-                file_name=GOALS_FILE,
-                mode="w",
-                columns=["Ejercicio", "Meta Peso (kg)", "Meta Reps", "Fecha Límite"]
-            )
-    
+    @property
+    def goals(self) -> pd.DataFrame:
+        """Las metas se cargan al usarlas por primera vez"""
+        if self._goals is None:
+            self._goals = self._load_goals()
+        return self._goals
+
+    @goals.setter
+    def goals(self, value: pd.DataFrame):
+        self._goals = value
+
+    @property
+    def workouts(self) -> pd.DataFrame:
+        return self.store.frame
+
+    @instrumented
     def _load_goals(self) -> pd.DataFrame:
-        """Carga las metas con validación de estructura y tipos"""
-        try:
-            # Leer CSV sin parsear fechas primero
-            goals = pd.read_csv(
-                GOALS_FILE,
-                dtype={
-                    "Ejercicio": "category",
-                    "Meta Peso (kg)": "float64",
-                    "Meta Reps": "int32",
-                    "Fecha Límite": "object"  # Leer como string primero
-                }
-            )
-            
-            # Convertir columna de fecha manualmente
-            if "Fecha Límite" in goals.columns:
-                goals["Fecha Límite"] = pd.to_datetime(
-                    goals["Fecha Límite"],
-                    format="%Y-%m-%d",
-                    errors="coerce"
-                )
-            
-            return goals.dropna(how="all")
-        
-        except Exception as e:
-            print(f"Error cargando metas: {str(e)}")
-            return pd.DataFrame(columns=["Ejercicio", "Meta Peso (kg)", "Meta Reps", "Fecha Límite"])
+        """Carga las metas con validación de estructura y tipos.
+
+        Un archivo ilegible es un error, no una lista vacía: si no, guardar una meta
+        reescribiría el archivo sin las demás.
+        """
+        # Los tipos (categoría, enteros, fecha límite) los aplica el motor según TABLE_SCHEMAS
+        goals = DataManager.load_data(self.goals_file)
+        if goals.empty:
+            return StorageBackend.apply_schema(pd.DataFrame(columns=GOAL_COLUMNS), self.goals_file)
+        return goals.dropna(how="all")
         
+    @instrumented
     def _save_goals(self):
-        """Guarda las metas con formato controlado y manejo de errores"""
+        """Guarda las metas con formato controlado; un error de escritura llega a quien guarda"""
+        # Convertir a formato de guardado compatible
+        save_data = self.goals.copy()
+        save_data["Fecha Límite"] = save_data["Fecha Límite"].dt.strftime("%Y-%m-%d")
+
         try:
-            # Convertir a formato de guardado compatible
-            save_data = self.goals.copy()
-            save_data["Fecha Límite"] = save_data["Fecha Límite"].dt.strftime("%Y-%m-%d")
-            
             DataManager.save_data(
                 save_data.to_dict("records"),
-                GOALS_FILE,
+                self.goals_file,
                 mode="w"
             )
-        except Exception as e:
-            print(f"Error crítico guardando metas: {str(e)}")
+        except Exception:
+            # Lo que no llegó al disco no queda en memoria: la próxima lectura vuelve al archivo
+            self._goals = None
             raise
         
     def _initialize_columns(self):
         """Asegura que el DataFrame tenga las columnas necesarias"""
-        required_columns = ["Ejercicio", "Meta Peso (kg)", "Meta Reps", "Fecha Límite"]
-        for col in required_columns:
+        for col in GOAL_COLUMNS:
             if col not in self.goals.columns:
                 self.goals[col] = pd.Series(dtype='object' if col == "Ejercicio" else 'float64')
     
@@ -296,18 +2849,14 @@ class GoalManager:
                 self.delete_goal()
 
     def set_goal(self):
-        unique_exercises = self.workouts["Ejercicio"].unique()
+        unique_exercises = self.store.exercises()
         if len(unique_exercises) == 0:
             print("Primero registre algunos entrenamientos")
             return
-            
-        print("\nEjercicios disponibles:")
-        choice = InputHandler.select_option(list(unique_exercises))
-        if choice == 0:
-            return
-            
-        exercise = unique_exercises[choice-1]
-        self._update_goal(exercise)
+
+        exercise = InputHandler.select_exercise(unique_exercises)
+        if exercise:
+            self._update_goal(exercise)
 
     def _update_goal(self, exercise: str):
         """Actualiza o crea una nueva meta para un ejercicio"""
@@ -322,23 +2871,34 @@ class GoalManager:
         target_reps = InputHandler.get_int("Repeticiones objetivo: ")
         deadline = InputHandler.get_date("Fecha límite (YYYY-MM-DD): ")
         
-        # Eliminar meta existente si existe
-        if not self.goals.empty:
-            self.goals = self.goals[self.goals["Ejercicio"] != exercise]
-        
-        # Crear nueva meta con tipos controlados
-        new_goal = pd.DataFrame([{
-            "Ejercicio": str(exercise),
-            "Meta Peso (kg)": float(target_weight),
-            "Meta Reps": int(target_reps),
-            "Fecha Límite": pd.to_datetime(deadline)
-        }])
-        
-        # Actualizar DataFrame y guardar
-        self.goals = pd.concat([self.goals, new_goal], ignore_index=True)
-        self._save_goals()
+        self.save_goal(exercise, target_weight, target_reps, deadline)
         print("\n✅ Meta registrada exitosamente!")
 
+    @instrumented
+    def save_goal(self, exercise: str, target_weight: float, target_reps: int, deadline: datetime) -> Dict:
+        """Crea o reemplaza la meta de un ejercicio, sin prompts; devuelve la meta ya escrita"""
+        exercise = CATALOG.resolve(exercise) or exercise
+        with FileLock(self.goals_file):
+            # Releer bajo el bloqueo para no pisar metas guardadas por otra terminal
+            self.goals = self._load_goals()
+
+            # Eliminar meta existente si existe
+            if not self.goals.empty:
+                self.goals = self.goals[self.goals["Ejercicio"] != exercise]
+            
+            # Crear nueva meta con tipos controlados
+            new_goal = pd.DataFrame([{
+                "Ejercicio": str(exercise),
+                "Meta Peso (kg)": float(target_weight),
+                "Meta Reps": int(target_reps),
+                "Fecha Límite": pd.to_datetime(deadline)
+            }])
+            
+            # Actualizar DataFrame y guardar
+            self.goals = pd.concat([self.goals, new_goal], ignore_index=True)
+            self._save_goals()
+        return {**new_goal.iloc[0].to_dict(), "Fecha Límite": new_goal["Fecha Límite"].iloc[0].strftime("%Y-%m-%d")}
+
     def view_goals(self):
         if self.goals.empty:
             print("No hay metas establecidas")
@@ -361,82 +2921,122 @@ class GoalManager:
         
         try:
             choice = InputHandler.get_int("\nSeleccione la meta a eliminar: ")
-            if 1 <= choice <= len(self.goals):
-                # Eliminar y resetear índice
-                self.goals = self.goals.drop(self.goals.index[choice-1]).reset_index(drop=True)
-                self._save_goals()
+            if self.remove_goal(choice):
                 print("\n🗑️ Meta eliminada exitosamente!")
             else:
                 print("⚠️ Número fuera de rango válido")
         except Exception as e:
             print(f"🚨 Error al eliminar meta: {str(e)}")
     
+    @instrumented
+    def remove_goal(self, position: int) -> bool:
+        """Elimina la meta en la posición indicada (empezando en 1)"""
+        if not 1 <= position <= len(self.goals):
+            return False
+        exercise = self.goals["Ejercicio"].iloc[position-1]
+        with FileLock(self.goals_file):
+            # Releer bajo el bloqueo y borrar por ejercicio: la posición pudo cambiar en otra terminal
+            self.goals = self._load_goals()
+            self.goals = self.goals[self.goals["Ejercicio"] != exercise].reset_index(drop=True)
+            self._save_goals()
+        return True
+
+    def limits(self) -> pd.DataFrame:
+        """Pares (Ejercicio, Fecha Límite) de las metas, con el mismo índice que goal_progress"""
+        limits = self.goals[["Ejercicio", "Fecha Límite"]].reset_index(drop=True)
+        limits["Fecha Límite"] = pd.to_datetime(limits["Fecha Límite"])
+        return limits
+
+    @instrumented
+    def goal_progress(self, maxima: Optional[pd.DataFrame] = None) -> pd.DataFrame:
+        """Calcula máximos, cumplimiento y déficit de todas las metas en una sola pasada.
+
+        maxima permite pasar los máximos ya calculados (p. ej. por StreamingAggregator).
+        """
+        progress = self.goals[GOAL_COLUMNS].reset_index(drop=True)
+        progress["Fecha Límite"] = pd.to_datetime(progress["Fecha Límite"])
+        if maxima is None:
+            maxima = self.store.exercise_maxima(progress[["Ejercicio", "Fecha Límite"]])
+        progress["Máx Peso (kg)"] = maxima["Peso (kg)"]
+        progress["Máx Reps"] = maxima["Repeticiones"]
+
+        # Las comparaciones con NaN (sin datos) dan False, igual que antes
+        progress["Peso OK"] = progress["Máx Peso (kg)"] >= progress["Meta Peso (kg)"]
+        progress["Reps OK"] = progress["Máx Reps"] >= progress["Meta Reps"]
+        progress["Cumplida"] = progress["Peso OK"] & progress["Reps OK"]
+        progress["Falta Peso (kg)"] = (progress["Meta Peso (kg)"] - progress["Máx Peso (kg)"]).clip(lower=0)
+        progress["Falta Reps"] = (progress["Meta Reps"] - progress["Máx Reps"]).clip(lower=0)
+        return progress
+
+    @instrumented
+    def forecast(self, model: str = "lineal", today: Optional[datetime] = None) -> pd.DataFrame:
+        """goal_progress más la proyección de cada meta; las cumplidas tienen probabilidad 1"""
+        if model not in self._forecasters:
+            self._forecasters[model] = GoalForecaster(self.store, model)
+        progress = self.goal_progress()
+        result = pd.concat([progress, self._forecasters[model].forecast(progress, today)], axis=1)
+        met = result["Cumplida"]
+        result.loc[met, "Probabilidad"] = 1.0
+        result.loc[met, "Fecha Proyectada"] = pd.NaT
+        return result
+
     def compare_goals(self):
         """Compara el progreso actual con las metas establecidas"""
         if self.goals.empty:
             print("\n⚠️ No hay metas registradas")
             return
             
-        if self.workouts.empty:
+        if not self.store.exercises():
             print("\n⚠️ No hay entrenamientos registrados")
             return
             
         print("\n🔍 Comparación con metas:")
-        for _, goal in self.goals.iterrows():
-            exercise = goal["Ejercicio"]
-            target_weight = goal["Meta Peso (kg)"]
-            target_reps = goal["Meta Reps"]
-            deadline = pd.to_datetime(goal["Fecha Límite"])
-            
-            # Filtrar entrenamientos válidos
-            exercise_data = self.workouts[
-                (self.workouts["Ejercicio"] == exercise) &
-                (pd.to_datetime(self.workouts["Fecha"]) <= deadline)
-            ]
-            
-            # Calcular máximos
-            max_weight = exercise_data["Peso (kg)"].max()
-            max_reps = exercise_data["Repeticiones"].max()
-            
-            # Mostrar resultados
-            self._display_comparison(
-                exercise=exercise,
-                target_weight=target_weight,
-                target_reps=target_reps,
-                max_weight=max_weight,
-                max_reps=max_reps,
-                deadline=deadline
-            )
+        for result in self.forecast().to_dict("records"):
+            self._display_comparison(result)
         
         input("\nPresione Enter para continuar...")
 
-    def _display_comparison(self, exercise: str, target_weight: float, target_reps: int,
-                          max_weight: float, max_reps: float, deadline: datetime):
-        """Muestra los resultados de la comparación de forma estructurada"""
-        print(f"\n🏋️ Ejercicio: {exercise}")
-        print(f"   Meta: {target_reps} reps @ {target_weight}kg")
-        print(f"   Máximo alcanzado: {self._safe_value(max_reps)} reps @ {self._safe_value(max_weight)}kg")
-        print(f"   Fecha límite: {deadline.strftime('%Y-%m-%d')}")
-        
-        weight_ok = max_weight >= target_weight if not pd.isna(max_weight) else False
-        reps_ok = max_reps >= target_reps if not pd.isna(max_reps) else False
+    def _display_comparison(self, result: Dict):
+        """Muestra una fila ya calculada por goal_progress de forma estructurada"""
+        print(f"\n🏋️ Ejercicio: {result['Ejercicio']}")
+        print(f"   Meta: {result['Meta Reps']} reps @ {result['Meta Peso (kg)']}kg")
+        print(f"   Máximo alcanzado: {int(self._safe_value(result['Máx Reps']))} reps @ "
+              f"{self._safe_value(result['Máx Peso (kg)'])}kg")
+        print(f"   Fecha límite: {result['Fecha Límite'].strftime('%Y-%m-%d')}")
         
-        if weight_ok and reps_ok:
+        if result["Cumplida"]:
             print("   ✅ Meta cumplida!")
         else:
-            self._show_pending(target_weight, max_weight, target_reps, max_reps)
+            self._show_pending(result["Falta Peso (kg)"], result["Falta Reps"])
+            self._show_forecast(result)
+
+    def _show_forecast(self, result: Dict):
+        """Tendencia y proyección de una fila de forecast (si hay sesiones suficientes)"""
+        if result.get("Desactualizada"):
+            print(f"   📈 Sin sesiones en los últimos {GoalForecaster.STALE_DAYS} días: proyección no disponible")
+            return
+        if pd.isna(result.get("1RM Tendencia")):
+            print("   📈 Sin sesiones suficientes para proyectar")
+            return
+        print(f"   📈 1RM est. {result['1RM Tendencia']:.1f}kg (meta {result['Meta 1RM']:.1f}kg), "
+              f"{result['Kg por Semana']:+.2f}kg/semana")
+        when = ("sin fecha dentro del rango de los datos" if pd.isna(result["Fecha Proyectada"])
+                else f"hacia el {result['Fecha Proyectada']:%Y-%m-%d}")
+        chance = ("la fecha límite está fuera del rango de los datos" if pd.isna(result["Probabilidad"])
+                  else f"probabilidad de cumplirla a tiempo {result['Probabilidad']:.0%}")
+        print(f"   🎯 Proyección: {when}; {chance}")
 
     def _safe_value(self, value):
         """Maneja valores NaN"""
         return value if not pd.isna(value) else 0
 
-    def _show_pending(self, target_weight, max_weight, target_reps, max_reps):
+    def _show_pending(self, missing_weight: float, missing_reps: float):
         """Muestra lo que falta para cumplir la meta"""
         missing = []
-        if max_weight < target_weight:
-            missing.append(f"{(target_weight - max_weight):.1f}kg de peso")
-        if max_reps < target_reps:
-            missing.append(f"{(target_reps - max_reps)} reps")
+        if missing_weight > 0:
+            missing.append(f"{missing_weight:.1f}kg de peso")
+        if missing_reps > 0:
+            missing.append(f"{int(missing_reps)} reps")
         
         if missing:
             print(f"   🚫 Pendiente: {', '.join(missing)}")
@@ -445,10 +3045,22 @@ class GoalManager:
 
 class ProgressTracker:
     """Maneja el análisis de progreso y estadísticas"""
+
+    # Ventanas de los gráficos de progresión (días hacia atrás); con particiones solo se leen esos períodos
+    HISTORY_WINDOWS = {"Todo el historial": None, "Último año": 365, "Últimos 6 meses": 182,
+                       "Últimos 3 meses": 91}
     
-    def __init__(self, goal_manager: GoalManager):
-        self.workouts = DataManager.load_data(WORKOUT_FILE)
+    def __init__(self, goal_manager: GoalManager, body_weight: Optional[BodyWeightTracker] = None):
         self.goal_manager = goal_manager
+        self.store = goal_manager.store
+        self.training_load = TrainingLoad(self.store)
+        # El peso corporal vive junto a los entrenamientos del mismo atleta
+        self.body_weight = body_weight or BodyWeightTracker(
+            os.path.join(os.path.dirname(self.store.file_name), WEIGHT_FILE))
+
+    @property
+    def workouts(self) -> pd.DataFrame:
+        return self.store.frame
     
     def show_stats(self):
         while True:
@@ -456,7 +3068,11 @@ class ProgressTracker:
             options = [
                 "Distribución de rutinas",
                 "Progresión de ejercicios",
-                "Comparación con metas"
+                "Comparación con metas",
+                "Récords personales",
+                "Exportar reporte de gráficos",
+                "Carga de entrenamiento",
+                "Peso corporal"
             ]
             choice = InputHandler.select_option(options)
             
@@ -468,6 +3084,67 @@ class ProgressTracker:
                 self.analyze_exercise_progress()
             elif choice == 3:
                 self.goal_manager.compare_goals()
+            elif choice == 4:
+                self.show_records()
+            elif choice == 5:
+                self.export_report()
+            elif choice == 6:
+                self.plot_training_load()
+            elif choice == 7:
+                self.plot_body_weight()
+
+    @instrumented
+    def stats_summary(self, streaming: bool = False, chunk_size: Optional[int] = None) -> Dict:
+        """Estadísticas en formato serializable (para la línea de comandos).
+
+        Con streaming=True el historial se recorre por bloques de chunk_size filas y la memoria
+        no depende de su tamaño; los resultados son los mismos que cargándolo entero.
+        """
+        has_goals = not self.goal_manager.goals.empty
+        if streaming:
+            stream = StreamingAggregator(self.store.file_name, chunk_size,
+                                         self.goal_manager.limits() if has_goals else None).run()
+            routines, records, weekly = stream.routine_counts(), stream.records(), stream.weekly_volume()
+            goals = self.goal_manager.goal_progress(stream.goal_maxima()) if has_goals else pd.DataFrame()
+        else:
+            routines = pd.Series(dtype="int64") if self.workouts.empty else self.routine_counts()
+            records = self.store.records.to_frame()
+            weekly = self.training_load.weekly_tonnage()
+            goals = self.goal_manager.goal_progress() if has_goals else pd.DataFrame()
+        records["Última Fecha"] = pd.to_datetime(records["Última Fecha"]).dt.strftime("%Y-%m-%d")
+        if not goals.empty:
+            goals["Fecha Límite"] = goals["Fecha Límite"].dt.strftime("%Y-%m-%d")
+        if not weekly.empty:
+            weekly = weekly.set_axis(weekly.index.strftime("%Y-%m-%d")).rename(columns=str)
+        return {
+            "routines": {str(k): int(v) for k, v in routines.items()},
+            "records": json.loads(records.to_json(orient="index", force_ascii=False, date_format="iso")),
+            "goals": json.loads(goals.to_json(orient="records", force_ascii=False, date_format="iso")),
+            "weekly_volume": json.loads(weekly.round(1).to_json(orient="index", force_ascii=False, date_format="iso")),
+        }
+
+    def show_records(self):
+        """Muestra los récords por ejercicio desde el índice precalculado"""
+        records = self.store.records.to_frame()
+        if records.empty:
+            print("No hay datos de entrenamientos")
+            return
+
+        print("\n🏆 Récords personales:")
+        for exercise, record in records.iterrows():
+            print(f"{exercise}: {record['Peso (kg)']:.1f}kg | {record['Repeticiones']} reps | "
+                  f"1RM est. {record['1RM Estimado']:.1f}kg | Volumen {record['Volumen']:.0f}kg | "
+                  f"Última vez {record['Última Fecha']:%Y-%m-%d}")
+
+    @instrumented
+    def routine_counts(self) -> pd.Series:
+        """Número de días por rutina (la primera rutina registrada en cada fecha)"""
+        return self.count_days(self.workouts.groupby('Fecha')['Rutina'].first())
+
+    @staticmethod
+    def count_days(day_routines: pd.Series) -> pd.Series:
+        counts = day_routines.value_counts()
+        return counts[counts > 0]  # las categorías sin días no se muestran
 
     def plot_routine_distribution(self):
         if self.workouts.empty:
@@ -475,103 +3152,532 @@ class ProgressTracker:
             return
         
         try:
-            # Obtener días únicos por rutina
-            unique_days = self.workouts.groupby('Fecha')['Rutina'].first().reset_index()
-            routine_counts = unique_days['Rutina'].value_counts()
-
-            # Crear figura
-            plt.figure(figsize=(12, 6))
-            ax = routine_counts.plot(kind='bar', 
-                                color='#4CAF50', 
-                                edgecolor='black',
-                                alpha=0.8)
-            
-            # Personalizar gráfico
-            plt.title('Distribución de Rutinas por Día', fontsize=14, pad=20)
-            plt.xlabel('Tipo de Rutina', fontsize=12, labelpad=10)
-            plt.ylabel('Número de Días', fontsize=12, labelpad=10)
-            plt.xticks(rotation=45, ha='right', fontsize=10)
-            plt.yticks(fontsize=10)
-            plt.grid(axis='y', linestyle='--', alpha=0.7)
-
-            # Añadir etiquetas de datos
-            for i, count in enumerate(routine_counts):
-                ax.text(i, 
-                        count + 0.5, 
-                        str(count), 
-                        ha='center', 
-                        va='bottom',
-                        fontsize=10,
-                        color='black',
-                        fontweight='bold')
-
-            # Añadir línea de promedio
-            mean_line = routine_counts.mean()
-            plt.axhline(mean_line, 
-                    color='red', 
-                    linestyle='--', 
-                    linewidth=1.5,
-                    label=f'Promedio: {mean_line:.1f} días')
-            plt.legend()
-
-            plt.tight_layout()
+            self._draw_routine_distribution(self.routine_counts())
             plt.show()
 
         except KeyError as e:
             print(f"Error en los datos: {str(e)}")
         except Exception as e:
             print(f"Error al generar el gráfico: {str(e)}")
+
+    @instrumented
+    @staticmethod
+    def _draw_routine_distribution(routine_counts: pd.Series):
+        # Crear figura
+        fig = plt.figure(figsize=(12, 6))
+        ax = routine_counts.plot(kind='bar', 
+                            color='#4CAF50', 
+                            edgecolor='black',
+                            alpha=0.8)
+        
+        # Personalizar gráfico
+        plt.title('Distribución de Rutinas por Día', fontsize=14, pad=20)
+        plt.xlabel('Tipo de Rutina', fontsize=12, labelpad=10)
+        plt.ylabel('Número de Días', fontsize=12, labelpad=10)
+        plt.xticks(rotation=45, ha='right', fontsize=10)
+        plt.yticks(fontsize=10)
+        plt.grid(axis='y', linestyle='--', alpha=0.7)
+
+        # Añadir etiquetas de datos
+        for i, count in enumerate(routine_counts):
+            ax.text(i, 
+                    count + 0.5, 
+                    str(count), 
+                    ha='center', 
+                    va='bottom',
+                    fontsize=10,
+                    color='black',
+                    fontweight='bold')
+
+        # Añadir línea de promedio
+        mean_line = routine_counts.mean()
+        plt.axhline(mean_line, 
+                color='red', 
+                linestyle='--', 
+                linewidth=1.5,
+                label=f'Promedio: {mean_line:.1f} días')
+        plt.legend()
+
+        plt.tight_layout()
+        return fig
     
+    def plot_training_load(self):
+        if self.training_load.sets().empty:
+            print("No hay series registradas")
+            return
+        current = self.training_load.acwr().iloc[-1]
+        if not pd.isna(current["ACWR"]):
+            print(f"\nACWR al {current.name:%Y-%m-%d}: {current['ACWR']:.2f} ({current['Zona']})")
+        self._draw_training_load(self.training_load.weekly_tonnage(), self.training_load.acwr())
+        plt.show()
+
+    def plot_body_weight(self):
+        data = self.body_weight.frame()
+        if data.empty:
+            print("No hay pesajes registrados")
+            return
+        rate = self.body_weight.weekly_rate().dropna()
+        latest = data.iloc[-1]
+        print(f"\nTendencia al {latest.name:%Y-%m-%d}: {latest['Tendencia']:.1f}kg"
+              + (f" ({rate.iloc[-1]:+.2f}kg/semana)" if not rate.empty else ""))
+        relative = self.body_weight.relative_strength(self.training_load).dropna(subset=["Fuerza Relativa"])
+        for exercise, row in relative.groupby("Ejercicio", observed=True).last().iterrows():
+            print(f"{exercise}: {row['Fuerza Relativa']:.2f}x peso corporal (1RM est. {row['Epley']:.1f}kg)")
+        self._draw_body_weight(data, rate)
+        plt.show()
+
+    @instrumented
+    @staticmethod
+    def _draw_body_weight(data: pd.DataFrame, rate: pd.Series):
+        """Pesajes con su tendencia y, debajo, el ritmo semanal de cambio"""
+        fig, (top, bottom) = plt.subplots(2, 1, figsize=(12, 8), sharex=True, height_ratios=[2, 1])
+        weights = downsample_series(data["Peso (kg)"])
+        trend = downsample_series(data["Tendencia"])
+        top.scatter(weights.index, weights.to_numpy(), s=12, color="gray", alpha=0.6, label="Pesajes")
+        top.plot(trend.index, trend.to_numpy(), color="#1f77b4", linewidth=2, label="Tendencia (EWMA)")
+        top.set_title("Peso corporal", fontsize=14)
+        top.set_ylabel("kg")
+        top.legend(loc="upper left")
+        top.grid(True, linestyle="--", alpha=0.7)
+
+        rate = downsample_series(rate)
+        bottom.bar(rate.index, rate.to_numpy(), width=5,
+                   color=["#4CAF50" if value <= 0 else "#FF9800" for value in rate.to_numpy()])
+        bottom.axhline(0, color="black", linewidth=0.8)
+        bottom.set_title("Cambio semanal de la tendencia", fontsize=12)
+        bottom.set_xlabel("Fecha")
+        bottom.set_ylabel("kg/semana")
+        bottom.grid(axis="y", linestyle="--", alpha=0.7)
+        fig.tight_layout()
+        return fig
+
+    @instrumented
+    @staticmethod
+    def _draw_training_load(weekly: pd.DataFrame, acwr: pd.DataFrame):
+        """Tonelaje semanal apilado por grupo con su media móvil, y ACWR con la zona óptima sombreada"""
+        fig, (top, bottom) = plt.subplots(2, 1, figsize=(12, 8), sharex=True)
+        top.stackplot(weekly.index, weekly.T.to_numpy(), labels=[str(c) for c in weekly.columns], alpha=0.7)
+        top.plot(weekly.index, weekly.sum(axis=1).rolling(TrainingLoad.ROLLING_WEEKS, min_periods=1).mean(),
+                 color="black", linestyle="--", label=f"Media {TrainingLoad.ROLLING_WEEKS} semanas")
+        top.set_title("Tonelaje semanal por grupo muscular", fontsize=14)
+        top.set_ylabel("kg x reps")
+        top.legend(loc="upper left")
+        top.grid(axis="y", linestyle="--", alpha=0.7)
+
+        ratio = downsample_series(acwr["ACWR"].dropna())
+        bottom.plot(ratio.index, ratio.to_numpy(), color="#1f77b4")
+        bottom.axhspan(0.8, 1.3, color="#4CAF50", alpha=0.2, label="Zona óptima (0.8-1.3)")
+        bottom.axhline(1.5, color="red", linestyle="--", linewidth=1.2, label="Riesgo (>1.5)")
+        bottom.set_title("Relación carga aguda:crónica (7/28 días)", fontsize=14)
+        bottom.set_xlabel("Fecha")
+        bottom.set_ylabel("ACWR")
+        bottom.legend(loc="upper left")
+        bottom.grid(True, linestyle="--", alpha=0.7)
+        fig.tight_layout()
+        return fig
+
     def _select_exercise(self) -> Optional[str]:
         """Muestra lista de ejercicios y permite seleccionar uno"""
-        unique_exercises = self.workouts["Ejercicio"].unique()
+        unique_exercises = self.store.exercises()
         
         if len(unique_exercises) == 0:
             print("No hay ejercicios registrados")
             return None
-            
-        print("\nEjercicios disponibles:")
-        for idx, exercise in enumerate(unique_exercises, 1):
-            print(f"{idx}. {exercise}")
-            
-        while True:
-            try:
-                choice = int(input("Seleccione el ejercicio (0 para cancelar): "))
-                if choice == 0:
-                    return None
-                if 1 <= choice <= len(unique_exercises):
-                    return unique_exercises[choice - 1]
-                print("Número inválido")
-            except ValueError:
-                print("Ingrese un número válido")
+        return InputHandler.select_exercise(unique_exercises)
 
     def analyze_exercise_progress(self):
         exercise = self._select_exercise()
         if not exercise:
             return
-            
-        exercise_data = self.workouts[self.workouts["Ejercicio"] == exercise]
-        self._plot_progression(exercise_data, "Repeticiones", "Evolución de Repeticiones")
-        self._plot_progression(exercise_data, "Peso (kg)", "Evolución de Peso")
-
-    def _plot_progression(self, data: pd.DataFrame, metric: str, title: str):
-        dates = pd.to_datetime(data["Fecha"]).dt.date
-        plt.figure(figsize=(10, 5))
-        plt.plot(dates, data[metric], marker="o")
+
+        print("\nAgrupar progresión:")
+        modes = [None, "sesion", "semana", "mes"]
+        choice = InputHandler.select_option(["Todas las series", "Por sesión", "Por semana", "Por mes"])
+        if choice == 0:
+            return
+        period = modes[choice - 1]
+
+        print("\nVentana:")
+        windows = list(self.HISTORY_WINDOWS)
+        window = InputHandler.select_option(windows)
+        if window == 0:
+            return
+        days = self.HISTORY_WINDOWS[windows[window - 1]]
+        start = datetime.now() - timedelta(days=days) if days else None
+
+        exercise_data = self.store.exercise_history(exercise, start=start)
+        if exercise_data.empty:
+            print("No hay series de este ejercicio en la ventana elegida")
+            return
+        if period is None:
+            self._plot_progression(exercise_data, "Repeticiones", "Evolución de Repeticiones")
+            self._plot_progression(exercise_data, "Peso (kg)", "Evolución de Peso")
+            return
+
+        metrics = ["Serie Top (kg)", "Volumen (kg)", "1RM Estimado (kg)"]
+        print("\nMétrica:")
+        choice = InputHandler.select_option(metrics)
+        if choice != 0:
+            self._plot_progression(exercise_data, metrics[choice - 1], f"{metrics[choice - 1]} por {period}", period)
+
+    def _plot_progression(self, data: pd.DataFrame, metric: str, title: str, period: Optional[str] = None):
+        self._draw_progression(data, metric, title, period)
+        plt.show()
+
+    @instrumented
+    @staticmethod
+    def _draw_progression(data: pd.DataFrame, metric: str, title: str, period: Optional[str] = None):
+        """Dibuja la progresión; con período se agrega primero y siempre se limita a PLOT_POINT_BUDGET puntos"""
+        if period:
+            series = aggregate_progression(data, period, metric)
+        else:
+            series = pd.Series(data[metric].to_numpy(), index=pd.to_datetime(data["Fecha"]))
+        series = downsample_series(series)
+
+        fig = plt.figure(figsize=(10, 5))
+        plt.plot(series.index.date, series.to_numpy(), marker="o")
         plt.title(f"{title} - {data['Ejercicio'].iloc[0]}")
         plt.xlabel("Fecha")
         plt.ylabel(metric)
         plt.grid(True)
         plt.tight_layout()
-        plt.show()
+        return fig
+
+    def export_report(self):
+        """Exporta todos los gráficos a archivos sin abrir ventanas"""
+        fmt = input("Formato (png/svg, enter para png): ").strip().lower() or "png"
+        if fmt not in ReportGenerator.FORMATS:
+            print("Formato inválido")
+            return
+        generator = ReportGenerator(self, fmt=fmt)
+        summary = generator.generate()
+        print(f"Reporte en {generator.output_dir}: {summary['rendered']} gráficos generados, "
+              f"{summary['skipped']} sin cambios")
+
+class StreamingAggregator:
+    """Estadísticas del historial leyendo bloques de tamaño fijo (DataManager.iter_data).
+
+    Cada bloque deja agregados parciales que se combinan con los anteriores: primera rutina de
+    cada fecha, resumen de récords por ejercicio, tonelaje por semana y grupo y máximos hasta la
+    fecha límite de cada meta. Lo que se guarda crece con los días y ejercicios distintos, no con
+    las filas, así que un registro más grande que la RAM se procesa con memoria constante.
+    """
+
+    CHUNK_SIZE = 200_000
+
+    def __init__(self, file_name: str, chunk_size: Optional[int] = None, limits: Optional[pd.DataFrame] = None):
+        self.file_name = file_name
+        self.chunk_size = chunk_size or self.CHUNK_SIZE
+        self.limits = limits
+        self.rows = 0
+        self._days = pd.Series(dtype=object)
+        self._records: Optional[pd.DataFrame] = None
+        self._weekly: Optional[pd.DataFrame] = None
+        self._maxima: Optional[pd.DataFrame] = None
+
+    @instrumented
+    def run(self) -> "StreamingAggregator":
+        for chunk in DataManager.iter_data(self.file_name, self.chunk_size):
+            self.add(chunk)
+        return self
+
+    def add(self, chunk: pd.DataFrame) -> None:
+        """Incorpora un bloque a los agregados parciales"""
+        if chunk.empty:
+            return
+        self.rows += len(chunk)
+        # Una fecha puede repartirse entre bloques: vale la primera rutina vista, como en groupby().first()
+        firsts = chunk.groupby("Fecha", sort=False)["Rutina"].first().dropna().astype(str)
+        self._days = pd.concat([self._days, firsts[~firsts.index.isin(self._days.index)]])
+
+        records = PersonalRecordIndex.summarize(chunk)
+        self._records = records if self._records is None else PersonalRecordIndex.combine([self._records, records])
+
+        sets = TrainingLoad.work_sets(chunk)
+        if not sets.empty:
+            weekly = TrainingLoad.weekly_totals(sets).rename(columns=str)
+            self._weekly = weekly if self._weekly is None else self._weekly.add(weekly, fill_value=0.0)
+
+        if self.limits is not None:
+            maxima = WorkoutStore.maxima_until(chunk, self.limits)
+            self._maxima = maxima if self._maxima is None else pd.concat([self._maxima, maxima]).groupby(level=0).max()
+
+    def routine_counts(self) -> pd.Series:
+        return ProgressTracker.count_days(ROUTINES.categorize(self._days))
+
+    def records(self) -> pd.DataFrame:
+        if self._records is None:
+            return PersonalRecordIndex().to_frame()
+        return self._records.reindex(columns=PersonalRecordIndex.FIELDS)
+
+    def weekly_volume(self) -> pd.DataFrame:
+        if self._weekly is None:
+            return pd.DataFrame()
+        weekly = self._weekly.reindex(columns=sorted(self._weekly.columns)).fillna(0.0)
+        return TrainingLoad.fill_weeks(weekly)
+
+    def goal_maxima(self) -> pd.DataFrame:
+        if self._maxima is None:
+            return pd.DataFrame(index=self.limits.index, columns=["Peso (kg)", "Repeticiones"], dtype="float64")
+        return self._maxima.reindex(self.limits.index)
+
+def _render_chart(job: Dict) -> str:
+    """Dibuja y guarda un gráfico en un proceso del pool (backend Agg, sin pantalla)"""
+    importlib.import_module("matplotlib").use("Agg")
+    if job["kind"] == "routines":
+        fig = ProgressTracker._draw_routine_distribution(job["data"])
+    elif job["kind"] == "load":
+        fig = ProgressTracker._draw_training_load(job["data"], job["extra"])
+    elif job["kind"] == "bodyweight":
+        fig = ProgressTracker._draw_body_weight(job["data"], job["extra"])
+    else:
+        fig = ProgressTracker._draw_progression(job["data"], job["metric"], job["title"])
+    fig.savefig(job["path"])
+    plt.close(fig)
+    return job["path"]
+
+class ReportGenerator:
+    """Genera el reporte completo de gráficos en modo headless, en paralelo y solo para datos que cambiaron"""
+
+    FORMATS = ("png", "svg")
+    MANIFEST = "manifest.json"
+    SKIP_EXERCISES = ("Descanso", "Enfermo")
+    PROGRESSION_CHARTS = [("Repeticiones", "Evolución de Repeticiones", "reps"),
+                          ("Peso (kg)", "Evolución de Peso", "peso")]
+
+    def __init__(self, progress_tracker: ProgressTracker, output_dir: str = "reportes",
+                 fmt: str = "png", workers: Optional[int] = None):
+        self.progress_tracker = progress_tracker
+        self.output_dir = output_dir
+        self.fmt = fmt
+        self.workers = workers
+
+    @staticmethod
+    def _fingerprint(job: Dict) -> str:
+        data = job["data"]
+        digest = hashlib.sha1(pd.util.hash_pandas_object(data, index=True).values.tobytes())
+        if "extra" in job:
+            digest.update(pd.util.hash_pandas_object(job["extra"], index=True).values.tobytes())
+        digest.update(repr((job["kind"], job.get("metric"), job.get("title"), list(getattr(data, "columns", [])))).encode())
+        return digest.hexdigest()
+
+    def _jobs(self) -> List[Dict]:
+        workouts = self.progress_tracker.workouts
+        jobs = [{"kind": "routines", "name": "distribucion_rutinas", "data": self.progress_tracker.routine_counts()}]
+        training_load = self.progress_tracker.training_load
+        if not training_load.sets().empty:
+            jobs.append({"kind": "load", "name": "carga_entrenamiento", "data": training_load.weekly_tonnage(),
+                         "extra": training_load.acwr()})
+        body_weight = self.progress_tracker.body_weight
+        if not body_weight.frame().empty:
+            jobs.append({"kind": "bodyweight", "name": "peso_corporal", "data": body_weight.frame(),
+                         "extra": body_weight.weekly_rate().dropna()})
+        for exercise, data in workouts.groupby("Ejercicio", observed=True, sort=False):
+            if exercise in self.SKIP_EXERCISES:
+                continue
+            for metric, title, suffix in self.PROGRESSION_CHARTS:
+                jobs.append({
+                    "kind": "progression", "name": f"progresion_{slugify(exercise)}_{suffix}",
+                    "data": data[["Fecha", "Ejercicio", metric]].reset_index(drop=True),
+                    "metric": metric, "title": title
+                })
+        return jobs
+
+    def _load_manifest(self) -> Dict[str, str]:
+        try:
+            with open(os.path.join(self.output_dir, self.MANIFEST), encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_manifest(self, manifest: Dict[str, str]) -> None:
+        def write(path: str):
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(manifest, f, indent=2, ensure_ascii=False)
+        atomic_replace(os.path.join(self.output_dir, self.MANIFEST), write)
+
+    def generate(self) -> Dict[str, int]:
+        if self.progress_tracker.workouts.empty:
+            return {"rendered": 0, "skipped": 0}
+
+        os.makedirs(self.output_dir, exist_ok=True)
+        manifest = self._load_manifest()
+        jobs = self._jobs()
+        pending = []
+        for job in jobs:
+            job["path"] = os.path.join(self.output_dir, f"{job['name']}.{self.fmt}")
+            job["fingerprint"] = self._fingerprint(job)
+            if manifest.get(job["path"]) != job["fingerprint"] or not os.path.exists(job["path"]):
+                pending.append(job)
+
+        if len(pending) > 1 and self.workers != 1:
+            with futures.ProcessPoolExecutor(max_workers=self.workers) as pool:
+                list(pool.map(_render_chart, pending, chunksize=max(1, len(pending) // (4 * (os.cpu_count() or 1)))))
+        else:
+            for job in pending:
+                _render_chart(job)
+
+        for job in pending:
+            manifest[job["path"]] = job["fingerprint"]
+        self._save_manifest(manifest)
+
+        return {"rendered": len(pending), "skipped": len(jobs) - len(pending)}
+
+class BulkImporter:
+    """Importa historiales de otras apps (CSV o JSON lines) por bloques, sin prompts y con memoria acotada"""
+
+    FORMATS = ("csv", "jsonl")
+    LB_TO_KG = 0.45359237
+
+    # Nombres de columna habituales en exportaciones de otras apps -> columnas de WORKOUT_COLUMNS
+    COLUMN_ALIASES = {
+        "Fecha": ["fecha", "date", "start_time", "day", "workout date"],
+        "Rutina": ["rutina", "routine", "workout", "workout name", "title"],
+        "Ejercicio": ["ejercicio", "exercise", "exercise name", "exercise_title", "name"],
+        "Repeticiones": ["repeticiones", "reps", "repetitions"],
+        "Peso (kg)": ["peso (kg)", "peso", "weight", "weight (kg)", "weight_kg", "weight (lbs)", "weight_lbs",
+                      "weight (lb)", "peso (lb)"],
+        # Opcional: número de la serie dentro del ejercicio, si la exportación lo trae
+        "Serie": ["serie", "set", "set order", "set_order", "set_index", "set number"],
+    }
+    # Columnas de peso que dicen su unidad: se convierten (o no) aunque no se pase --lb
+    POUND_COLUMNS = {"weight (lbs)", "weight_lbs", "weight (lb)", "peso (lb)"}
+    KILOGRAM_COLUMNS = {"peso (kg)", "weight (kg)", "weight_kg"}
+    # Identidad de una serie al deduplicar (más su ordinal entre las iguales del día)
+    IDENTITY = ["Fecha", "Ejercicio", "Repeticiones", "Peso (kg)"]
+
+    def __init__(self, store: WorkoutStore, chunk_size: int = 50_000, pounds: bool = False):
+        self.store = store
+        self.chunk_size = chunk_size
+        self.pounds = pounds
+        self.catalog = CATALOG.key_map()
+
+    def _read_chunks(self, path: str, fmt: Optional[str]):
+        fmt = fmt or ("jsonl" if path.endswith((".jsonl", ".ndjson", ".json")) else "csv")
+        if fmt == "jsonl":
+            return pd.read_json(path, lines=True, chunksize=self.chunk_size, dtype=False)
+        return pd.read_csv(path, chunksize=self.chunk_size, dtype=str)
+
+    def _rename(self, chunk: pd.DataFrame) -> pd.DataFrame:
+        lookup = {alias: column for column, aliases in self.COLUMN_ALIASES.items() for alias in aliases}
+        renamed = chunk.rename(columns=lambda c: lookup.get(str(c).strip().lower(), c))
+        missing = {"Fecha", "Ejercicio", "Repeticiones", "Peso (kg)"} - set(renamed.columns)
+        if missing:
+            raise ValueError(f"Columnas requeridas no encontradas: {', '.join(sorted(missing))}")
+        return renamed
+
+    def _weight_factor(self, chunk: pd.DataFrame) -> float:
+        """Factor a kg según la unidad que nombra la columna de peso; --lb solo decide si no la nombra"""
+        source = next((str(c).strip().lower() for c in chunk.columns
+                       if str(c).strip().lower() in self.COLUMN_ALIASES["Peso (kg)"]), None)
+        if source in self.POUND_COLUMNS:
+            return self.LB_TO_KG
+        if source in self.KILOGRAM_COLUMNS:
+            return 1.0
+        return self.LB_TO_KG if self.pounds else 1.0
+
+    def _normalize(self, chunk: pd.DataFrame) -> pd.DataFrame:
+        """Convierte un bloque al formato de _prepare_workout_data (sin ID) y descarta filas inválidas.
+
+        'Origen' identifica la fila en la exportación (fecha tal cual y número de serie) cuando esta
+        numera las series; si no, queda vacío.
+        """
+        factor = self._weight_factor(chunk)
+        chunk = self._rename(chunk)
+        names = chunk["Ejercicio"].fillna("").astype(str).str.strip()
+        matches = names.map(normalize_name).map(self.catalog)
+        known = matches.notna()
+
+        rows = pd.DataFrame({
+            "Fecha": pd.to_datetime(chunk["Fecha"], errors="coerce", format="mixed").dt.strftime("%Y-%m-%d"),
+            "Rutina": chunk["Rutina"].astype(str).str.strip() if "Rutina" in chunk.columns else "Otros",
+            "Ejercicio": names.where(~known, matches.str[0]),
+            "Repeticiones": pd.to_numeric(chunk["Repeticiones"], errors="coerce"),
+            "Peso (kg)": (pd.to_numeric(chunk["Peso (kg)"], errors="coerce") * factor).round(2),
+            "Origen": ((chunk["Fecha"].astype(str).str.strip() + "|" + chunk["Serie"].astype(str).str.strip())
+                       .where(chunk["Serie"].notna()) if "Serie" in chunk.columns else None),
+        })
+        # Los ejercicios del catálogo conservan su rutina; los desconocidos van a "Otros"
+        rows.loc[known, "Rutina"] = matches[known].str[1]
+        rows.loc[~known & ~rows["Rutina"].isin(list(EXERCISE_POOL)), "Rutina"] = "Otros"
+
+        # Repeticiones con decimales se rechazan: truncarlas cambiaría la serie
+        valid = (rows["Fecha"].notna() & (rows["Ejercicio"] != "")
+                 & rows["Repeticiones"].between(0, MAX_REPS) & (rows["Repeticiones"] % 1 == 0)
+                 & (rows["Peso (kg)"] >= 0))
+        return rows[valid].astype({"Repeticiones": "int64"})
+
+    def _dates(self, path: str, fmt: Optional[str]) -> set:
+        """Fechas 'YYYY-MM-DD' del archivo (una primera pasada, sin guardar filas)"""
+        dates = set()
+        for chunk in self._read_chunks(path, fmt):
+            dates.update(self._normalize(chunk)["Fecha"].unique())
+        return dates
+
+    def _new_sets(self, rows: pd.DataFrame, stored: Dict[tuple, int], seen: Dict[tuple, int],
+                  origins: set) -> np.ndarray:
+        """Máscara de las series que faltan por guardar.
+
+        Una serie se identifica por (fecha, ejercicio, reps, peso) y su ordinal entre las iguales de
+        ese día: la n-ésima del archivo es duplicada si ya hay n guardadas. 'seen' lleva la cuenta
+        entre bloques. Si la exportación numera las series, una fila repetida (mismo 'Origen',
+        ejercicio, reps y peso) también es duplicada.
+        """
+        fresh = np.ones(len(rows), dtype=bool)
+        numbered = rows["Origen"].notna().to_numpy()
+        if numbered.any():
+            keys = pd.MultiIndex.from_frame(rows[["Origen", "Ejercicio", "Repeticiones", "Peso (kg)"]])
+            repeated = keys.duplicated() | keys.isin(origins)
+            fresh &= ~(repeated & numbered)
+            origins.update(keys[numbered & ~repeated])
+
+        groups = rows[fresh].groupby(self.IDENTITY, sort=False)
+        counts = groups.size()
+        # Cuántas series iguales hay antes del bloque: guardadas menos las ya vistas en el archivo
+        offset = np.array([seen.get(key, 0) - stored.get(key, 0) for key in counts.index], dtype="int64")
+        for key, count in counts.items():
+            seen[key] = seen.get(key, 0) + count
+        ordinal = groups.cumcount().to_numpy() + 1 + offset[groups.ngroup().to_numpy()]
+        fresh[fresh] = ordinal > 0
+        return fresh
+
+    def run(self, path: str, fmt: Optional[str] = None) -> Dict[str, int]:
+        summary = {"read": 0, "imported": 0, "rejected": 0, "duplicates": 0}
+        # Series ya guardadas en las fechas del archivo: reimportar el mismo archivo no duplica series
+        stored = self.store.set_counts(self._dates(path, fmt))
+        seen: Dict[tuple, int] = {}
+        origins: set = set()
+
+        for chunk in self._read_chunks(path, fmt):
+            summary["read"] += len(chunk)
+            rows = self._normalize(chunk)
+            summary["rejected"] += len(chunk) - len(rows)
+
+            fresh = self._new_sets(rows, stored, seen, origins)
+            summary["duplicates"] += int((~fresh).sum())
+            rows = rows[fresh]
+            if rows.empty:
+                continue
+            ids = new_row_ids(self.store.file_name, len(rows))
+            records = rows.assign(ID=np.arange(ids.start, ids.stop, dtype="int64"))[WORKOUT_COLUMNS].to_dict("records")
+
+            DataManager.append_data(records, self.store.file_name, WORKOUT_COLUMNS)
+            DataManager.flush(self.store.file_name)
+            self.store.append(records)
+            summary["imported"] += len(records)
+        return summary
 
 class GymTracker:
     """Clase principal que coordina todas las funcionalidades"""
     
-    def __init__(self):
-        self.goal_manager = GoalManager()  # 1. Crear primero GoalManager
-        self.workout_manager = WorkoutManager()  # 2. WorkoutManager
-        self.progress_tracker = ProgressTracker(self.goal_manager)  # 3. Inyectar dependencia
+    def __init__(self, athlete: Optional[Athlete] = None):
+        self.athlete = athlete or Athlete()  # Todo el tracker trabaja sobre los datos de un solo atleta
+        CATALOG.attach(self.athlete.catalog_file)
+        self.store = WorkoutStore(self.athlete.workout_file)  # 0. Historial compartido, se carga una sola vez
+        self.goal_manager = GoalManager(self.store, self.athlete)  # 1. Crear primero GoalManager
+        self.workout_manager = WorkoutManager(self.store)  # 2. WorkoutManager
+        self.body_weight = BodyWeightTracker(self.athlete.weight_file)
+        self.progress_tracker = ProgressTracker(self.goal_manager, self.body_weight)  # 3. Inyectar dependencia
 
     
     def main_menu(self):
@@ -582,31 +3688,754 @@ class GymTracker:
                 "Registrar peso corporal",
                 "Ver estadísticas",
                 "Gestión de metas",
+                "Corregir o borrar series",
                 "Salir"
             ]
             
             choice = InputHandler.select_option(options)
             
-            if choice == 1:
-                self.workout_manager.register_workout()
-            elif choice == 2:
-                self.register_weight()
-            elif choice == 3:
-                self.progress_tracker.show_stats()
-            elif choice == 4:
-                self.goal_manager.manage_goals()
-            elif choice == 5:
-                print("¡Hasta luego! 💪")
-                sys.exit()
+            try:
+                if choice == 1:
+                    self.workout_manager.register_workout()
+                elif choice == 2:
+                    self.register_weight()
+                elif choice == 3:
+                    self.progress_tracker.show_stats()
+                elif choice == 4:
+                    self.goal_manager.manage_goals()
+                elif choice == 5:
+                    self.workout_manager.edit_sets()
+                elif choice == 6:
+                    DataManager.flush()
+                    print("¡Hasta luego! 💪")
+                    sys.exit()
+            except (OSError, ValueError) as e:  # lo no guardado queda en el diario y se reintenta después
+                print(f"Error: {str(e)}")
 
     def register_weight(self):
         date = InputHandler.get_date("Fecha (YYYY-MM-DD o enter para hoy): ")
         weight = InputHandler.get_int("Peso corporal (kg): ")
-        DataManager.save_data([{
+        self.log_weight(date, weight)
+
+    def log_weight(self, date: datetime, weight: float) -> Dict:
+        entry = {
             "Fecha": date.strftime("%Y-%m-%d"),
-            "Peso (kg)": weight
-        }], WEIGHT_FILE)
+            "Peso (kg)": weight,
+            "ID": new_row_ids(self.athlete.weight_file)[0]
+        }
+        DataManager.append_data([entry], self.athlete.weight_file, WEIGHT_COLUMNS)
+        DataManager.flush(self.athlete.weight_file)
+        self.body_weight.append([entry])
+        return entry
+
+    def correct_weight(self, row_id: int, fields: Dict) -> Dict:
+        """Corrige la fecha o el peso de un pesaje guardado (solo anexa la corrección)"""
+        unknown = set(fields) - set(WEIGHT_COLUMNS[:-1])
+        if unknown:
+            raise ValueError(f"Campos no editables: {', '.join(sorted(unknown))}")
+        if not fields:
+            raise ValueError("No hay campos para corregir")
+        change = {"ID": int(row_id), "Cambio": CHANGE_CORRECT, **fields}
+        if "Fecha" in change:
+            change["Fecha"] = _date_text(change["Fecha"])
+        DataManager.require_row_ids(DataManager.load_data(self.athlete.weight_file), [row_id])
+        DataManager.record_changes([change], self.athlete.weight_file)
+        self.body_weight.reset()
+        return change
+
+    def delete_weights(self, row_ids: List[int]) -> List[Dict]:
+        """Borra pesajes por ID con marcas de borrado"""
+        changes = [{"ID": int(row_id), "Cambio": CHANGE_DELETE} for row_id in row_ids]
+        if changes:
+            DataManager.require_row_ids(DataManager.load_data(self.athlete.weight_file), row_ids)
+            DataManager.record_changes(changes, self.athlete.weight_file)
+            self.body_weight.reset()
+        return changes
+
+def _athlete_summary(job: Dict) -> Dict:
+    """Estadísticas de un atleta en un proceso del pool; cada proceso abre solo su propio shard"""
+    DataManager.backend = DataManager.create_backend(job["storage"])
+    previous = CATALOG.file
+    try:
+        tracker = GymTracker(Athlete(job["athlete"], job["root"]))  # asocia el catálogo a este atleta
+        return tracker.progress_tracker.stats_summary()
+    finally:
+        if previous is not None:  # sin pool, el proceso vuelve al catálogo del atleta de la línea de comandos
+            CATALOG.attach(previous)
+
+class TeamAnalytics:
+    """Consultas agregadas sobre todo el equipo, ejecutadas en paralelo por atleta"""
+
+    def __init__(self, root: str = ".", workers: Optional[int] = None):
+        self.root = root
+        self.workers = workers
+
+    def summaries(self, athletes: Optional[List[str]] = None) -> Dict[str, Dict]:
+        athletes = athletes or Athlete.all(self.root)
+        jobs = [{"athlete": name, "root": self.root, "storage": DataManager.backend.name} for name in athletes]
+        if len(jobs) > 1 and self.workers != 1:
+            with futures.ProcessPoolExecutor(max_workers=self.workers) as pool:
+                results = list(pool.map(_athlete_summary, jobs))
+        else:
+            results = [_athlete_summary(job) for job in jobs]
+        return dict(zip(athletes, results))
+
+    @staticmethod
+    def leaders(summaries: Dict[str, Dict]) -> Dict[str, Dict]:
+        """Mejor 1RM estimado del equipo por ejercicio"""
+        best: Dict[str, Dict] = {}
+        for athlete, summary in summaries.items():
+            for exercise, record in summary["records"].items():
+                if exercise in ("Descanso", "Enfermo"):
+                    continue
+                if exercise not in best or record["1RM Estimado"] > best[exercise]["1RM Estimado"]:
+                    best[exercise] = {"athlete": athlete, "1RM Estimado": record["1RM Estimado"],
+                                      "Peso (kg)": record["Peso (kg)"]}
+        return best
+
+class LoggingService:
+    """Servicio local (asyncio) para que muchos clientes registren a la vez sobre un mismo atleta.
+
+    Protocolo de líneas por TCP en localhost o socket Unix: cada petición es un objeto JSON con
+    "op" y cada respuesta otro objeto JSON con "ok" (y el mismo "id" si la petición lo traía).
+    Las series y pesajes se juntan en lotes (group commit): un solo anexo y un solo fsync por
+    lote en un hilo aparte, y cada cliente recibe la respuesta cuando su lote ya está en disco.
+    Récords y estadísticas salen del GymTracker en memoria (índice de récords, cachés por versión).
+    Las correcciones y borrados se anexan en el mismo hilo de escritura; cuando superan
+    COMPACTION_THRESHOLD cambios por fila, la compactación corre ahí mismo en segundo plano.
+    """
+
+    BACKLOG = 1024  # conexiones pendientes de aceptar (con 100, una ráfaga de clientes recibe reset)
+    # Campos del protocolo -> columnas de la tabla de entrenamientos
+    FIELDS = {"date": "Fecha", "routine": "Rutina", "exercise": "Ejercicio", "reps": "Repeticiones",
+              "weight": "Peso (kg)"}
+
+    def __init__(self, tracker: GymTracker, commit_interval: float = 0.002):
+        self.tracker = tracker
+        self.store = tracker.store
+        self.commit_interval = commit_interval
+        self.operations = {
+            "ping": self.ping, "status": self.status, "log_set": self.log_set, "log_workout": self.log_workout,
+            "log_weight": self.log_weight, "goal_set": self.goal_set, "records": self.records, "stats": self.stats,
+            "forecast": self.forecast, "edit_set": self.edit_set, "delete_sets": self.delete_sets,
+        }
+        self.commits = 0
+        self.sets_logged = 0
+        self.compactions = 0
+        self._changes = 0  # cambios sin compactar
+        self._compaction = None
+        self._writer = None
+        self._sets = WorkoutBuffer(self.store.file_name)
+        self._weights: List[Dict] = []
+        self._done = None
+        self._ready = None
+        self._closing = False
+        self._goals_version = 0
+        self._stats_cache: Optional[tuple] = None
+
+    # Transporte
+
+    async def serve(self, host: str = "127.0.0.1", port: int = 8765, socket_path: Optional[str] = None,
+                    on_ready: Optional[Callable[[str], None]] = None) -> None:
+        """Atiende clientes hasta SIGINT/SIGTERM y escribe el último lote antes de salir"""
+        loop = asyncio.get_running_loop()
+        self._done, self._ready = loop.create_future(), asyncio.Event()
+        self.store.records  # el índice de récords queda listo antes de aceptar clientes
+        self._changes = len(DataManager.load_changes(self.store.file_name))
+        writer = self._writer = futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix="group-commit")
+        committer = asyncio.create_task(self._commit_loop(writer))
+        stop = asyncio.Event()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(signum, stop.set)
+            except (NotImplementedError, RuntimeError):  # Windows: se corta con Ctrl+C
+                pass
+        if socket_path:
+            server = await asyncio.start_unix_server(self._handle, path=socket_path, backlog=self.BACKLOG)
+            address = socket_path
+        else:
+            server = await asyncio.start_server(self._handle, host, port, backlog=self.BACKLOG)
+            address = "{}:{}".format(*server.sockets[0].getsockname()[:2])
+        try:
+            async with server:
+                if on_ready:
+                    on_ready(address)
+                await stop.wait()
+        finally:
+            self._closing = True
+            self._ready.set()
+            await committer
+            writer.shutdown()  # espera también a una compactación en curso
+            if socket_path and os.path.exists(socket_path):
+                os.unlink(socket_path)
+
+    async def _handle(self, reader, writer) -> None:
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                writer.write(json.dumps(await self.dispatch(line), ensure_ascii=False, default=str).encode() + b"\n")
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def dispatch(self, line: bytes) -> Dict:
+        """Ejecuta una petición y arma la respuesta; los errores del cliente no cortan la conexión"""
+        request: Dict = {}
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                raise ValueError("La petición debe ser un objeto JSON")
+            operation = self.operations.get(request.get("op"))
+            if operation is None:
+                raise ValueError(f"Operación desconocida: {request.get('op')!r}")
+            response = {"ok": True, **await operation(request)}
+        except (ValueError, KeyError, TypeError) as e:
+            response = {"ok": False, "error": str(e)}
+        except OSError as e:
+            response = {"ok": False, "error": f"Error guardando: {e}"}
+        if "id" in request:
+            response["id"] = request["id"]
+        return response
+
+    # Group commit
+
+    async def _commit_loop(self, writer) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            await self._ready.wait()
+            if not self._closing:
+                await asyncio.sleep(self.commit_interval)  # deja que lleguen más series al mismo lote
+            self._ready.clear()
+            if len(self._sets) or self._weights:
+                sets, weights, done = self._sets, self._weights, self._done
+                self._sets, self._weights, self._done = WorkoutBuffer(self.store.file_name), [], loop.create_future()
+                try:
+                    await loop.run_in_executor(writer, self._write_batch, sets, weights)
+                except Exception as e:  # los clientes del lote reciben el error; el servicio sigue
+                    done.set_exception(e)
+                    continue
+                # Los índices en memoria solo se tocan desde el bucle de eventos
+                self.store.append(sets)
+                if weights:
+                    self.tracker.body_weight.append(weights)
+                self.commits += 1
+                self.sets_logged += len(sets)
+                done.set_result(len(sets) + len(weights))
+            elif self._closing:
+                return
+
+    @instrumented
+    def _write_batch(self, sets: WorkoutBuffer, weights: List[Dict]) -> None:
+        """Escribe el lote; si falla, lo no escrito se descarta para que no aparezca después de informar el error"""
+        try:
+            if len(sets):
+                DataManager.append_data(list(sets), self.store.file_name, WORKOUT_COLUMNS)
+                DataManager.flush(self.store.file_name)
+            if weights:
+                DataManager.append_data(weights, self.tracker.athlete.weight_file, WEIGHT_COLUMNS)
+                DataManager.flush(self.tracker.athlete.weight_file)
+        except Exception:
+            DataManager.discard(self.store.file_name)
+            DataManager.discard(self.tracker.athlete.weight_file)
+            raise
+
+    async def _record_changes(self, changes: List[Dict]) -> None:
+        """Anexa cambios en el hilo de escritura (en orden con los lotes) y los aplica en memoria"""
+        if self._closing:
+            raise ValueError("El servicio se está cerrando")
+        DataManager.require_row_ids(self.store.frame, [change["ID"] for change in changes])
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self._writer, DataManager.record_changes, changes, self.store.file_name)
+        self.store.apply_changes(changes)
+        self._changes += len(changes)
+        if self._compaction is None and self._changes >= COMPACTION_THRESHOLD * max(len(self.store.frame), 1):
+            # Detrás de lo ya encolado; lo que llegue mientras tanto espera en la cola del mismo hilo
+            self._compaction = loop.run_in_executor(self._writer, DataManager.compact, self.store.file_name)
+            self._compaction.add_done_callback(functools.partial(self._compacted, self._changes))
+
+    def _compacted(self, changes: int, compaction) -> None:
+        self._compaction = None
+        if not compaction.cancelled() and compaction.exception() is None and compaction.result()["compacted"]:
+            self._changes -= changes
+            self.compactions += 1
+
+    async def _commit(self) -> None:
+        """Espera a que el lote actual (con lo recién agregado) quede escrito"""
+        if self._closing:
+            raise ValueError("El servicio se está cerrando")
+        done = self._done
+        self._ready.set()
+        await asyncio.shield(done)
+
+    # Validación
+
+    @staticmethod
+    def _date(request: Dict) -> datetime:
+        value = request.get("date")
+        return datetime.strptime(value, "%Y-%m-%d") if value else datetime.now()
+
+    @staticmethod
+    def _set(data: Dict) -> tuple:
+        reps, weight = int(data["reps"]), float(data["weight"])
+        if not 0 <= reps <= MAX_REPS or not 0 <= weight <= 1000 or math.isnan(weight):
+            raise ValueError(f"Serie fuera de rango: {reps} reps @ {weight}kg")
+        return reps, weight
+
+    # Operaciones
+
+    async def ping(self, request: Dict) -> Dict:
+        return {}
+
+    async def status(self, request: Dict) -> Dict:
+        return {"commits": self.commits, "sets_logged": self.sets_logged, "pending": len(self._sets),
+                "exercises": len(self.store.records.exercises()), "changes": self._changes,
+                "compactions": self.compactions}
+
+    async def log_set(self, request: Dict) -> Dict:
+        """Una serie: {"exercise", "reps", "weight"} y opcionalmente "routine" y "date" (YYYY-MM-DD)"""
+        exercise = str(request["exercise"]).strip()
+        if not exercise:
+            raise ValueError("Falta el ejercicio")
+        reps, weight = self._set(request)
+        exercise = CATALOG.resolve(exercise) or exercise
+        routine = request.get("routine") or CATALOG.group(exercise)
+        self._sets.add(self._date(request), routine, exercise, reps, weight)
+        await self._commit()
+        return {"logged": 1}
+
+    async def log_workout(self, request: Dict) -> Dict:
+        """Sesión completa con el formato de WorkoutManager.log_workout ("exercises": [{"name", "sets"}])"""
+        date, routine = self._date(request), str(request["routine"])
+        if routine in REST_DAYS:
+            rows = [(routine, 0, 0.0)]
+        else:
+            rows = [(CATALOG.resolve(str(ex["name"])) or str(ex["name"]).strip(), *self._set(data))
+                    for ex in request["exercises"] for data in ex["sets"]]
+            if not rows:
+                raise ValueError("La sesión no tiene series")
+        for exercise, reps, weight in rows:  # se valida todo antes de agregar nada al lote
+            self._sets.add(date, routine, exercise, reps, weight)
+        await self._commit()
+        return {"logged": len(rows)}
+
+    async def log_weight(self, request: Dict) -> Dict:
+        weight = float(request["weight"])
+        if not 0 < weight <= 500:
+            raise ValueError(f"Peso fuera de rango: {weight}")
+        entry = {"Fecha": self._date(request).strftime("%Y-%m-%d"), "Peso (kg)": weight,
+                 "ID": new_row_ids(self.tracker.athlete.weight_file)[0]}
+        self._weights.append(entry)
+        await self._commit()
+        return {"logged": entry}
+
+    async def edit_set(self, request: Dict) -> Dict:
+        """Corrige una serie: {"row_id"} y los campos que cambian ("date", "routine", "exercise", "reps", "weight")"""
+        fields = {column: request[key] for key, column in self.FIELDS.items() if key in request}
+        if "Repeticiones" in fields or "Peso (kg)" in fields:
+            row = {"reps": 0, "weight": 0.0, **{k: request[k] for k in ("reps", "weight") if k in request}}
+            reps, weight = self._set(row)
+            fields.update({k: v for k, v in (("Repeticiones", reps), ("Peso (kg)", weight)) if k in fields})
+        change = WorkoutManager.correction(request["row_id"], fields)
+        await self._record_changes([change])
+        return {"corrected": change}
+
+    async def delete_sets(self, request: Dict) -> Dict:
+        """Borra series por ID: {"row_ids": [...]}"""
+        changes = WorkoutManager.tombstones(request["row_ids"])
+        if not changes:
+            raise ValueError("Faltan los IDs")
+        await self._record_changes(changes)
+        return {"deleted": len(changes)}
+
+    async def goal_set(self, request: Dict) -> Dict:
+        deadline = datetime.strptime(request["deadline"], "%Y-%m-%d")
+        # Si la escritura falla, el error llega a dispatch y el cliente recibe ok: false
+        goal = self.tracker.goal_manager.save_goal(str(request["exercise"]), float(request["weight"]),
+                                                   int(request["reps"]), deadline)
+        self._goals_version += 1
+        return {"goal": request["exercise"], "saved": goal}
+
+    async def records(self, request: Dict) -> Dict:
+        """Récords del índice en memoria (de un ejercicio o de todos)"""
+        index = self.store.records
+        names = [CATALOG.resolve(request["exercise"]) or request["exercise"]] if request.get("exercise") \
+            else index.exercises()
+        records = {}
+        for name in names:
+            record = index.get(name)
+            if record is None:
+                raise ValueError(f"Sin registros de {name}")
+            records[name] = {**record, "Última Fecha": pd.Timestamp(record["Última Fecha"]).strftime("%Y-%m-%d")}
+        return {"records": records}
+
+    async def forecast(self, request: Dict) -> Dict:
+        """Proyección de metas; el índice de GoalForecaster se actualiza con cada lote escrito"""
+        goals = self.tracker.goal_manager
+        if goals.goals.empty:
+            return {"forecast": []}
+        return {"forecast": CommandLine._forecast_records(goals.forecast(request.get("model", "lineal")))}
+
+    async def stats(self, request: Dict) -> Dict:
+        """stats_summary, recalculado solo cuando cambian los entrenamientos o las metas"""
+        key = (self.store.version, self._goals_version)
+        if self._stats_cache is None or self._stats_cache[0] != key:
+            self._stats_cache = (key, self.tracker.progress_tracker.stats_summary())
+        summary = self._stats_cache[1]
+        section = request.get("section")
+        if section is not None and section not in summary:
+            raise ValueError(f"Sección desconocida: {section}")
+        return {"stats": summary[section] if section else summary}
+
+class CommandLine:
+    """Subcomandos sin prompts para scripts y cron; las respuestas se imprimen como JSON"""
+
+    def __init__(self):
+        self.parser = self.build_parser()
+
+    def build_parser(self) -> argparse.ArgumentParser:
+        parser = argparse.ArgumentParser(description="Gym Tracker")
+        parser.add_argument("--storage", choices=STORAGE_BACKENDS,
+                            help="Motor de almacenamiento (por defecto $GYM_STORAGE o csv)")
+        parser.add_argument("--athlete", default=os.environ.get("GYM_ATHLETE"),
+                            help=f"Atleta (datos en {ATHLETES_DIR}/<nombre>; por defecto $GYM_ATHLETE "
+                                 "o los archivos del directorio actual)")
+        parser.add_argument("--metrics", metavar="ARCHIVO",
+                            help="Guarda llamadas, tiempo y memoria por operación en JSON lines "
+                                 "(por defecto $GYM_METRICS; sin valor no se mide nada)")
+        parser.add_argument("--profile", action="append", choices=Metrics.PROFILERS,
+                            help="Activa cProfile o tracemalloc (repetible; por defecto $GYM_PROFILE)")
+        commands = parser.add_subparsers(dest="command")
+
+        migrate = commands.add_parser("migrate", help="Migra los CSV actuales a un formato binario")
+        migrate.add_argument("target", choices=[b for b in STORAGE_BACKENDS if b != "csv"])
+        migrate.set_defaults(handler=self.migrate)
+
+        partition = commands.add_parser("partition", help="Divide el historial de entrenamientos por mes o año")
+        partition.add_argument("--by", choices=list(PARTITION_PERIODS), default="mes")
+        partition.set_defaults(handler=self.partition)
+
+        export = commands.add_parser("export-csv", help="Exporta las tablas del motor actual a CSV")
+        export.add_argument("directory", nargs="?", default="export")
+        export.set_defaults(handler=self.export_csv)
+
+        bulk = commands.add_parser("import", help="Importa un historial de entrenamientos (CSV o JSON lines)")
+        bulk.add_argument("path")
+        bulk.add_argument("--format", choices=BulkImporter.FORMATS, help="Por defecto según la extensión")
+        bulk.add_argument("--chunk-size", type=int, default=50_000)
+        bulk.add_argument("--lb", action="store_true",
+                          help="Los pesos están en libras (las columnas que nombran su unidad se convierten solas)")
+        bulk.set_defaults(handler=self.bulk_import)
+
+        workout = commands.add_parser("log-workout", help="Registra una sesión")
+        workout.add_argument("--date", type=self._date, default=None, help="YYYY-MM-DD (por defecto hoy)")
+        workout.add_argument("--routine", required=True,
+                             choices=list(EXERCISE_POOL) + ["Descanso", "Enfermo"])
+        workout.add_argument("--set", dest="sets", action="append", default=[], type=self._set_spec,
+                             metavar="EJERCICIO=SERIESxREPS@PESO",
+                             help='Ej: "Sentadilla=3x5@100" o "Sentadilla=8@60" (repetible)')
+        workout.set_defaults(handler=self.log_workout)
+
+        weight = commands.add_parser("log-weight", help="Registra el peso corporal")
+        weight.add_argument("weight", type=float)
+        weight.add_argument("--date", type=self._date, default=None)
+        weight.set_defaults(handler=self.log_weight)
+
+        goals = commands.add_parser("goals", help="Gestión de metas")
+        goal_commands = goals.add_subparsers(dest="goal_command", required=True)
+        goal_set = goal_commands.add_parser("set", help="Crea o reemplaza la meta de un ejercicio")
+        goal_set.add_argument("exercise")
+        goal_set.add_argument("--weight", type=float, required=True)
+        goal_set.add_argument("--reps", type=int, required=True)
+        goal_set.add_argument("--deadline", type=self._date, required=True)
+        goal_set.set_defaults(handler=self.goals_set)
+        goal_commands.add_parser("list", help="Lista las metas").set_defaults(handler=self.goals_list)
+        goal_forecast = goal_commands.add_parser("forecast", help="Fecha proyectada y probabilidad de cada meta")
+        goal_forecast.add_argument("--model", choices=GoalForecaster.MODELS, default="lineal")
+        goal_forecast.set_defaults(handler=self.goals_forecast)
+        goal_delete = goal_commands.add_parser("delete", help="Elimina la meta de un ejercicio")
+        goal_delete.add_argument("exercise")
+        goal_delete.set_defaults(handler=self.goals_delete)
+
+        stats = commands.add_parser("stats", help="Rutinas, récords y avance de metas")
+        stats.add_argument("--section", choices=["routines", "records", "goals", "weekly_volume"])
+        stats.add_argument("--streaming", action="store_true",
+                           help="Recorre el historial por bloques sin cargarlo entero en memoria")
+        stats.add_argument("--chunk-size", type=int, default=StreamingAggregator.CHUNK_SIZE,
+                           help="Filas por bloque con --streaming")
+        stats.set_defaults(handler=self.stats)
+
+        load = commands.add_parser("load", help="Tonelaje semanal por grupo, ACWR y 1RM estimado recientes")
+        load.add_argument("--weeks", type=int, default=8, help="Semanas a mostrar (por defecto 8)")
+        load.set_defaults(handler=self.training_load)
+
+        body = commands.add_parser("weight-stats", help="Tendencia del peso corporal y fuerza relativa")
+        body.add_argument("--weeks", type=int, default=8, help="Semanas de ritmo de cambio (por defecto 8)")
+        body.set_defaults(handler=self.weight_stats)
+
+        report = commands.add_parser("report", help="Exporta todos los gráficos sin pantalla")
+        report.add_argument("--output", help="Por defecto <directorio del atleta>/reportes")
+        report.add_argument("--format", choices=ReportGenerator.FORMATS, default="png")
+        report.add_argument("--workers", type=int, help="Procesos para dibujar (por defecto, todos los núcleos)")
+        report.set_defaults(handler=self.report)
+
+        search = commands.add_parser("exercises", help="Busca ejercicios por nombre, alias o prefijo")
+        search.add_argument("query", nargs="?", default="")
+        search.add_argument("--limit", type=int, default=10)
+        search.add_argument("--alias", action="append", default=[], metavar="EJERCICIO=ALIAS",
+                            help="Agrega un alias antes de buscar (repetible)")
+        search.set_defaults(handler=self.search_exercises)
+
+        history = commands.add_parser("history", help="Lista, corrige o borra registros por su ID")
+        history_commands = history.add_subparsers(dest="history_command", required=True)
+        history_list = history_commands.add_parser("list", help="Últimos registros con su ID")
+        history_list.add_argument("--exercise", help="Solo las series de este ejercicio")
+        history_list.add_argument("--limit", type=int, default=WorkoutManager.RECENT_SETS)
+        history_list.set_defaults(handler=self.history_list)
+        history_edit = history_commands.add_parser(
+            "edit", help="Corrige campos de un registro (anexa la corrección, no reescribe el historial)")
+        history_edit.add_argument("row_id", type=int)
+        history_edit.add_argument("--date", type=self._date)
+        history_edit.add_argument("--routine", choices=list(EXERCISE_POOL) + REST_DAYS)
+        history_edit.add_argument("--exercise")
+        history_edit.add_argument("--reps", type=int)
+        history_edit.add_argument("--weight", type=float)
+        history_edit.set_defaults(handler=self.history_edit)
+        history_delete = history_commands.add_parser("delete", help="Borra registros por ID (marca de borrado)")
+        history_delete.add_argument("row_ids", type=int, nargs="+")
+        history_delete.set_defaults(handler=self.history_delete)
+        for command in (history_list, history_edit, history_delete):
+            command.add_argument("--body-weight", action="store_true", help="Pesajes en lugar de series")
+
+        compact = commands.add_parser("compact", help="Reescribe las tablas con sus correcciones y borrados")
+        compact.add_argument("--threshold", type=float, default=COMPACTION_THRESHOLD,
+                             help=f"Cambios por fila desde los que se reescribe (por defecto {COMPACTION_THRESHOLD}; "
+                                  "0 compacta siempre que haya cambios)")
+        compact.set_defaults(handler=self.compact)
+
+        serve = commands.add_parser("serve", help="Servicio local de registro concurrente (JSON por línea)")
+        serve.add_argument("--host", default="127.0.0.1")
+        serve.add_argument("--port", type=int, default=8765)
+        serve.add_argument("--socket", help="Escucha en este socket Unix en lugar de TCP")
+        serve.add_argument("--commit-interval", type=float, default=2.0,
+                           help="Milisegundos que espera cada lote a que lleguen más series")
+        serve.set_defaults(handler=self.serve)
+
+        team = commands.add_parser("team-stats", help="Estadísticas de todos los atletas (en paralelo)")
+        team.add_argument("--workers", type=int, help="Procesos (por defecto, todos los núcleos)")
+        team.set_defaults(handler=self.team_stats)
+        return parser
+
+    # Conversores de argumentos
+
+    @staticmethod
+    def _date(value: str) -> datetime:
+        try:
+            return datetime.strptime(value, "%Y-%m-%d")
+        except ValueError:
+            raise argparse.ArgumentTypeError(f"fecha inválida '{value}', use YYYY-MM-DD")
+
+    @staticmethod
+    def _set_spec(value: str) -> Dict:
+        """'Ejercicio=3x5@100' -> {"name": "Ejercicio", "sets": [{"reps": 5, "weight": 100}] * 3}"""
+        try:
+            name, spec = value.rsplit("=", 1)
+            volume, weight = spec.split("@")
+            sets, reps = volume.split("x") if "x" in volume else ("1", volume)
+            weight = float(weight)
+            return {"name": name.strip(),
+                    "sets": [{"reps": int(reps), "weight": int(weight) if weight.is_integer() else weight}] * int(sets)}
+        except ValueError:
+            raise argparse.ArgumentTypeError(f"serie inválida '{value}', use EJERCICIO=SERIESxREPS@PESO")
+
+    @staticmethod
+    def _emit(payload) -> None:
+        print(json.dumps(payload, ensure_ascii=False, default=str))
+
+    # Subcomandos
+
+    def migrate(self, args):
+        DataManager.migrate(args.target, self.athlete)
+        print(f"Use GYM_STORAGE={args.target} o --storage {args.target} para trabajar con el nuevo formato")
+
+    def partition(self, args):
+        DataManager.partition(args.by, self.athlete)
+
+    def export_csv(self, args):
+        DataManager.export_csv(args.directory, self.athlete)
+
+    def bulk_import(self, args):
+        importer = BulkImporter(WorkoutStore(self.athlete.workout_file), chunk_size=args.chunk_size,
+                                pounds=args.lb)
+        try:
+            self._emit(importer.run(args.path, args.format))
+        except (OSError, ValueError) as e:
+            self._emit({"error": f"Error importando {args.path}: {str(e)}"})
+            sys.exit(1)
+
+    def log_workout(self, args):
+        if args.routine not in ("Descanso", "Enfermo") and not args.sets:
+            self.parser.error("log-workout necesita al menos un --set salvo en Descanso/Enfermo")
+        exercises = {}
+        for entry in args.sets:
+            exercises.setdefault(entry["name"], []).extend(entry["sets"])
+        manager = WorkoutManager(WorkoutStore(self.athlete.workout_file))
+        try:
+            rows = manager.log_workout(args.date or datetime.now(), args.routine,
+                                       [{"name": name, "sets": sets} for name, sets in exercises.items()])
+        except ValueError as e:
+            self.parser.error(str(e))
+        self._emit({"logged": len(rows), "rows": rows})
+
+    def log_weight(self, args):
+        self._emit({"logged": GymTracker(self.athlete).log_weight(args.date or datetime.now(), args.weight)})
+
+    def goals_set(self, args):
+        manager = GoalManager(athlete=self.athlete)
+        try:
+            goal = manager.save_goal(args.exercise, args.weight, args.reps, args.deadline)
+        except OSError as e:
+            self._emit({"error": f"Error guardando la meta de {args.exercise}: {str(e)}"})
+            sys.exit(1)
+        self._emit({"goal": args.exercise, "saved": goal})
+
+    def goals_list(self, args):
+        goals = GoalManager(athlete=self.athlete).goals.copy()
+        if not goals.empty:
+            goals["Fecha Límite"] = pd.to_datetime(goals["Fecha Límite"]).dt.strftime("%Y-%m-%d")
+        self._emit(json.loads(goals.to_json(orient="records", force_ascii=False, date_format="iso")))
+
+    def goals_forecast(self, args):
+        self._emit(self._forecast_records(GoalManager(athlete=self.athlete).forecast(args.model)))
+
+    @staticmethod
+    def _forecast_records(forecast: pd.DataFrame) -> List[Dict]:
+        forecast = forecast.copy()
+        for column in ("Fecha Límite", "Fecha Proyectada"):
+            forecast[column] = forecast[column].dt.strftime("%Y-%m-%d")
+        return json.loads(forecast.round(3).to_json(orient="records", force_ascii=False, date_format="iso"))
+
+    def goals_delete(self, args):
+        manager = GoalManager(athlete=self.athlete)
+        matches = [i for i, name in enumerate(manager.goals["Ejercicio"].astype(str), 1) if name == args.exercise]
+        deleted = bool(matches) and manager.remove_goal(matches[0])
+        self._emit({"goal": args.exercise, "deleted": deleted})
+        if not deleted:
+            sys.exit(1)
+
+    def stats(self, args):
+        summary = ProgressTracker(GoalManager(athlete=self.athlete)).stats_summary(args.streaming, args.chunk_size)
+        self._emit(summary[args.section] if args.section else summary)
+
+    def training_load(self, args):
+        self._emit(TrainingLoad(WorkoutStore(self.athlete.workout_file)).summary(args.weeks))
+
+    def weight_stats(self, args):
+        training_load = TrainingLoad(WorkoutStore(self.athlete.workout_file))
+        self._emit(BodyWeightTracker(self.athlete.weight_file).summary(training_load, args.weeks))
+
+    def report(self, args):
+        importlib.import_module("matplotlib").use("Agg")
+        tracker = GymTracker(self.athlete)
+        output = args.output or os.path.join(self.athlete.directory, "reportes")
+        self._emit(ReportGenerator(tracker.progress_tracker, output, args.format, args.workers).generate())
+
+    def search_exercises(self, args):
+        for spec in args.alias:
+            name, _, alias = spec.partition("=")
+            try:
+                CATALOG.add_alias(CATALOG.resolve(name) or name.strip(), alias.strip())
+            except (KeyError, ValueError) as e:
+                self.parser.error(str(e))
+        for name in WorkoutStore(self.athlete.workout_file).exercises():  # personalizados del historial
+            CATALOG.add(name, persist=False)
+        self._emit([{"id": CATALOG.id(name), "name": name, "group": CATALOG.group(name)}
+                    for name in CATALOG.search(args.query, args.limit)])
+
+    def history_list(self, args):
+        if args.body_weight:
+            data = DataManager.load_data(self.athlete.weight_file)
+        else:
+            data = WorkoutStore(self.athlete.workout_file).frame
+            if args.exercise and not data.empty:
+                data = data[WorkoutStore.exercise_mask(data, CATALOG.resolve(args.exercise) or args.exercise)]
+        if data.empty:
+            self._emit([])
+            return
+        data = data.tail(args.limit).copy()
+        data["Fecha"] = data["Fecha"].dt.strftime("%Y-%m-%d")
+        data["Peso (kg)"] = data["Peso (kg)"].astype("float64").round(3)
+        self._emit(json.loads(data.to_json(orient="records", force_ascii=False, date_format="iso")))
+
+    def history_edit(self, args):
+        fields = {column: value for column, value in (
+            ("Fecha", args.date), ("Rutina", args.routine), ("Ejercicio", args.exercise),
+            ("Repeticiones", args.reps), ("Peso (kg)", args.weight)) if value is not None}
+        try:
+            if args.body_weight:
+                change = GymTracker(self.athlete).correct_weight(args.row_id, fields)
+            else:
+                change = WorkoutManager(WorkoutStore(self.athlete.workout_file)).correct_set(args.row_id, fields)
+        except ValueError as e:
+            self.parser.error(str(e))
+        self._emit({"corrected": change})
+
+    def history_delete(self, args):
+        try:
+            if args.body_weight:
+                changes = GymTracker(self.athlete).delete_weights(args.row_ids)
+            else:
+                changes = WorkoutManager(WorkoutStore(self.athlete.workout_file)).delete_sets(args.row_ids)
+        except ValueError as e:
+            self.parser.error(str(e))
+        self._emit({"deleted": len(changes)})
+
+    def compact(self, args):
+        self._emit([DataManager.compact(file_name, args.threshold)
+                    for file_name in (self.athlete.workout_file, self.athlete.weight_file)])
+
+    def serve(self, args):
+        service = LoggingService(GymTracker(self.athlete), args.commit_interval / 1000)
+        announce = lambda address: print(json.dumps({"listening": address}), flush=True)
+        asyncio.run(service.serve(args.host, args.port, args.socket, announce))
+
+    def team_stats(self, args):
+        team = TeamAnalytics(self.athlete.root, args.workers)
+        summaries = team.summaries()
+        self._emit({"athletes": summaries, "leaders": team.leaders(summaries)})
+
+    def run(self, argv: Optional[List[str]] = None):
+        args = self.parser.parse_args(argv)
+        try:
+            Metrics.configure(args.metrics, args.profile)
+        except ValueError as e:
+            self.parser.error(str(e))
+        if args.storage:
+            DataManager.backend = DataManager.create_backend(args.storage)
+        self.athlete = Athlete(args.athlete)
+        CATALOG.attach(self.athlete.catalog_file)
+
+        if args.command is None:
+            tracker = GymTracker(self.athlete)
+            tracker.main_menu()
+            return
+        try:
+            args.handler(args)
+            DataManager.flush()
+        except (OSError, ValueError) as e:  # al leer o guardar: nunca un resultado vacío en silencio
+            # Lo que no se guardó ya se informó como error: no se reintenta al salir
+            for file_name in self.athlete.files:
+                DataManager.discard(file_name)
+                if DataManager.changes_file(file_name):
+                    DataManager.discard(DataManager.changes_file(file_name))
+            self._emit({"error": str(e)})
+            sys.exit(1)
+
+def main(argv: Optional[List[str]] = None):
+    CommandLine().run(argv)
 
 if __name__ == "__main__":
-    tracker = GymTracker()
-    tracker.main_menu()
\ No newline at end of file
+    main()
\ No newline at end of file
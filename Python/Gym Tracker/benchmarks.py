@@ -0,0 +1,410 @@
+"""Benchmarks del Gym Tracker.
+
+Uso:
+    python benchmarks.py startup [--runs 5] [--data-dir DIR] [--json salida.json]
+    python benchmarks.py generate --rows 100000 [--seed 7] [--output DIR]
+    python benchmarks.py hotpaths [--sizes 1000,100000,1000000] [--seed 7] [--json salida.json]
+                                  [--baseline anterior.json] [--tolerance 1.3]
+    python benchmarks.py service [--clients 200] [--sets 50] [--rows 100000] [--json salida.json]
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import platform
+import runpy
+import signal
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+TRACKER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "Gym Tracker.py")
+
+# Se ejecuta en un intérprete nuevo para medir el arranque en frío
+STARTUP_SNIPPET = """
+import json, runpy, sys, time
+t0 = time.perf_counter()
+ns = runpy.run_path(sys.argv[1], run_name="gym_tracker")
+t1 = time.perf_counter()
+ns["GymTracker"]()
+t2 = time.perf_counter()
+print(json.dumps({
+    "import_ms": (t1 - t0) * 1000,
+    "init_ms": (t2 - t1) * 1000,
+    "heavy_modules": [m for m in ("pandas", "numpy", "matplotlib") if m in sys.modules],
+}))
+"""
+
+
+def _parse_importtime(stderr: str, top: int = 5) -> list:
+    """Módulos de primer nivel con mayor tiempo acumulado según -X importtime"""
+    entries = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        _, cumulative, name = (part.strip() for part in line[len("import time:"):].split("|"))
+        if not name.startswith(" ") and "." not in name.strip():
+            entries.append({"module": name.strip(), "cumulative_ms": int(cumulative) / 1000})
+    return sorted(entries, key=lambda e: e["cumulative_ms"], reverse=True)[:top]
+
+
+def bench_startup(runs: int, data_dir: str) -> dict:
+    """Mide importar el script y construir GymTracker (sin llegar al menú)"""
+    samples, imports = [], []
+    for _ in range(runs):
+        start = subprocess.run([sys.executable, "-X", "importtime", "-c", STARTUP_SNIPPET, TRACKER_SCRIPT],
+                               cwd=data_dir, capture_output=True, text=True, check=True)
+        samples.append(json.loads(start.stdout.strip().splitlines()[-1]))
+        imports = _parse_importtime(start.stderr)
+
+    return {
+        "runs": runs,
+        "import_ms": statistics.median(s["import_ms"] for s in samples),
+        "init_ms": statistics.median(s["init_ms"] for s in samples),
+        "heavy_modules": samples[-1]["heavy_modules"],
+        "slowest_imports": imports,
+    }
+
+
+# Datos sintéticos
+
+GENERATED_END = "2025-12-31"  # fecha fija: la misma semilla produce siempre los mismos archivos
+ROWS_PER_SESSION = 19  # ~5 ejercicios x 4 series, con ~5% de descansos de una fila
+CUSTOM_EXERCISES = ["Hip Thrust", "Face Pull", "Plancha"]
+
+
+def _tracker_namespace() -> dict:
+    return runpy.run_path(TRACKER_SCRIPT, run_name="gym_tracker")
+
+
+def generate(rows: int, seed: int, output: str, years: int = None) -> dict:
+    """Historial realista de entrenamientos, metas y peso corporal a partir de EXERCISE_POOL.
+
+    Las sesiones rotan las rutinas del catálogo (con algún día de "Otros", descanso o enfermedad),
+    cada ejercicio tiene su peso base con progresión lenta y ruido, y los pesos van de 2.5 en 2.5 kg.
+    Todo se genera con NumPy, así que 10M de filas tardan lo que tarda escribir el CSV.
+    """
+    import numpy as np
+    import pandas as pd
+
+    tracker = _tracker_namespace()
+    pool = {routine: exercises for routine, exercises in tracker["EXERCISE_POOL"].items() if exercises}
+    routines = list(pool) + ["Otros"]
+    pool["Otros"] = CUSTOM_EXERCISES
+    rng = np.random.default_rng(seed)
+
+    # Ejercicios por sesión (4-6) y series por ejercicio (3-5); los descansos son una sola fila.
+    # Si la aleatoriedad se queda corta se planifican más sesiones, y al final se recorta a 'rows'
+    rest, exercise_count, sets = np.empty(0, bool), np.empty(0, np.int64), np.empty(0, np.int64)
+    while sets.sum() < rows:
+        batch = max(1, math.ceil((rows - sets.sum()) / ROWS_PER_SESSION))
+        batch_rest = rng.random(batch) < 0.05  # ~5% de descansos
+        batch_count = np.where(batch_rest, 1, rng.integers(4, 7, batch))
+        batch_sets = np.where(np.repeat(batch_rest, batch_count), 1, rng.integers(3, 6, batch_count.sum()))
+        rest = np.concatenate([rest, batch_rest])
+        exercise_count = np.concatenate([exercise_count, batch_count])
+        sets = np.concatenate([sets, batch_sets])
+    row_slot = np.repeat(np.arange(len(sets)), sets)[:rows]
+    slot_session = np.repeat(np.arange(len(rest)), exercise_count)[:row_slot[-1] + 1]
+    row_session = slot_session[row_slot]
+    sessions = int(row_session[-1]) + 1
+    rest = rest[:sessions]
+
+    years = years or min(20, max(1, sessions // 200))  # ~4 sesiones por semana hasta 20 años
+    end = np.datetime64(GENERATED_END)
+    session_dates = end - np.sort(rng.integers(0, years * 365, sessions))[::-1].astype("timedelta64[D]")
+    # Rotación de rutinas del catálogo; ~3% de sesiones libres ("Otros")
+    session_routine = np.arange(sessions) % (len(routines) - 1)
+    session_routine[rng.random(sessions) < 0.03] = len(routines) - 1
+
+    names = [exercise for routine in routines for exercise in pool[routine]]
+    offsets = np.cumsum([0] + [len(pool[r]) for r in routines])
+    sizes = np.diff(offsets)
+    slot_routine = session_routine[slot_session]
+    slot_exercise = offsets[slot_routine] + rng.integers(0, 1 << 30, len(slot_session)) % sizes[slot_routine]
+    exercise = slot_exercise[row_slot]
+    is_rest = rest[row_session]
+
+    base = rng.uniform(15, 140, len(names))
+    progress = 1 + 0.4 * (row_session / max(1, sessions - 1))
+    weight = np.round(base[exercise] * progress * rng.normal(1, 0.05, rows) / 2.5) * 2.5
+    reps = rng.integers(5, 13, rows)
+    rest_names = np.array(["Descanso", "Enfermo"])[(rng.random(rows) < 0.2).astype(int)]
+
+    routine_names = np.array(routines, dtype=object)[session_routine[row_session]]
+    exercise_names = np.array(names, dtype=object)[exercise]
+    workouts = pd.DataFrame({
+        "Fecha": np.datetime_as_string(session_dates[row_session], unit="D"),
+        "Rutina": np.where(is_rest, rest_names, routine_names),
+        "Ejercicio": np.where(is_rest, rest_names, exercise_names),
+        "Repeticiones": np.where(is_rest, 0, reps),
+        "Peso (kg)": np.where(is_rest, 0, np.maximum(weight, 2.5)),
+        "ID": np.arange(1, rows + 1),  # IDs de fila fijos: muy por debajo de los que genera el tracker
+    })
+
+    # Metas: una por ejercicio frecuente, un 10% sobre el mejor peso y con fecha dentro del historial o después
+    best = workouts[~is_rest].groupby("Ejercicio")["Peso (kg)"].max()
+    chosen = best.sample(min(8, len(best)), random_state=seed)
+    deadlines = end + rng.integers(-years * 180, 365, len(chosen)).astype("timedelta64[D]")
+    goals = pd.DataFrame({
+        "Ejercicio": chosen.index,
+        "Meta Peso (kg)": (np.round(chosen.to_numpy() * 1.1 / 2.5) * 2.5),
+        "Meta Reps": rng.integers(3, 9, len(chosen)),
+        "Fecha Límite": np.datetime_as_string(deadlines, unit="D"),
+    })
+
+    # Peso corporal: ~60% de los días, paseo aleatorio lento más ruido de báscula
+    days = np.arange(end - np.timedelta64(years * 365, "D"), end + np.timedelta64(1, "D"))
+    days = days[rng.random(len(days)) < 0.6]
+    body = 78 + np.cumsum(rng.normal(0, 0.05, len(days))) + rng.normal(0, 0.4, len(days))
+    weights = pd.DataFrame({"Fecha": np.datetime_as_string(days, unit="D"), "Peso (kg)": body.round(1),
+                            "ID": np.arange(1, len(days) + 1)})
+
+    os.makedirs(output, exist_ok=True)
+    workouts.to_csv(os.path.join(output, tracker["WORKOUT_FILE"]), index=False)
+    goals.to_csv(os.path.join(output, tracker["GOALS_FILE"]), index=False)
+    weights.to_csv(os.path.join(output, tracker["WEIGHT_FILE"]), index=False)
+    return {"rows": len(workouts), "sessions": sessions, "years": years, "goals": len(goals),
+            "weigh_ins": len(weights), "output": output}
+
+
+def dataset(rows: int, seed: int, root: str) -> str:
+    """Directorio con el historial sintético de ese tamaño (se genera una vez y se reutiliza)"""
+    output = os.path.join(root, f"seed{seed}-{rows}")
+    if not os.path.exists(os.path.join(output, "entrenamientos.csv")):
+        generate(rows, seed, output)
+    return output
+
+
+# Rutas calientes: cada tamaño se mide en un intérprete nuevo para no mezclar memoria ni cachés
+
+HOTPATH_SNIPPET = """
+import gc, importlib, io, json, runpy, sys, time, tracemalloc
+ns = runpy.run_path(sys.argv[1], run_name="gym_tracker")
+repeat = int(sys.argv[2])
+importlib.import_module("matplotlib").use("Agg")
+ns["pd"].DataFrame, ns["plt"].figure  # las importaciones no cuentan como parte de ninguna ruta
+
+def measure(fn):
+    times = []
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - start) * 1000)
+    gc.collect()
+    tracemalloc.start()
+    fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {"ms": min(times), "median_ms": sorted(times)[len(times) // 2], "peak_mb": peak / 1e6}
+
+DataManager, WorkoutStore, Athlete = ns["DataManager"], ns["WorkoutStore"], ns["Athlete"]
+athlete = Athlete()
+store = WorkoutStore(athlete.workout_file)
+store.frame
+goals = ns["GoalManager"](store, athlete)
+goals.goals
+tracker = ns["ProgressTracker"](goals)
+exercise = store.frame["Ejercicio"].value_counts().index[0]
+history = store.exercise_history(exercise)
+
+def render(period):
+    fig = ns["ProgressTracker"]._draw_progression(history, "Peso (kg)" if period is None else "1RM Estimado (kg)",
+                                                  "benchmark", period)
+    fig.savefig(io.BytesIO(), format="png")
+    ns["plt"].close(fig)
+
+def compare_goals():
+    store.rebuild_records()
+    goals.goal_progress()
+
+results = {
+    "load_data": measure(lambda: DataManager.load_data(athlete.workout_file)),
+    "compare_goals": measure(compare_goals),
+    "routine_distribution": measure(tracker.routine_counts),
+    "exercise_history": measure(lambda: store.exercise_history(exercise)),
+    "plot_progression": measure(lambda: render(None)),
+    "plot_progression_weekly": measure(lambda: render("semana")),
+    "training_load": measure(lambda: ns["TrainingLoad"](store).summary()),
+}
+print(json.dumps({"rows": len(store.frame), "results": results}))
+"""
+
+
+def bench_hotpaths(sizes: list, seed: int, repeat: int, data_root: str) -> dict:
+    report = {}
+    for rows in sizes:
+        directory = dataset(rows, seed, data_root)
+        run = subprocess.run([sys.executable, "-c", HOTPATH_SNIPPET, TRACKER_SCRIPT, str(repeat)],
+                             cwd=directory, capture_output=True, text=True)
+        if run.returncode != 0:
+            raise RuntimeError(f"falló la medición con {rows} filas:\n{run.stderr}")
+        report[str(rows)] = json.loads(run.stdout.strip().splitlines()[-1])["results"]
+        print(f"{rows:>10} filas: " + ", ".join(f"{name} {value['ms']:.1f}ms"
+                                               for name, value in report[str(rows)].items()), file=sys.stderr)
+    return report
+
+
+def compare(current: dict, baseline: dict, tolerance: float, min_ms: float) -> list:
+    """Rutas que empeoraron más que la tolerancia respecto a la línea base (tiempo o memoria)"""
+    regressions = []
+    for rows, paths in current.get("hotpaths", {}).items():
+        for name, value in paths.items():
+            old = baseline.get("hotpaths", {}).get(rows, {}).get(name)
+            if not old:
+                continue
+            for metric, floor in (("ms", min_ms), ("peak_mb", 1.0)):
+                if value[metric] > floor and value[metric] > old[metric] * tolerance:
+                    regressions.append({"rows": int(rows), "path": name, "metric": metric, "baseline": old[metric],
+                                        "current": value[metric], "ratio": round(value[metric] / old[metric], 2)})
+    return regressions
+
+
+# Servicio local: clientes simulados contra `Gym Tracker.py serve` en otro proceso
+
+async def _client(socket_path: str, sets: int, exercises: list, seed: int, latencies: list) -> None:
+    reader, writer = await asyncio.open_unix_connection(socket_path)
+    for i in range(sets):
+        exercise = exercises[(seed + i) % len(exercises)]
+        request = {"op": "log_set", "id": i, "exercise": exercise, "reps": 5 + i % 6,
+                   "weight": 20 + 2.5 * ((seed * 7 + i) % 40), "date": "2026-01-01"}
+        start = time.perf_counter()
+        writer.write(json.dumps(request).encode() + b"\n")
+        await writer.drain()
+        response = json.loads(await reader.readline())
+        latencies.append((time.perf_counter() - start) * 1000)
+        if not response.get("ok") or response.get("id") != i:
+            raise RuntimeError(f"respuesta inesperada: {response}")
+    writer.close()
+    await writer.wait_closed()
+
+
+async def _request(socket_path: str, request: dict) -> dict:
+    reader, writer = await asyncio.open_unix_connection(socket_path)
+    writer.write(json.dumps(request).encode() + b"\n")
+    await writer.drain()
+    response = json.loads(await reader.readline())
+    writer.close()
+    await writer.wait_closed()
+    return response
+
+
+async def _load_test(socket_path: str, clients: int, sets: int, exercises: list) -> dict:
+    latencies = []
+    start = time.perf_counter()
+    await asyncio.gather(*(_client(socket_path, sets, exercises, seed, latencies) for seed in range(clients)))
+    elapsed = time.perf_counter() - start
+    status = await _request(socket_path, {"op": "status"})
+    stats_start = time.perf_counter()
+    await _request(socket_path, {"op": "stats", "section": "routines"})
+    latencies.sort()
+    return {
+        "clients": clients, "sets": clients * sets, "elapsed_s": round(elapsed, 3),
+        "sets_per_s": round(clients * sets / elapsed), "commits": status["commits"],
+        "sets_per_commit": round(status["sets_logged"] / max(status["commits"], 1), 1),
+        "p50_ms": round(latencies[len(latencies) // 2], 2), "p99_ms": round(latencies[int(len(latencies) * 0.99)], 2),
+        "stats_ms": round((time.perf_counter() - stats_start) * 1000, 2),
+    }
+
+
+def bench_service(clients: int, sets: int, rows: int, seed: int, commit_interval: float) -> dict:
+    """Arranca el servicio sobre una copia del historial sintético, lo satura y comprueba lo escrito en disco"""
+    with tempfile.TemporaryDirectory() as directory:
+        if rows:
+            generate(rows, seed, directory)
+        socket_path = os.path.join(directory, "gym.sock")
+        server = subprocess.Popen([sys.executable, TRACKER_SCRIPT, "serve", "--socket", socket_path,
+                                   "--commit-interval", str(commit_interval)],
+                                  cwd=directory, stdout=subprocess.PIPE, text=True)
+        try:
+            ready = server.stdout.readline()
+            if "listening" not in ready:
+                raise RuntimeError("el servicio no arrancó")
+            exercises = [exercise for exercises in _tracker_namespace()["EXERCISE_POOL"].values()
+                         for exercise in exercises]
+            result = asyncio.run(_load_test(socket_path, clients, sets, exercises))
+        finally:
+            server.send_signal(signal.SIGINT)
+            server.wait(timeout=60)
+        with open(os.path.join(directory, "entrenamientos.csv"), encoding="utf-8") as f:
+            written = sum(1 for line in f if line.startswith("2026-01-01,"))
+    result["written"] = written
+    if written != result["sets"]:
+        raise RuntimeError(f"se enviaron {result['sets']} series y se escribieron {written}")
+    return result
+
+
+def environment() -> dict:
+    import numpy
+    import pandas
+    import matplotlib
+    return {"python": platform.python_version(), "platform": platform.platform(), "pandas": pandas.__version__,
+            "numpy": numpy.__version__, "matplotlib": matplotlib.__version__, "storage": os.environ.get("GYM_STORAGE", "csv")}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks del Gym Tracker")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    startup = commands.add_parser("startup", help="Costo de importación y arranque hasta el menú")
+    startup.add_argument("--runs", type=int, default=5)
+    startup.add_argument("--data-dir", default=os.path.dirname(TRACKER_SCRIPT))
+    startup.add_argument("--json", help="Guarda el resultado en este archivo")
+
+    gen = commands.add_parser("generate", help="Genera un historial sintético reproducible")
+    gen.add_argument("--rows", type=int, required=True)
+    gen.add_argument("--seed", type=int, default=7)
+    gen.add_argument("--years", type=int, help="Por defecto según el tamaño (hasta 20)")
+    gen.add_argument("--output", default="datos_sinteticos")
+
+    hot = commands.add_parser("hotpaths", help="Tiempo y memoria de carga, consultas y gráficos por tamaño")
+    hot.add_argument("--sizes", default="1000,100000,1000000",
+                     help="Filas separadas por comas (por ejemplo 1000,100000,1000000,10000000)")
+    hot.add_argument("--seed", type=int, default=7)
+    hot.add_argument("--repeat", type=int, default=3, help="Se informa el mejor tiempo de N ejecuciones")
+    hot.add_argument("--data-root", default=os.path.join(tempfile.gettempdir(), "gym_tracker_bench"),
+                     help="Dónde se guardan (y reutilizan) los historiales generados")
+    hot.add_argument("--json", help="Guarda el resultado en este archivo")
+    hot.add_argument("--baseline", help="JSON de una ejecución anterior con el que comparar")
+    hot.add_argument("--tolerance", type=float, default=1.3, help="Empeoramiento permitido (1.3 = +30%%)")
+    hot.add_argument("--min-ms", type=float, default=5.0, help="Ignora rutas más rápidas que esto (ruido)")
+
+    service = commands.add_parser("service", help="Prueba de carga del servicio local (serve)")
+    service.add_argument("--clients", type=int, default=200, help="Conexiones simultáneas")
+    service.add_argument("--sets", type=int, default=50, help="Series que envía cada cliente, de a una")
+    service.add_argument("--rows", type=int, default=100000, help="Historial inicial (0 = vacío)")
+    service.add_argument("--seed", type=int, default=7)
+    service.add_argument("--commit-interval", type=float, default=2.0, help="Milisegundos por lote")
+    service.add_argument("--json", help="Guarda el resultado en este archivo")
+
+    args = parser.parse_args(argv)
+    if args.command == "startup":
+        result = {"startup": bench_startup(args.runs, args.data_dir)}
+    elif args.command == "generate":
+        print(json.dumps(generate(args.rows, args.seed, args.output, args.years), indent=2))
+        return
+    elif args.command == "hotpaths":
+        sizes = [int(size) for size in args.sizes.split(",")]
+        result = {"environment": environment(), "seed": args.seed,
+                  "hotpaths": bench_hotpaths(sizes, args.seed, args.repeat, args.data_root)}
+        if args.baseline:
+            with open(args.baseline, encoding="utf-8") as f:
+                result["regressions"] = compare(result, json.load(f), args.tolerance, args.min_ms)
+    elif args.command == "service":
+        result = {"environment": environment(),
+                  "service": bench_service(args.clients, args.sets, args.rows, args.seed, args.commit_interval)}
+
+    print(json.dumps(result, indent=2, ensure_ascii=False))
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2, ensure_ascii=False)
+    if result.get("regressions"):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()